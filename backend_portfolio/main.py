@@ -14,16 +14,13 @@ import os
 from backend_portfolio.routers.Projects.quizProAI.quizproai import router as quizproai_router
 from backend_portfolio.routers.Projects.buy_smart.price_compare import router as buy_smart_router
 from backend_portfolio.db import engine
-from backend_portfolio.buy_smart_db import buy_smart_engine
 from backend_portfolio.routers.Projects.quizProAI.models import (
     Question,
     QuizStats,
     User,
 )
-from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
-    Source,
-    Product,
-    PriceSnapshot,
+from backend_portfolio.routers.Projects.buy_smart.init_db import (
+    create_db_and_tables as create_buy_smart_tables,
 )
 from backend_portfolio.routers.Projects.quizProAI import quizproai
 from backend_portfolio.routers.Projects.weather.weather import router as weather_router
@@ -31,6 +28,17 @@ from backend_portfolio.routers.Projects.quizProAI.auth import router as auth_rou
 from backend_portfolio.routers.Projects.quizProAI.quiz_stats import router as quiz_stats_router
 from backend_portfolio.routers.Projects.file_organizer.file_organizer import router as file_organizer_router
 from backend_portfolio.routers.Projects.buy_smart.scrapers.history_api import router as buy_smart_history_router
+from backend_portfolio.routers.Projects.buy_smart.scrapers.manager import _use_db_search
+from backend_portfolio.routers.Projects.buy_smart.services.catalog_index import (
+    catalog_index,
+    catalog_index_enabled,
+)
+from backend_portfolio.routers.Projects.buy_smart.services.catalog_generation import (
+    catalog_generation_watcher,
+)
+from backend_portfolio.routers.Projects.buy_smart.services import cache as buy_smart_cache
+from backend_portfolio.routers.Projects.buy_smart.services.write_behind import live_search_writer
+from backend_portfolio.routers.Projects.buy_smart.utils.http import http_layer
 
 LOCAL_ORIGINS = ["http://localhost:5173", "http://127.0.0.1:5173"]
 
@@ -51,6 +59,8 @@ def get_cors_origins() -> list[str]:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Shared outbound keep-alive pools (weather, OpenAI, scrapers)
+    http_layer.open()
     SQLModel.metadata.create_all(
         engine,
         tables=[
@@ -59,15 +69,20 @@ async def lifespan(app: FastAPI):
             User.__table__,
         ],
     )
-    SQLModel.metadata.create_all(
-        buy_smart_engine,
-        tables=[
-            Source.__table__,
-            Product.__table__,
-            PriceSnapshot.__table__,
-        ],
-    )
+    # Buy Smart tables + idempotent migrations (indexes, search index)
+    create_buy_smart_tables()
+    # After a catalog sync: reload the in-memory index first, then drop cached reads.
+    if _use_db_search() and catalog_index_enabled():
+        catalog_generation_watcher.subscribe(catalog_index.on_generation_change)
+    catalog_generation_watcher.subscribe(buy_smart_cache.on_generation_change)
+    catalog_generation_watcher.start()
+    # Live search saves hits in the background; stop() writes whatever is still queued.
+    if not _use_db_search():
+        live_search_writer.start()
     yield
+    live_search_writer.stop()
+    catalog_generation_watcher.stop()
+    await http_layer.aclose()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -86,6 +101,12 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/health/http")
+def http_stats():
+    """Outbound HTTP per host: requests, retries, errors, status classes, latency."""
+    return http_layer.stats()
+
+
 app.include_router(quizproai_router)
 app.include_router(auth_router)
 app.include_router(weather_router)
@@ -1,19 +1,468 @@
 # Run from repo root: python -m backend_portfolio.routers.Projects.buy_smart.init_db
-from sqlmodel import SQLModel
+import time
+
+from sqlmodel import Session, SQLModel, select
+from sqlalchemy import bindparam, func, inspect, text, update
+from sqlalchemy.exc import SQLAlchemyError
 
 from backend_portfolio.buy_smart_db import DB_URL, buy_smart_engine
 from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+    CatalogGeneration,
+    CategoryPriceRollup,
+    PriceChange,
+    PriceInterval,
+    PriceRollup,
     PriceSnapshot,
     Product,
+    ProductLatestPrice,
+    ReplicationWatermark,
+    SchemaMigration,
     Source,
+    SyncRun,
+    SyncRunSubcategory,
+)
+from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import (
+    barcode_from_url,
+    rebuild_latest_prices,
+)
+from backend_portfolio.routers.Projects.buy_smart.scrapers.search_index import ensure_search_index
+from backend_portfolio.routers.Projects.buy_smart.services.price_changes import rebuild_price_changes
+from backend_portfolio.routers.Projects.buy_smart.services.price_history import compact_price_history
+from backend_portfolio.routers.Projects.buy_smart.services.price_rollups import refresh_price_rollups
+from backend_portfolio.routers.Projects.buy_smart.utils.normalizers import normalize_text
+
+
+# Tables that point at product.id → the per-product key that must stay unique when a
+# duplicate product's rows are moved onto the one kept (empty: product_id alone)
+_PRODUCT_CHILD_KEYS = {
+    "pricesnapshot": ("snapshot_day",),
+    "product_latest_price": (),
+    "price_change": ("day",),
+    "price_rollup": ("period", "period_start"),
+}
+
+
+def dedupe_products(engine=buy_smart_engine) -> int:
+    """
+    Merge products that share (source_id, external_prod_id) into the lowest id: their
+    snapshots, intervals, latest price, changes and rollups move to it — rows the kept
+    product already has for the same day / period win, as do its intervals where the
+    two overlap — then the duplicates are deleted. Returns how many were removed.
+    """
+    tables = set(inspect(engine).get_table_names())
+    with engine.connect() as conn:
+        pairs = conn.execute(
+            text(
+                "SELECT p.id, d.keep_id FROM product p JOIN ("
+                "SELECT source_id, external_prod_id, MIN(id) AS keep_id FROM product "
+                "GROUP BY source_id, external_prod_id HAVING COUNT(*) > 1"
+                ") d ON p.source_id = d.source_id AND p.external_prod_id = d.external_prod_id "
+                "WHERE p.id <> d.keep_id"
+            )
+        ).all()
+        if not pairs:
+            return 0
+        children = []
+        for table, keys in _PRODUCT_CHILD_KEYS.items():
+            if table not in tables:
+                continue
+            columns = {col["name"] for col in inspect(conn).get_columns(table)}
+            if all(key in columns for key in keys):
+                match = "".join(f" AND k.{key} = {table}.{key}" for key in keys)
+            else:
+                match = " AND 1 = 0"  # pre-snapshot_day pricesnapshot: nothing can collide
+            children.append((table, match))
+        if "priceinterval" in tables:
+            children.append(
+                ("priceinterval", " AND k.valid_from <= priceinterval.valid_to AND k.valid_to >= priceinterval.valid_from")
+            )
+        # one duplicate at a time: a second duplicate of the same product has to see the first's moved rows
+        for dup, keep in pairs:
+            params = {"dup": dup, "keep": keep}
+            for table, match in children:
+                conn.execute(
+                    text(
+                        f"DELETE FROM {table} WHERE product_id = :dup AND EXISTS ("
+                        f"SELECT 1 FROM {table} k WHERE k.product_id = :keep{match})"
+                    ),
+                    params,
+                )
+                conn.execute(text(f"UPDATE {table} SET product_id = :keep WHERE product_id = :dup"), params)
+            conn.execute(text("DELETE FROM product WHERE id = :dup"), params)
+        conn.commit()
+    return len(pairs)
+
+
+def migrate_product_unique_key(engine=buy_smart_engine) -> bool:
+    """
+    Add the (source_id, external_prod_id) unique index on existing databases (idempotent),
+    merging duplicate products first. Returns False when it can't be created yet.
+    """
+    removed = dedupe_products(engine)
+    if removed:
+        print(f"Merged {removed} duplicate products into their lowest id")
+    try:
+        with engine.connect() as conn:
+            conn.execute(
+                text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS ux_product_source_external "
+                    "ON product (source_id, external_prod_id)"
+                )
+            )
+            conn.commit()
+    except SQLAlchemyError as exc:
+        # Existing duplicate rows block the index; bulk sync needs it for ON CONFLICT.
+        print(f"Could not create ux_product_source_external (duplicate products?): {exc}")
+        return False
+    return True
+
+
+def migrate_product_external_id_bigint(engine=buy_smart_engine) -> None:
+    """Widen product.external_prod_id to BIGINT on Postgres (Shufersal ids are barcodes). Idempotent."""
+    if engine.dialect.name != "postgresql":
+        return  # SQLite INTEGER is already 64-bit
+    with engine.connect() as conn:
+        data_type = conn.execute(
+            text(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_name = 'product' AND column_name = 'external_prod_id'"
+            )
+        ).scalar()
+        if data_type == "integer":
+            conn.execute(text("ALTER TABLE product ALTER COLUMN external_prod_id TYPE BIGINT"))
+            conn.commit()
+            print("Migrated product.external_prod_id to BIGINT")
+
+
+def migrate_snapshot_day(engine=buy_smart_engine) -> bool:
+    """
+    Add + backfill pricesnapshot.snapshot_day and its (product_id, snapshot_day) unique
+    index on databases that predate it. Idempotent. Returns False when the index can't
+    be created yet.
+    """
+    columns = {col["name"] for col in inspect(engine).get_columns("pricesnapshot")}
+    table = PriceSnapshot.__table__
+    with engine.connect() as conn:
+        if "snapshot_day" not in columns:
+            conn.execute(text("ALTER TABLE pricesnapshot ADD COLUMN snapshot_day DATE"))
+            conn.commit()
+            print("Added pricesnapshot.snapshot_day")
+        backfilled = conn.execute(
+            update(table)
+            .where(table.c.snapshot_day.is_(None))
+            .values(snapshot_day=func.date(table.c.timestamp))
+        ).rowcount
+        conn.commit()
+        if backfilled:
+            print(f"Backfilled pricesnapshot.snapshot_day: {backfilled} rows")
+    try:
+        with engine.connect() as conn:
+            conn.execute(
+                text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS ux_pricesnapshot_product_day "
+                    "ON pricesnapshot (product_id, snapshot_day)"
+                )
+            )
+            conn.commit()
+    except SQLAlchemyError as exc:
+        # Two snapshots of one product on one day (pre-dates the one-per-day rule).
+        print(f"Could not create ux_pricesnapshot_product_day (duplicate snapshots?): {exc}")
+        return False
+    return True
+
+
+# Columns moved off the price tables by migrate_compact_price_schema()
+_LEGACY_PRICE_COLUMNS = {
+    "pricesnapshot": ("price", "unit", "unit_size", "price_per_unit_desc", "url"),
+    "priceinterval": ("price", "unit", "unit_size", "price_per_unit_desc"),
+    "product_latest_price": ("price", "unit", "unit_size", "price_per_unit_desc", "barcode"),
+}
+_STATIC_PRODUCT_COLUMNS = ("barcode", "unit", "unit_size", "price_per_unit_desc")
+
+
+def _backfill_product_barcodes(conn, latest_columns: set[str], snapshot_columns: set[str]) -> int:
+    """product.barcode from product_latest_price.barcode, else parsed from the newest snapshot url."""
+    if "barcode" in latest_columns:
+        return conn.execute(
+            text(
+                "UPDATE product SET barcode = (SELECT l.barcode FROM product_latest_price l "
+                "WHERE l.product_id = product.id) WHERE barcode IS NULL"
+            )
+        ).rowcount
+    if "url" not in snapshot_columns:
+        return 0
+    rows = conn.execute(
+        text(
+            "SELECT product_id, url FROM ("
+            "SELECT product_id, url, ROW_NUMBER() OVER "
+            "(PARTITION BY product_id ORDER BY timestamp DESC, id DESC) AS rn "
+            "FROM pricesnapshot WHERE url IS NOT NULL) newest WHERE rn = 1"
+        )
+    ).all()
+    updates = [
+        {"product_id": product_id, "barcode": barcode}
+        for product_id, url in rows
+        if (barcode := barcode_from_url(url))
+    ]
+    if updates:
+        conn.execute(
+            text("UPDATE product SET barcode = :barcode WHERE id = :product_id AND barcode IS NULL"),
+            updates,
+        )
+    return len(updates)
+
+
+def migrate_compact_price_schema(engine=buy_smart_engine) -> None:
+    """
+    Move the per-row unit / unit_size / price_per_unit_desc / barcode / url of the price
+    tables onto `product` and store prices as integer agorot. Idempotent.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    columns = {
+        table: {col["name"] for col in inspector.get_columns(table)}
+        for table in ("product", *_LEGACY_PRICE_COLUMNS)
+        if table in tables
+    }
+    if not any("price" in columns.get(table, ()) for table in _LEGACY_PRICE_COLUMNS):
+        return
+
+    with engine.connect() as conn:
+        for column in _STATIC_PRODUCT_COLUMNS:
+            if column not in columns["product"]:
+                conn.execute(text(f"ALTER TABLE product ADD COLUMN {column} VARCHAR"))
+        conn.commit()
+
+        snapshot_columns = columns.get("pricesnapshot", set())
+        if "unit" in snapshot_columns:
+            # static fields = values of each product's newest snapshot
+            newest = (
+                "(SELECT s.{col} FROM pricesnapshot s WHERE s.product_id = product.id "
+                "ORDER BY s.timestamp DESC, s.id DESC LIMIT 1)"
+            )
+            updated = conn.execute(
+                text(
+                    "UPDATE product SET "
+                    + ", ".join(f"{col} = {newest.format(col=col)}" for col in _STATIC_PRODUCT_COLUMNS[1:])
+                    + " WHERE unit IS NULL AND unit_size IS NULL AND price_per_unit_desc IS NULL"
+                )
+            ).rowcount
+            print(f"Backfilled product unit / size / description: {updated} rows")
+        barcodes = _backfill_product_barcodes(conn, columns.get("product_latest_price", set()), snapshot_columns)
+        if barcodes:
+            print(f"Backfilled product.barcode: {barcodes} rows")
+        conn.commit()
+
+        for table, legacy in _LEGACY_PRICE_COLUMNS.items():
+            existing = columns.get(table, set())
+            if "price" not in existing:
+                continue
+            if "price_agorot" not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN price_agorot INTEGER"))
+            converted = conn.execute(
+                text(
+                    f"UPDATE {table} SET price_agorot = CAST(ROUND(price * 100) AS INTEGER) "
+                    "WHERE price_agorot IS NULL AND price IS NOT NULL"
+                )
+            ).rowcount
+            dropped = [column for column in legacy if column in existing]
+            for column in dropped:
+                conn.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN price_agorot SET NOT NULL"))
+            conn.commit()
+            print(f"Migrated {table} to price_agorot ({converted} rows), dropped {', '.join(dropped)}")
+
+    if engine.dialect.name == "sqlite":
+        print("Run VACUUM on the SQLite file to reclaim the space of the dropped columns.")
+
+
+def migrate_latest_price_table(engine=buy_smart_engine) -> None:
+    """Backfill product_latest_price from pricesnapshot on databases that predate it. Idempotent."""
+    with engine.connect() as conn:
+        has_latest = conn.execute(text("SELECT 1 FROM product_latest_price LIMIT 1")).first()
+        has_history = conn.execute(text("SELECT 1 FROM pricesnapshot LIMIT 1")).first()
+    if has_history and not has_latest:
+        rows = rebuild_latest_prices(engine=engine)
+        print(f"Backfilled product_latest_price: {rows} rows")
+
+
+def migrate_price_intervals(engine=buy_smart_engine) -> None:
+    """Fold existing daily snapshots into priceinterval on databases that predate it. Idempotent."""
+    with engine.connect() as conn:
+        has_intervals = conn.execute(text("SELECT 1 FROM priceinterval LIMIT 1")).first()
+        has_history = conn.execute(text("SELECT 1 FROM pricesnapshot LIMIT 1")).first()
+    if has_history and not has_intervals:
+        stats = compact_price_history(engine=engine)
+        print(
+            f"Folded {stats['snapshots_folded']} snapshots into "
+            f"{stats['intervals_inserted']} price intervals"
+        )
+
+
+def migrate_price_changes(engine=buy_smart_engine) -> None:
+    """Derive price_change from priceinterval on databases that predate it. Idempotent."""
+    with engine.connect() as conn:
+        has_changes = conn.execute(text("SELECT 1 FROM price_change LIMIT 1")).first()
+        has_intervals = conn.execute(text("SELECT 1 FROM priceinterval LIMIT 1")).first()
+    if has_intervals and not has_changes:
+        rows = rebuild_price_changes(engine=engine)
+        print(f"Backfilled price_change: {rows} rows")
+
+
+def migrate_price_rollups(engine=buy_smart_engine) -> None:
+    """Build price_rollup / category_price_rollup from priceinterval on databases that predate them. Idempotent."""
+    with engine.connect() as conn:
+        has_rollups = conn.execute(text("SELECT 1 FROM price_rollup LIMIT 1")).first()
+        has_intervals = conn.execute(text("SELECT 1 FROM priceinterval LIMIT 1")).first()
+    if has_intervals and not has_rollups:
+        stats = refresh_price_rollups(engine=engine)
+        print(
+            f"Built {stats['product_rollups']} product and "
+            f"{stats['category_rollups']} category price rollups"
+        )
+
+
+# Secondary indexes of the hot read paths, declared on the models (create_all only adds
+# them to new tables)
+_QUERY_INDEXES = {
+    Source: ("ix_source_name",),
+    Product: ("ix_product_source_category",),
+    PriceRollup: ("ix_price_rollup_period_start",),
+}
+
+
+def migrate_query_indexes(engine=buy_smart_engine) -> None:
+    """Create the model-declared secondary indexes missing on existing tables. Idempotent."""
+    inspector = inspect(engine)
+    with engine.connect() as conn:
+        for model, names in _QUERY_INDEXES.items():
+            table = model.__table__
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in names and index.name not in existing:
+                    index.create(conn)
+                    print(f"Created index {index.name} on {table.name}")
+        conn.commit()
+
+
+def refresh_normalized_names(engine=buy_smart_engine, *, batch_size: int = 5000) -> int:
+    """
+    Recompute product.normalized_name (utils/normalizers.py) where it is missing or stale,
+    in id batches. Returns the number of rows updated.
+    """
+    table = Product.__table__
+    read = select(table.c.id, table.c.prod_name, table.c.normalized_name).order_by(table.c.id).limit(batch_size)
+    write = update(table).where(table.c.id == bindparam("product_id")).values(normalized_name=bindparam("name"))
+    updated = 0
+    last_id = 0
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(read.where(table.c.id > last_id)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            changed = [
+                {"product_id": row.id, "name": name}
+                for row in rows
+                if (name := normalize_text(row.prod_name)) != row.normalized_name
+            ]
+            if changed:
+                conn.execute(write, changed)
+                conn.commit()
+                updated += len(changed)
+    return updated
+
+
+def migrate_normalized_name(engine=buy_smart_engine) -> None:
+    """Add, backfill and index product.normalized_name on existing databases. Idempotent."""
+    columns = {col["name"] for col in inspect(engine).get_columns("product")}
+    with engine.connect() as conn:
+        if "normalized_name" not in columns:
+            conn.execute(text("ALTER TABLE product ADD COLUMN normalized_name VARCHAR"))
+            conn.commit()
+    updated = refresh_normalized_names(engine)
+    if updated:
+        print(f"Backfilled product.normalized_name: {updated} rows")
+    with engine.connect() as conn:
+        conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_product_normalized_name ON product (normalized_name)")
+        )
+        conn.commit()
+
+
+# Applied in order, once per database, by run_migrations(). Append only; never renumber.
+# Every step is idempotent on its own (databases from before the ledger run them all
+# once), and a step that returns False is retried on the next start.
+MIGRATIONS = (
+    (1, "product_unique_key", migrate_product_unique_key),
+    (2, "product_external_id_bigint", migrate_product_external_id_bigint),
+    (3, "snapshot_day", migrate_snapshot_day),
+    (4, "compact_price_schema", migrate_compact_price_schema),
+    (5, "price_intervals", migrate_price_intervals),
+    (6, "latest_price_table", migrate_latest_price_table),
+    (7, "price_changes", migrate_price_changes),
+    (8, "price_rollups", migrate_price_rollups),
+    (9, "query_indexes", migrate_query_indexes),
+    (10, "normalized_name", migrate_normalized_name),
 )
 
+# pg_advisory_lock key: one API worker migrates, the others wait and find the ledger done
+_MIGRATION_LOCK_KEY = 0x62757953  # "buyS"
+
+
+def run_migrations(engine=buy_smart_engine) -> list[str]:
+    """Apply the MIGRATIONS not yet recorded in buy_smart_schema_migration. Returns their names."""
+    SQLModel.metadata.create_all(engine, tables=[SchemaMigration.__table__])
+    lock = engine.connect() if engine.dialect.name == "postgresql" else None
+    try:
+        if lock is not None:
+            lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+            lock.commit()  # session-level lock; don't sit idle in a transaction
+        with Session(engine) as session:
+            done = set(session.exec(select(SchemaMigration.version)).all())
+        applied = []
+        for version, name, migrate in MIGRATIONS:
+            if version in done:
+                continue
+            started = time.perf_counter()
+            if migrate(engine) is False:
+                print(f"Buy Smart migration {version} ({name}) incomplete, retrying on next start")
+                continue
+            with Session(engine) as session:
+                session.add(SchemaMigration(version=version, name=name))
+                session.commit()
+            applied.append(name)
+            print(f"Applied Buy Smart migration {version} ({name}) in {time.perf_counter() - started:.2f}s")
+        return applied
+    finally:
+        if lock is not None:
+            lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+            lock.commit()
+            lock.close()
+
 
-def create_db_and_tables():
+def create_db_and_tables(engine=buy_smart_engine):
     SQLModel.metadata.create_all(
-        buy_smart_engine,
-        tables=[Source.__table__, Product.__table__, PriceSnapshot.__table__],
+        engine,
+        tables=[
+            Source.__table__,
+            Product.__table__,
+            PriceSnapshot.__table__,
+            PriceInterval.__table__,
+            ProductLatestPrice.__table__,
+            PriceChange.__table__,
+            PriceRollup.__table__,
+            CategoryPriceRollup.__table__,
+            CatalogGeneration.__table__,
+            ReplicationWatermark.__table__,
+            SyncRun.__table__,
+            SyncRunSubcategory.__table__,
+            SchemaMigration.__table__,
+        ],
     )
+    run_migrations(engine)
+    ensure_search_index(engine)
 
 
 if __name__ == "__main__":
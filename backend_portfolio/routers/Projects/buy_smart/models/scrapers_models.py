@@ -1,27 +1,197 @@
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
+from sqlalchemy import BigInteger, Column, Index
 from sqlmodel import SQLModel, Field, Relationship
 
 class Source(SQLModel, table=True):
+    __table_args__ = (
+        # Sync, search and every ?source= filter look sources up by name
+        Index("ix_source_name", "name"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     base_url: str
     last_seen: Optional[datetime] = None
 
 class Product(SQLModel, table=True):
+    __table_args__ = (
+        # One row per item per store — bulk sync upserts on this key
+        Index("ux_product_source_external", "source_id", "external_prod_id", unique=True),
+        # getCategories, ?category= filters of the deals / category endpoints
+        Index("ix_product_source_category", "source_id", "prod_category"),
+        # Same item across stores / spellings (utils/normalizers.py)
+        Index("ix_product_normalized_name", "normalized_name"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     source_id: Optional[int] = Field(default=None, foreign_key="source.id")
-    external_prod_id: int             # id used by source (e.g. item id)
+    # id used by source (Hetzi item id, Shufersal barcode — 13 digits, needs BIGINT)
+    external_prod_id: int = Field(sa_column=Column(BigInteger, nullable=False))
     prod_name: str
+    # normalize_text(prod_name), set on insert — what search and name matching compare
+    normalized_name: Optional[str] = None
     prod_category: Optional[str] = None
     image_url: Optional[str] = None
+    # Static per product (kept off the price rows); updated when the store changes them
+    barcode: Optional[str] = None
+    unit: Optional[str] = None
+    unit_size: Optional[str] = None
+    price_per_unit_desc: Optional[str] = None
+
+def _utc_today() -> date:
+    return datetime.utcnow().date()
 
 class PriceSnapshot(SQLModel, table=True):
+    __table_args__ = (
+        # At most one snapshot per product per (UTC) day; also serves day lookups and history
+        Index("ux_pricesnapshot_product_day", "product_id", "snapshot_day", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     product_id: Optional[int] = Field(default=None, foreign_key="product.id")
-    price: float
-    unit: Optional[str] = None
-    unit_size:Optional[str]=None
-    price_per_unit_desc: Optional[str]=None
+    price_agorot: int                 # price in minor units (₪8.90 → 890)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
-    url: Optional[str] = None
\ No newline at end of file
+    # UTC date of `timestamp`, stored so day filters can use the index
+    snapshot_day: date = Field(default_factory=_utc_today)
+
+class PriceInterval(SQLModel, table=True):
+    """
+    Run-length price history: one row per run of consecutive days with the same
+    price (see services/price_history.py).
+    """
+    __table_args__ = (
+        Index("ux_priceinterval_product_from", "product_id", "valid_from", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    product_id: int = Field(foreign_key="product.id")
+    price_agorot: int
+    valid_from: date          # first day with this price (UTC)
+    valid_to: date            # last day observed with it, inclusive
+    days: int = 1             # valid_to - valid_from + 1, stored so SUM() stays portable
+
+class ProductLatestPrice(SQLModel, table=True):
+    """
+    Current price of each product, one row per product. Upserted by every persist path
+    (bulk sync, write-behind, register_PriceSnapshot) so read endpoints never scan
+    pricesnapshot; rebuild with scripts/rebuild_latest_prices.py.
+    """
+    __tablename__ = "product_latest_price"
+
+    product_id: int = Field(primary_key=True, foreign_key="product.id")
+    price_agorot: int
+    # when the price last differed from the previous observation
+    last_changed: datetime = Field(default_factory=datetime.utcnow)
+
+class PriceChange(SQLModel, table=True):
+    """
+    One price change of a product, recorded by the persist paths from the diff against
+    product_latest_price (services/price_changes.py); serves /prices/deals.
+    A second change on the same day updates the row, keeping the day's first old price.
+    """
+    __tablename__ = "price_change"
+    __table_args__ = (
+        Index("ux_price_change_product_day", "product_id", "day", unique=True),
+        Index("ix_price_change_day_pct", "day", "change_pct"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    product_id: int = Field(foreign_key="product.id")
+    day: date                         # UTC day the new price was first seen
+    old_agorot: int
+    new_agorot: int
+    change_pct: float                 # (new - old) / old × 100; negative = price drop
+    detected_at: datetime = Field(default_factory=datetime.utcnow)
+
+class PriceRollup(SQLModel, table=True):
+    """
+    Per product per week / month price stats, folded from priceinterval after each sync
+    (services/price_rollups.py); serves long-range charts without reading the raw history.
+    """
+    __tablename__ = "price_rollup"
+    __table_args__ = (
+        Index("ux_price_rollup_product_period", "product_id", "period", "period_start", unique=True),
+        # category rollup refresh and the category index read whole periods
+        Index("ix_price_rollup_period_start", "period", "period_start"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    product_id: int = Field(foreign_key="product.id")
+    period: str                       # week (starts Monday) | month
+    period_start: date
+    min_agorot: int
+    max_agorot: int
+    # sum of daily prices; avg = sum_agorot / days
+    sum_agorot: int = Field(sa_column=Column(BigInteger, nullable=False))
+    days: int                         # observed days in the period
+    last_agorot: int                  # price on the last observed day
+    last_day: date
+
+class CategoryPriceRollup(SQLModel, table=True):
+    """Per source + prod_category per week / month, aggregated from price_rollup."""
+    __tablename__ = "category_price_rollup"
+    __table_args__ = (
+        Index(
+            "ux_category_price_rollup_period",
+            "source_id", "prod_category", "period", "period_start",
+            unique=True,
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    source_id: int = Field(foreign_key="source.id")
+    prod_category: str
+    period: str
+    period_start: date
+    min_agorot: int
+    max_agorot: int
+    sum_agorot: int = Field(sa_column=Column(BigInteger, nullable=False))
+    days: int                         # product-days observed
+    last_agorot: int                  # mean of the products' last prices
+    products: int
+
+class CatalogGeneration(SQLModel, table=True):
+    """Bumped after every catalog sync so API workers know to reload in-memory indexes."""
+    source_id: int = Field(primary_key=True, foreign_key="source.id")
+    generation: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SyncRun(SQLModel, table=True):
+    """One catalog sync attempt; lets an interrupted sync resume (see sync_all_to_db(resume=True))."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    source_id: int = Field(foreign_key="source.id", index=True)
+    status: str = "running"           # running | failed | completed
+    subcategories: str                # JSON list of {id, name} captured at run start
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+
+class SyncRunSubcategory(SQLModel, table=True):
+    """Checkpoint: one completed subcategory of a SyncRun."""
+    __table_args__ = (
+        Index("ux_syncrunsubcategory_run_sub", "run_id", "subcategory_id", unique=True),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_id: int = Field(foreign_key="syncrun.id")
+    subcategory_id: int
+    item_count: int = 0
+    completed_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ReplicationWatermark(SQLModel, table=True):
+    """High-water mark of one replicated table from one peer database (services/replication.py)."""
+    __tablename__ = "replication_watermark"
+
+    peer: str = Field(primary_key=True)        # describe_db_target() of the database copied from
+    table_name: str = Field(primary_key=True)
+    last_id: int = 0                           # highest source-side id copied
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SchemaMigration(SQLModel, table=True):
+    """One applied buy_smart schema migration (init_db.run_migrations)."""
+    __tablename__ = "buy_smart_schema_migration"
+
+    version: int = Field(primary_key=True)
+    name: str
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
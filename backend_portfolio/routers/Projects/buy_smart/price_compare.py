@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Query
 
-from .scrapers.manager import search_all, get_categories, _use_db_search
+from .scrapers.db_search import find_products_by_name
+from .scrapers.manager import search_all_with_meta, get_categories, _use_db_search
+from .services.cache import cache_stats
+from .services.write_behind import live_search_writer
 
 router = APIRouter(prefix="/scrapers")
 
@@ -11,21 +14,45 @@ def list_sources():
 
 
 @router.get("/search")
-def search(
+async def search(
     q: str,
     sources: str = "all",
     limit: int = Query(50, ge=1, le=200),
 ):
-    results = search_all(q, sources=sources, limit=limit)
+    results, source_meta = await search_all_with_meta(q, sources=sources, limit=limit)
     total = sum(len(block.get("searched_results") or []) for block in results)
     return {
         "query": q,
         "results": results,
         "total_results": total,
         "mode": "db" if _use_db_search() else "live",
+        # per source: status ok | cached | timeout | error, elapsed_ms
+        "sources": source_meta,
+        "partial": any(meta["status"] in ("timeout", "error") for meta in source_meta),
     }
 
 
+@router.get("/matches")
+def matches(
+    name: str,
+    exclude: str | None = None,
+    limit: int = Query(50, ge=1, le=200),
+):
+    """The same item at other stores: products whose normalized name equals `name`'s."""
+    return {"name": name, "results": find_products_by_name(name, exclude_source=exclude, limit=limit)}
+
+
 @router.get("/getCategories")
 def getCats():
     return get_categories()
+
+
+@router.get("/cacheStats")
+def get_cache_stats():
+    return cache_stats()
+
+
+@router.get("/writeBehindStats")
+def get_write_behind_stats():
+    """Live-mode persistence queue: depth, flush latency, dropped rows."""
+    return live_search_writer.stats()
@@ -1,16 +1,23 @@
 """Search Buy Smart products from Supabase / Postgres (or local SQLite)."""
 from __future__ import annotations
 
-import re
 from sqlmodel import Session, select
 from sqlalchemy import or_
 
 from backend_portfolio.buy_smart_db import buy_smart_engine
 from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
     Product,
-    PriceSnapshot,
+    ProductLatestPrice,
     Source,
 )
+from backend_portfolio.routers.Projects.buy_smart.scrapers.search_index import (
+    MIN_INDEXED_TERM_LEN,
+    postgres_rank,
+    sqlite_fts_available,
+    sqlite_match_subquery,
+)
+from backend_portfolio.routers.Projects.buy_smart.services.price_history import from_agorot
+from backend_portfolio.routers.Projects.buy_smart.utils.normalizers import normalize_text
 
 # Map API source filter values → Source.name in DB
 _SOURCE_ALIASES = {
@@ -18,29 +25,11 @@ _SOURCE_ALIASES = {
     "hetzi": "hetzi",
     "hetzi-hinam": "hetzi",
     "hazi-hinam": "hetzi",
+    "shufersal": "shufersal",
 }
 
-_PRODUCT_URL_RE = re.compile(r"/catalog/products/\d+/([^/]+)/")
-
-
-def _parse_barkod_from_url(url: str | None) -> str | None:
-    if not url:
-        return None
-    m = _PRODUCT_URL_RE.search(url)
-    return m.group(1) if m else None
-
 
-def _latest_snapshot(session: Session, product_id: int) -> PriceSnapshot | None:
-    return session.exec(
-        select(PriceSnapshot)
-        .where(PriceSnapshot.product_id == product_id)
-        .order_by(PriceSnapshot.timestamp.desc())
-        .limit(1)
-    ).first()
-
-
-def _row_to_search_item(product: Product, snap: PriceSnapshot | None) -> dict:
-    barkod = _parse_barkod_from_url(snap.url if snap else None)
+def _row_to_search_item(product: Product, latest: ProductLatestPrice | None) -> dict:
     return {
         "internal_product_id": product.id,
         "prod_id": product.external_prod_id,
@@ -50,15 +39,57 @@ def _row_to_search_item(product: Product, snap: PriceSnapshot | None) -> dict:
         "prod_cat_name": product.prod_category,
         "prod_sub_cat_id": None,
         "prod_sub_cat_name": product.prod_category,
-        "prod_unit_size_desc": snap.unit if snap else None,
-        "prod_unit_size": snap.unit_size if snap else None,
+        "prod_unit_size_desc": product.unit,
+        "prod_unit_size": product.unit_size,
         "prod_price_per_unit": None,
-        "prod_price_net": snap.price if snap else None,
-        "prod_price_un_desc": snap.price_per_unit_desc if snap else None,
-        "prod_barkod": barkod,
+        "prod_price_net": from_agorot(latest.price_agorot) if latest else None,
+        "prod_price_un_desc": product.price_per_unit_desc,
+        "prod_barkod": product.barcode,
     }
 
 
+def search_products_stmt(q: str, *, sources: str = "all", limit: int = 50, engine=buy_smart_engine):
+    """
+    The SELECT (Product, ProductLatestPrice) behind search_products_from_db(), for `engine`'s
+    backend: FTS5 join on SQLite, pg_trgm-served ILIKE + similarity() ranking on Postgres.
+    None when `q` normalizes to nothing. scripts/check_query_plans.py EXPLAINs it.
+    """
+    term = (q or "").strip()
+    name_term = normalize_text(term)
+    if not name_term:
+        return None
+
+    source_name = _SOURCE_ALIASES.get(sources.lower(), sources.lower())
+    indexed = min(len(term), len(name_term)) >= MIN_INDEXED_TERM_LEN
+    sqlite = engine.dialect.name == "sqlite"
+
+    stmt = (
+        select(Product, ProductLatestPrice)
+        .join(Source, Product.source_id == Source.id)
+        .outerjoin(ProductLatestPrice, ProductLatestPrice.product_id == Product.id)
+    )
+    if indexed and sqlite and sqlite_fts_available(engine):
+        fts = sqlite_match_subquery(name_term, term)
+        stmt = stmt.join(fts, fts.c.product_id == Product.id).order_by(
+            fts.c.rank, Product.prod_name
+        )
+    else:
+        stmt = stmt.where(
+            or_(
+                Product.normalized_name.ilike(f"%{name_term}%"),
+                Product.prod_category.ilike(f"%{term}%"),
+            )
+        )
+        if indexed and not sqlite:
+            stmt = stmt.order_by(postgres_rank(name_term, term).desc(), Product.prod_name)
+        else:
+            stmt = stmt.order_by(Product.prod_name)
+    stmt = stmt.limit(min(limit, 200))
+    if source_name:
+        stmt = stmt.where(Source.name == source_name)
+    return stmt
+
+
 def search_products_from_db(
     q: str,
     *,
@@ -68,57 +99,84 @@ def search_products_from_db(
     """
     Return the same shape as live scraper search_all():
     [{"searched_results": [...]}]
+
+    Matches `q` anywhere in the product name (normalized, see utils/normalizers.py) or
+    category (substring, case-insensitive) and orders by relevance when a search index
+    is available (see search_index.py).
     """
-    term = (q or "").strip()
-    if not term:
+    stmt = search_products_stmt(q, sources=sources, limit=limit)
+    if stmt is None:
         return [{"searched_results": []}]
 
-    source_name = _SOURCE_ALIASES.get(sources.lower(), sources.lower())
-    pattern = f"%{term}%"
-
     with Session(buy_smart_engine) as session:
-        stmt = (
-            select(Product, Source)
-            .join(Source, Product.source_id == Source.id)
-            .where(
-                or_(
-                    Product.prod_name.ilike(pattern),
-                    Product.prod_category.ilike(pattern),
-                )
-            )
-            .order_by(Product.prod_name)
-            .limit(min(limit, 200))
-        )
-        if source_name:
-            stmt = stmt.where(Source.name == source_name)
-
         rows = session.exec(stmt).all()
-        items: list[dict] = []
-        for product, _source in rows:
-            snap = _latest_snapshot(session, product.id)
-            items.append(_row_to_search_item(product, snap))
+        items = [_row_to_search_item(product, snap) for product, snap in rows]
 
     return [{"searched_results": items}]
 
 
-def get_categories_from_db() -> list[dict]:
+def find_products_stmt(name: str, *, exclude_source: str | None = None, limit: int = 50):
+    """The SELECT behind find_products_by_name(); None when `name` normalizes to nothing."""
+    key = normalize_text(name)
+    if not key:
+        return None
+    stmt = (
+        select(Product, ProductLatestPrice)
+        .join(Source, Product.source_id == Source.id)
+        .outerjoin(ProductLatestPrice, ProductLatestPrice.product_id == Product.id)
+        .where(Product.normalized_name == key)
+        .order_by(Source.name, Product.id)
+        .limit(min(limit, 200))
+    )
+    if exclude_source:
+        stmt = stmt.where(Source.name != _SOURCE_ALIASES.get(exclude_source.lower(), exclude_source.lower()))
+    return stmt
+
+
+def find_products_by_name(name: str, *, exclude_source: str | None = None, limit: int = 50) -> list[dict]:
     """
-    Distinct product categories stored during weekly sync.
-    Same shape as live get_categories(): [{"source": "hetzi", "data": [{id, name}, ...]}]
+    Products whose normalized name equals normalize_text(name) — the same item under
+    another store's spelling (cross-store matching) or a duplicate listing.
+    Same item shape as search_products_from_db().
     """
+    stmt = find_products_stmt(name, exclude_source=exclude_source, limit=limit)
+    if stmt is None:
+        return []
     with Session(buy_smart_engine) as session:
-        stmt = (
-            select(Product.prod_category)
-            .join(Source, Product.source_id == Source.id)
-            .where(Source.name == "hetzi", Product.prod_category.isnot(None))
-            .distinct()
-            .order_by(Product.prod_category)
-        )
-        names = [row for row in session.exec(stmt).all() if row]
+        return [_row_to_search_item(product, latest) for product, latest in session.exec(stmt).all()]
+
 
+def category_blocks(category_names: dict[str, list[str]]) -> list[dict]:
+    """source name → category names, as getCategories blocks (one per source, by name)."""
     return [
         {
-            "source": "hetzi",
+            "source": source_name,
             "data": [{"id": idx, "name": name} for idx, name in enumerate(names)],
         }
+        for source_name, names in sorted(category_names.items())
     ]
+
+
+def categories_stmt():
+    """The SELECT behind get_categories_from_db(): distinct (source name, category)."""
+    return (
+        select(Source.name, Product.prod_category)
+        .join(Source, Product.source_id == Source.id)
+        .where(Product.prod_category.isnot(None))
+        .distinct()
+        .order_by(Source.name, Product.prod_category)
+    )
+
+
+def get_categories_from_db() -> list[dict]:
+    """
+    Distinct product categories stored during weekly sync, per source.
+    Same shape as live get_categories(): [{"source": "hetzi", "data": [{id, name}, ...]}, ...]
+    """
+    with Session(buy_smart_engine) as session:
+        category_names: dict[str, list[str]] = {}
+        for source_name, name in session.exec(categories_stmt()).all():
+            if name:
+                category_names.setdefault(source_name, []).append(name)
+
+    return category_blocks(category_names)
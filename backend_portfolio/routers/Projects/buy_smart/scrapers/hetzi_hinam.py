@@ -1,8 +1,22 @@
+import asyncio
 import time
 import httpx
 from urllib.parse import unquote
 import json
-from .scrapers_register import register_source, register_product, register_PriceSnapshot
+from .scrapers_register import (
+    bulk_register_items,
+    find_resumable_sync_run,
+    finish_sync_run,
+    load_latest_prices,
+    lookup_product_ids,
+    mark_subcategory_done,
+    start_sync_run,
+    register_source,
+    register_product,
+    register_PriceSnapshot,
+)
+from backend_portfolio.routers.Projects.buy_smart.services.write_behind import live_search_writer
+from backend_portfolio.routers.Projects.buy_smart.utils.http import http_layer
 
 
 class HetziHinamScraper:
@@ -17,23 +31,26 @@ class HetziHinamScraper:
     name = "hetzi"
     BASE = "https://shop.hazi-hinam.co.il"
 
+    SUBCATEGORY_PATH = "/proxy/api/item/getItemsBySubCategory"
+    SUBCATEGORY_TIMEOUT = 120
+
     def __init__(self):
-        self.client = httpx.Client(
-            base_url=self.BASE,
-            timeout=20,
-            headers={
-                "Accept": "application/json, text/plain, */*",
-                "Content-Type": "application/json; charset=UTF-8",
-                "Origin": self.BASE,
-                "Referer": self.BASE + "/",
-                "User-Agent": "Mozilla/5.0",
-                "Cache-Control": "no-cache, no-store",
-                "Pragma": "no-cache",
-            },
-            follow_redirects=True,
-        )
+        # Own cookie jar (guest token), shared keep-alive pool / retries / metrics
+        self.client = http_layer.client(base_url=self.BASE, timeout=20, headers=self.default_headers())
         self._guest_obtained_at = 0.0
         self._guest_expires_in = 0
+        self._cached_source_id: int | None = None
+
+    def default_headers(self) -> dict:
+        return {
+            "Accept": "application/json, text/plain, */*",
+            "Content-Type": "application/json; charset=UTF-8",
+            "Origin": self.BASE,
+            "Referer": self.BASE + "/",
+            "User-Agent": "Mozilla/5.0",
+            "Cache-Control": "no-cache, no-store",
+            "Pragma": "no-cache",
+        }
 
     # --------- guest bootstrap ---------
     def _parse_h_auth_cookie(self) -> tuple[str | None, int]:
@@ -83,6 +100,31 @@ class HetziHinamScraper:
         return r
 
     # --------- DB helpers (shared by search + bulk sync) ---------
+    @staticmethod
+    def _barcode(item: dict) -> str | None:
+        barcode = item.get("BarKod")
+        return str(barcode) if barcode not in (None, "") else None
+
+    def _item_to_row(self, item: dict) -> dict:
+        """Hetzi item → row for scrapers_register.bulk_register_items()."""
+        return {
+            "external_prod_id": item.get("Id"),
+            "prod_name": item.get("Name"),
+            "prod_category": item.get("CategoryName") or item.get("_subcategory_name"),
+            "image_url": item.get("Img"),
+            "barcode": self._barcode(item),
+            "price": item.get("Price_NET"),
+            "unit": item.get("UnitSizeDesc"),
+            "unit_size": item.get("UnitSize"),
+            "price_per_unit_desc": item.get("PricePerUnitDesc"),
+        }
+
+    def _persist_batch(self, src, items: list[dict], *, latest: dict | None = None) -> dict:
+        """Save many Hetzi items in one transaction (bulk sync). See bulk_register_items()."""
+        return bulk_register_items(
+            src.id, [self._item_to_row(item) for item in items], latest=latest
+        )
+
     def _persist_item(self, src, item: dict, *, category_name: str | None = None) -> dict:
         """Save one Hetzi item to buy_smart.db and return the API-facing dict."""
         cat = category_name or item.get("CategoryName") or item.get("_subcategory_name")
@@ -92,17 +134,20 @@ class HetziHinamScraper:
             prod_name=item.get("Name"),
             prod_category=cat,
             image_url=item.get("Img"),
-        )
-        register_PriceSnapshot(
-            product_id=p.id,
-            price=item.get("Price_NET"),
+            barcode=self._barcode(item),
             unit=item.get("UnitSizeDesc"),
             unit_size=item.get("UnitSize"),
             price_per_unit_desc=item.get("PricePerUnitDesc"),
-            url=f"{self.BASE}/catalog/products/{item.get('Id')}/{item.get('BarKod')}/{item.get('Name')}",
         )
+        register_PriceSnapshot(product_id=p.id, price=item.get("Price_NET"))
+        return self._item_to_response(item, p.id, category_name=cat)
+
+    @staticmethod
+    def _item_to_response(item: dict, internal_id: int | None, *, category_name: str | None = None) -> dict:
+        """Hetzi item → API-facing dict (search results)."""
+        cat = category_name or item.get("CategoryName") or item.get("_subcategory_name")
         return {
-            "internal_product_id": p.id,
+            "internal_product_id": internal_id,
             "prod_id": item.get("Id"),
             "prod_name": item.get("Name"),
             "prod_img": item.get("Img"),
@@ -155,26 +200,18 @@ class HetziHinamScraper:
         return subs
 
     # --------- products per subcategory (step 2 of bulk sync) ---------
-    def fetch_subcategory_items(self, sub_id: int) -> list[dict]:
-        """
-        GET /proxy/api/item/getItemsBySubCategory?Id=...
-        Returns Items[] for one subcategory.
-        JSON path: Results → Category → SubCategory → Items
-        """
-        params = {
+    @staticmethod
+    def subcategory_params(sub_id: int) -> dict:
+        return {
             "Id": sub_id,
             "IsDescending": "false",
             "SortBy": "-1",
             "filter[FILTER_Mivza]": "false",
         }
-        r = self._request_with_guest(
-            "GET",
-            "/proxy/api/item/getItemsBySubCategory",
-            params=params,
-            timeout=120,
-        )
-        r.raise_for_status()
-        data = r.json()
+
+    @staticmethod
+    def subcategory_items(data: dict) -> list[dict]:
+        """JSON path: Results → Category → SubCategory → Items"""
         return (
             data.get("Results", {})
             .get("Category", {})
@@ -183,7 +220,74 @@ class HetziHinamScraper:
             or []
         )
 
-    def fetch_all_products(self, delay_sec: float = 0.3) -> list[dict]:
+    def fetch_subcategory_items(self, sub_id: int) -> list[dict]:
+        """
+        GET /proxy/api/item/getItemsBySubCategory?Id=...
+        Returns Items[] for one subcategory.
+        """
+        r = self._request_with_guest(
+            "GET",
+            self.SUBCATEGORY_PATH,
+            params=self.subcategory_params(sub_id),
+            timeout=self.SUBCATEGORY_TIMEOUT,
+        )
+        r.raise_for_status()
+        return self.subcategory_items(r.json())
+
+    def iter_subcategory_items(
+        self,
+        subs: list[dict],
+        *,
+        delay_sec: float = 0.3,
+        concurrency: int = 1,
+        rate_per_sec: float | None = None,
+    ):
+        """
+        Yield (sub, items) for every subcategory, in catalog order.
+        concurrency == 1 → one request at a time with `delay_sec` between them.
+        concurrency  > 1 → services.scraping_worker (async, token-bucket rate limit, retries).
+        """
+        if concurrency <= 1:
+            for sub in subs:
+                yield sub, self.fetch_subcategory_items(sub["id"])
+                if delay_sec:
+                    time.sleep(delay_sec)
+            return
+
+        from backend_portfolio.routers.Projects.buy_smart.services.scraping_worker import (
+            DEFAULT_RATE_PER_SEC,
+            fetch_subcategories_concurrently,
+        )
+
+        results, _stats = fetch_subcategories_concurrently(
+            self,
+            subs,
+            concurrency=concurrency,
+            rate_per_sec=rate_per_sec or DEFAULT_RATE_PER_SEC,
+        )
+        yield from zip(subs, results)
+
+    @staticmethod
+    def _new_items(sub: dict, items: list[dict], seen_ids: set[int]) -> list[dict]:
+        """Items not seen in an earlier subcategory, tagged with this subcategory."""
+        fresh = []
+        for item in items:
+            pid = item.get("Id")
+            if pid is None or pid in seen_ids:
+                continue
+            seen_ids.add(pid)
+            item["_subcategory_id"] = sub["id"]
+            item["_subcategory_name"] = sub["name"]
+            fresh.append(item)
+        return fresh
+
+    def fetch_all_products(
+        self,
+        delay_sec: float = 0.3,
+        *,
+        concurrency: int = 1,
+        rate_per_sec: float | None = None,
+    ) -> list[dict]:
         """
         Loop every subcategory Id from Catalog/get and merge all Items.
         Deduplicates by product Id (same product can appear in multiple subcategories).
@@ -192,50 +296,136 @@ class HetziHinamScraper:
         seen_ids: set[int] = set()
         all_items: list[dict] = []
 
-        for sub in subs:
-            items = self.fetch_subcategory_items(sub["id"])
-            for item in items:
-                pid = item.get("Id")
-                if pid is None or pid in seen_ids:
-                    continue
-                seen_ids.add(pid)
-                item["_subcategory_id"] = sub["id"]
-                item["_subcategory_name"] = sub["name"]
-                all_items.append(item)
-            if delay_sec:
-                time.sleep(delay_sec)
+        for sub, items in self.iter_subcategory_items(
+            subs, delay_sec=delay_sec, concurrency=concurrency, rate_per_sec=rate_per_sec
+        ):
+            all_items.extend(self._new_items(sub, items, seen_ids))
 
         return all_items
 
-    def sync_all_to_db(self, delay_sec: float = 0.3) -> dict:
+    def sync_all_to_db(
+        self,
+        delay_sec: float = 0.3,
+        *,
+        concurrency: int = 1,
+        rate_per_sec: float | None = None,
+        delta: bool = False,
+        resume: bool = False,
+        batch_size: int = 500,
+    ) -> dict:
         """
         Full catalog sync: fetch all subcategories → save every product to buy_smart.db.
+        Fetching, parsing and DB writes run as a streaming pipeline
+        (services.sync_pipeline): subcategories are fetched concurrently while earlier
+        ones are written in batches of ~batch_size rows (set-based upserts).
+        delta=True preloads the latest price of every product and only writes snapshots
+        for new products and changed prices.
+
+        Progress is checkpointed per subcategory in syncrun / syncrunsubcategory.
+        resume=True continues the last unfinished run: it reuses that run's subcategory
+        list (no Catalog/get) and skips completed subcategories. Re-writing a
+        subcategory is safe — the product / per-day snapshot uniqueness rules apply.
         Run locally (Hetzi blocks cloud hosts like Render).
         """
         src = register_source(name=self.name, base_url=self.BASE)
-        subs = self.list_subcategories()
+        latest = load_latest_prices(src.id) if delta else None
+
+        resumable = find_resumable_sync_run(src.id) if resume else None
+        if resumable:
+            run_id, subs, completed = resumable
+        else:
+            subs = self.list_subcategories()
+            run_id, completed = start_sync_run(src.id, subs), set()
+        pending = [sub for sub in subs if sub["id"] not in completed]
+
         seen_ids: set[int] = set()
-        saved = 0
-
-        for sub in subs:
-            items = self.fetch_subcategory_items(sub["id"])
-            for item in items:
-                pid = item.get("Id")
-                if pid is None or pid in seen_ids:
-                    continue
-                seen_ids.add(pid)
-                item["_subcategory_id"] = sub["id"]
-                item["_subcategory_name"] = sub["name"]
-                self._persist_item(src, item)
-                saved += 1
-            if delay_sec:
-                time.sleep(delay_sec)
 
-        return {
+        def parse(sub: dict, items: list[dict]) -> list[dict]:
+            return [self._item_to_row(item) for item in self._new_items(sub, items, seen_ids)]
+
+        def persist(rows: list[dict]) -> dict:
+            return bulk_register_items(src.id, rows, latest=latest)
+
+        def checkpoint(sub: dict, item_count: int) -> None:
+            mark_subcategory_done(run_id, sub["id"], item_count)
+
+        try:
+            pipeline = asyncio.run(
+                self._run_sync_pipeline(
+                    pending,
+                    parse=parse,
+                    persist=persist,
+                    checkpoint=checkpoint,
+                    delay_sec=delay_sec,
+                    concurrency=concurrency,
+                    rate_per_sec=rate_per_sec,
+                    batch_size=batch_size,
+                )
+            )
+        except BaseException as exc:
+            finish_sync_run(run_id, "failed", error=repr(exc))
+            raise
+        finish_sync_run(run_id, "completed")
+        totals = pipeline["persist_totals"]
+
+        stats = {
             "source": self.name,
-            "subcategories_fetched": len(subs),
-            "unique_products_saved": saved,
+            "sync_run_id": run_id,
+            "resumed": bool(resumable),
+            "subcategories_fetched": len(pending),
+            "subcategories_skipped": len(subs) - len(pending),
+            "unique_products_saved": pipeline["rows"],
+            "snapshots_inserted": totals.get("snapshots_inserted", 0),
+            "price_changes": totals.get("price_changes", 0),
+            "batches_written": pipeline["batches"],
+            "elapsed_seconds": pipeline["elapsed_seconds"],
+            "persist_seconds": pipeline["persist_seconds"],
         }
+        if delta:
+            stats.update(
+                products_new=totals.get("new", 0),
+                prices_changed=totals.get("changed", 0),
+                prices_unchanged=totals.get("unchanged", 0),
+            )
+        return stats
+
+    async def _run_sync_pipeline(
+        self,
+        subs: list[dict],
+        *,
+        parse,
+        persist,
+        checkpoint,
+        delay_sec: float,
+        concurrency: int,
+        rate_per_sec: float | None,
+        batch_size: int,
+    ) -> dict:
+        """Stream subcategories through services.sync_pipeline on the shared guest session."""
+        from backend_portfolio.routers.Projects.buy_smart.services.scraping_worker import (
+            DEFAULT_RATE_PER_SEC,
+            HetziSubcategoryFetcher,
+        )
+        from backend_portfolio.routers.Projects.buy_smart.services.sync_pipeline import (
+            run_catalog_pipeline,
+        )
+
+        if rate_per_sec is None:
+            # Sequential default keeps the old pacing: one request per `delay_sec`.
+            rate_per_sec = (1 / delay_sec if delay_sec else 0) if concurrency <= 1 else DEFAULT_RATE_PER_SEC
+
+        async with HetziSubcategoryFetcher(
+            self, concurrency=concurrency, rate_per_sec=rate_per_sec
+        ) as fetcher:
+            return await run_catalog_pipeline(
+                subs,
+                fetch=lambda sub: fetcher.fetch_subcategory_items(sub["id"]),
+                parse=parse,
+                persist=persist,
+                on_partition_done=checkpoint,
+                batch_size=batch_size,
+                queue_size=max(2, concurrency * 2),
+            )
 
     # --------- existing API used by Buy Smart search UI ---------
     def fetch_categories(self):
@@ -246,8 +436,20 @@ class HetziHinamScraper:
         cats = results.get("Categories", [])
         return [{"id": c.get("Id"), "name": c.get("Name")} for c in cats]
 
+    def _source_id(self) -> int:
+        """Source.id, looked up once per process (register_source runs create_all + a query)."""
+        if self._cached_source_id is None:
+            self._cached_source_id = register_source(name=self.name, base_url=self.BASE).id
+        return self._cached_source_id
+
     def search(self, q: str, page: int = 1, page_size: int = 10):
-        src = register_source(name=self.name, base_url=self.BASE)
+        """
+        Live search. The response is built from the Hetzi payload; saving the hits is
+        handed to the write-behind queue (services.write_behind), off the request path.
+        internal_product_id comes from one batched lookup and is None for products
+        that are not in the DB yet (they are, after the next flush).
+        """
+        source_id = self._source_id()
         payload = {
             "Object": {"SearchPhrase": q, "SearchPhrases": None, "ItemGroupping": 1},
             "Paging": {"Page": page, "PageSize": page_size},
@@ -256,11 +458,20 @@ class HetziHinamScraper:
         if not r.content:
             return {"IsOK": False, "Results": None, "ErrorResponse": {"ErrorDescription": "Empty response body"}}
         data = r.json()
-        searched_results = []
-        for cat in data.get("Results", {}).get("Categories", []):
-            for item in cat.get("Items", []):
-                searched_results.append(self._persist_item(src, item))
-                if len(searched_results) >= page_size:
-                    return {"searched_results": searched_results}
-
-        return {"searched_results": searched_results}
+        items = [
+            item
+            for cat in data.get("Results", {}).get("Categories", [])
+            for item in cat.get("Items", [])
+        ][:page_size]
+
+        # one row bulk_register_items rejects would fail the source's whole coalesced flush
+        rows = [self._item_to_row(item) for item in items]
+        live_search_writer.enqueue(
+            source_id, [row for row in rows if row["external_prod_id"] is not None and row["price"] is not None]
+        )
+        internal_ids = lookup_product_ids(source_id, [item.get("Id") for item in items])
+        return {
+            "searched_results": [
+                self._item_to_response(item, internal_ids.get(item.get("Id"))) for item in items
+            ]
+        }
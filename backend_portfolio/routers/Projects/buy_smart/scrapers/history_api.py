@@ -1,14 +1,28 @@
 from __future__ import annotations
 
-from datetime import datetime, date
-from typing import Dict, List, Optional
+from datetime import date, datetime
+from itertools import groupby
+from typing import Dict, List, Literal, Optional
 
 from fastapi import APIRouter, Query
 from sqlmodel import Session, select
-from sqlalchemy import func
+from sqlalchemy import Float, and_, cast, func
+from sqlalchemy.orm import aliased
 
 from backend_portfolio.buy_smart_db import buy_smart_engine
-from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import PriceSnapshot
+from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+    CategoryPriceRollup,
+    PriceChange,
+    PriceInterval,
+    PriceRollup,
+    Product,
+    Source,
+)
+from backend_portfolio.routers.Projects.buy_smart.scrapers.db_search import _SOURCE_ALIASES
+from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import product_url
+from backend_portfolio.routers.Projects.buy_smart.services.cache import history_cache
+from backend_portfolio.routers.Projects.buy_smart.services.price_history import expand_interval_days, from_agorot
+from backend_portfolio.routers.Projects.buy_smart.services.price_rollups import periods_back, rollup_values
 
 router = APIRouter(prefix="/prices", tags=["buy-smart"])
 
@@ -20,6 +34,11 @@ def get_prices_history(
 ):
     """
     Returns per-product daily price history for products that have >= min_days distinct dates.
+    Read from the run-length priceinterval table and expanded to one entry per day —
+    catalogs synced with --delta store no snapshot for an unchanged price, but sync
+    stretches the product's interval through the days it was seen, so a missing day
+    means the product wasn't in that day's catalog;
+    unit / size / description are the product's current values.
     Output shape:
     {
       "history": {
@@ -28,56 +47,328 @@ def get_prices_history(
       }
     }
     """
+    key = (tuple(sorted(set(product_ids))), min_days, per_product_limit)
+    return history_cache.get_or_compute(
+        key, lambda: _load_prices_history(product_ids, min_days, per_product_limit)
+    )
+
+
+def _load_prices_history(product_ids: List[int], min_days: int, per_product_limit: int) -> dict:
+    # 1) product_ids with >= min_days recorded days (sum of interval lengths)
+    qualifying = (
+        select(PriceInterval.product_id)
+        .where(PriceInterval.product_id.in_(product_ids))
+        .group_by(PriceInterval.product_id)
+        .having(func.sum(PriceInterval.days) >= min_days)
+    )
+
+    # 2) newest intervals per product until they cover per_product_limit days — trimmed in SQL
+    ranked = (
+        select(
+            PriceInterval.product_id,
+            PriceInterval.valid_from,
+            PriceInterval.valid_to,
+            PriceInterval.price_agorot,
+            func.sum(PriceInterval.days)
+            .over(partition_by=PriceInterval.product_id, order_by=PriceInterval.valid_from.desc())
+            .label("days_through"),
+            PriceInterval.days,
+        )
+        .where(PriceInterval.product_id.in_(qualifying))
+        .subquery("ranked")
+    )
+    stmt = (
+        select(
+            ranked,
+            Source.name.label("source_name"),
+            Source.base_url,
+            Product.external_prod_id,
+            Product.prod_name,
+            Product.barcode,
+            Product.unit,
+            Product.unit_size,
+            Product.price_per_unit_desc,
+        )
+        .join(Product, Product.id == ranked.c.product_id)
+        .join(Source, Source.id == Product.source_id)
+        .where(ranked.c.days_through - ranked.c.days < per_product_limit)
+        .order_by(ranked.c.product_id, ranked.c.valid_from.desc())
+    )
     with Session(buy_smart_engine) as session:
-        # 1) Find which product_ids have >= min_days DISTINCT dates
-        qualifying_stmt = (
-            select(
-                PriceSnapshot.product_id,
-                func.count(func.distinct(func.date(PriceSnapshot.timestamp))).label("day_count"),
-            )
-            .where(PriceSnapshot.product_id.in_(product_ids))
-            .group_by(PriceSnapshot.product_id)
-            .having(func.count(func.distinct(func.date(PriceSnapshot.timestamp))) >= min_days)
+        rows = session.execute(stmt).all()
+
+    # 3) Expand intervals back to one entry per day (rows arrive grouped by product, latest first)
+    history: Dict[str, List[dict]] = {}
+    for product_id, intervals in groupby(rows, key=lambda row: row.product_id):
+        intervals = list(intervals)
+        first = intervals[0]
+        url = product_url(first.source_name, first.base_url, first.external_prod_id, first.barcode, first.prod_name)
+        history[str(product_id)] = [
+            {
+                "day": day.isoformat(),
+                "price": from_agorot(interval.price_agorot),
+                "unit": first.unit,
+                "unit_size": first.unit_size,
+                "price_per_unit_desc": first.price_per_unit_desc,
+                "url": url,
+            }
+            for day, interval in expand_interval_days(intervals, per_product_limit)
+        ]
+
+    return {"history": history}
+
+
+# --------- long-range rollups (price_rollup / category_price_rollup) ---------
+Period = Literal["week", "month"]
+
+
+def _window_start(period: str, periods: int):
+    return periods_back(datetime.utcnow().date(), period, periods)
+
+
+def _source_filter(source: str):
+    source_name = _SOURCE_ALIASES.get(source.lower(), source.lower())
+    return Source.name == source_name if source_name else None
+
+
+@router.get("/rollups")
+def get_price_rollups(
+    product_ids: List[int] = Query(..., description="One or more internal product IDs"),
+    period: Period = Query("month", description="week (Monday-based) or month"),
+    periods: int = Query(12, ge=1, le=260, description="How many periods back, current one included"),
+):
+    """
+    Per-product min / max / avg / last price per week or month, for long-range charts.
+    Output shape:
+    {
+      "period": "month",
+      "rollups": {
+        "12": [{"period_start":"2026-01-01","min":8.9,"max":9.9,"avg":9.23,"last":9.9,"days":31}, ...]
+      }
+    }
+    """
+    key = ("rollups", tuple(sorted(set(product_ids))), period, periods)
+    return history_cache.get_or_compute(key, lambda: _load_price_rollups(product_ids, period, periods))
+
+
+def _load_price_rollups(product_ids: List[int], period: str, periods: int) -> dict:
+    stmt = (
+        select(PriceRollup)
+        .where(
+            PriceRollup.product_id.in_(product_ids),
+            PriceRollup.period == period,
+            PriceRollup.period_start >= _window_start(period, periods),
+        )
+        .order_by(PriceRollup.product_id, PriceRollup.period_start)
+    )
+    with Session(buy_smart_engine) as session:
+        rows = session.exec(stmt).all()
+    return {
+        "period": period,
+        "rollups": {
+            str(product_id): [rollup_values(row) for row in product_rows]
+            for product_id, product_rows in groupby(rows, key=lambda row: row.product_id)
+        },
+    }
+
+
+@router.get("/categories/rollups")
+def get_category_rollups(
+    category: str = Query(..., description="prod_category as stored by the catalog sync"),
+    source: str = Query("all", description="hetzi | shufersal | all"),
+    period: Period = Query("month", description="week (Monday-based) or month"),
+    periods: int = Query(12, ge=1, le=260, description="How many periods back, current one included"),
+):
+    """
+    Category-wide min / max / avg price per week or month (avg over every product-day,
+    last = mean of the products' last prices).
+    Output shape:
+    {
+      "period": "month", "category": "...",
+      "rollups": [{"source":"hetzi","period_start":"2026-01-01","min":..,"max":..,"avg":..,"last":..,"days":..,"products":..}, ...]
+    }
+    """
+    key = ("category_rollups", category, source.lower(), period, periods)
+    return history_cache.get_or_compute(key, lambda: _load_category_rollups(category, source, period, periods))
+
+
+def _load_category_rollups(category: str, source: str, period: str, periods: int) -> dict:
+    stmt = (
+        select(CategoryPriceRollup, Source.name)
+        .join(Source, Source.id == CategoryPriceRollup.source_id)
+        .where(
+            CategoryPriceRollup.prod_category == category,
+            CategoryPriceRollup.period == period,
+            CategoryPriceRollup.period_start >= _window_start(period, periods),
         )
+        .order_by(Source.name, CategoryPriceRollup.period_start)
+    )
+    source_filter = _source_filter(source)
+    if source_filter is not None:
+        stmt = stmt.where(source_filter)
+    with Session(buy_smart_engine) as session:
+        rows = session.exec(stmt).all()
+    return {
+        "period": period,
+        "category": category,
+        "rollups": [
+            {"source": source_name, **rollup_values(row), "products": row.products}
+            for row, source_name in rows
+        ],
+    }
+
+
+@router.get("/categories/index")
+def get_category_price_index(
+    category: str = Query(..., description="prod_category as stored by the catalog sync"),
+    source: str = Query("all", description="hetzi | shufersal | all"),
+    period: Period = Query("month", description="week (Monday-based) or month"),
+    periods: int = Query(12, ge=2, le=260, description="How many periods back, current one included"),
+):
+    """
+    Fixed-base price index of a category: the first period of the window = 100, each later
+    period = 100 × the mean of avg_price(period) / avg_price(base) over the products priced
+    in both, so products entering or leaving the catalog do not move the index.
+    Output shape:
+    {
+      "period": "month", "category": "...", "base_period_start": "2025-11-01",
+      "index": [{"period_start":"2025-11-01","index":100.0,"products":240}, ...]
+    }
+    """
+    key = ("category_index", category, source.lower(), period, periods)
+    return history_cache.get_or_compute(
+        key, lambda: _load_category_price_index(category, source, period, periods)
+    )
 
-        qualifying = session.exec(qualifying_stmt).all()
-        qualifying_ids = [row[0] for row in qualifying]  # row[0] == product_id
 
-        if not qualifying_ids:
-            return {"history": {}}
+def _load_category_price_index(category: str, source: str, period: str, periods: int) -> dict:
+    in_category = [Product.prod_category == category]
+    source_filter = _source_filter(source)
+    if source_filter is not None:
+        in_category.append(source_filter)
+
+    with Session(buy_smart_engine) as session:
+        base_start = session.exec(
+            select(func.min(PriceRollup.period_start))
+            .join(Product, Product.id == PriceRollup.product_id)
+            .join(Source, Source.id == Product.source_id)
+            .where(
+                PriceRollup.period == period,
+                PriceRollup.period_start >= _window_start(period, periods),
+                *in_category,
+            )
+        ).first()
+        if base_start is None:
+            return {"period": period, "category": category, "base_period_start": None, "index": []}
 
-        # 2) Pull snapshots for qualifying ids (latest first)
-        snaps_stmt = (
-            select(PriceSnapshot)
-            .where(PriceSnapshot.product_id.in_(qualifying_ids))
-            .order_by(PriceSnapshot.product_id, PriceSnapshot.timestamp.desc())
+        base = aliased(PriceRollup)
+        relative = (cast(PriceRollup.sum_agorot, Float) / PriceRollup.days) / (
+            cast(base.sum_agorot, Float) / base.days
         )
-        snaps = session.exec(snaps_stmt).all()
+        rows = session.execute(
+            select(PriceRollup.period_start, func.avg(relative).label("ratio"), func.count().label("products"))
+            .join(
+                base,
+                and_(
+                    base.product_id == PriceRollup.product_id,
+                    base.period == period,
+                    base.period_start == base_start,
+                ),
+            )
+            .join(Product, Product.id == PriceRollup.product_id)
+            .join(Source, Source.id == Product.source_id)
+            .where(PriceRollup.period == period, PriceRollup.period_start >= base_start, *in_category)
+            .group_by(PriceRollup.period_start)
+            .order_by(PriceRollup.period_start)
+        ).all()
 
-    # 3) Build response map and apply per_product_limit
-    history: Dict[str, List[dict]] = {}
-    counts: Dict[int, int] = {}
+    return {
+        "period": period,
+        "category": category,
+        "base_period_start": base_start.isoformat(),
+        "index": [
+            {"period_start": row.period_start.isoformat(), "index": round(row.ratio * 100, 2), "products": row.products}
+            for row in rows
+        ],
+    }
+
+
+# --------- deals feed (price_change) ---------
+@router.get("/deals")
+def get_deals(
+    since: Optional[date] = Query(None, description="First day to include, YYYY-MM-DD (default: today, UTC)"),
+    min_drop_pct: float = Query(0, ge=0, le=100, description="Only drops of at least this many percent"),
+    category: Optional[str] = Query(None, description="prod_category as stored by the catalog sync"),
+    source: str = Query("all", description="hetzi | shufersal | all"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """
+    Price drops recorded at sync time, biggest drop first (one entry per product per day).
+    Output shape:
+    {
+      "since": "2026-03-02",
+      "deals": [{"internal_product_id":12,"prod_name":"...","prod_category":"...","prod_img":"...","source":"hetzi",
+                 "day":"2026-03-02","old_price":9.9,"new_price":8.9,"change_pct":-10.1,"url":"..."}, ...]
+    }
+    """
+    since = since or datetime.utcnow().date()
+    key = ("deals", since, min_drop_pct, category, source.lower(), limit)
+    return history_cache.get_or_compute(
+        key, lambda: _load_deals(since, min_drop_pct, category, source, limit)
+    )
 
-    for s in snaps:
-        pid = s.product_id
-        if pid is None:
-            continue
 
-        counts[pid] = counts.get(pid, 0)
-        if counts[pid] >= per_product_limit:
-            continue
+def deals_stmt(since: date, min_drop_pct: float, category: Optional[str], source: str, limit: int):
+    """The SELECT behind /prices/deals (scripts/check_query_plans.py EXPLAINs it)."""
+    # range scan on ix_price_change_day_pct; product / source rows joined per change
+    stmt = (
+        select(
+            PriceChange.product_id,
+            PriceChange.day,
+            PriceChange.old_agorot,
+            PriceChange.new_agorot,
+            PriceChange.change_pct,
+            Product.external_prod_id,
+            Product.prod_name,
+            Product.prod_category,
+            Product.image_url,
+            Product.barcode,
+            Source.name.label("source_name"),
+            Source.base_url,
+        )
+        .join(Product, Product.id == PriceChange.product_id)
+        .join(Source, Source.id == Product.source_id)
+        .where(PriceChange.day >= since, PriceChange.change_pct < 0, PriceChange.change_pct <= -min_drop_pct)
+        .order_by(PriceChange.change_pct, PriceChange.day.desc(), PriceChange.product_id)
+        .limit(limit)
+    )
+    if category:
+        stmt = stmt.where(Product.prod_category == category)
+    source_filter = _source_filter(source)
+    if source_filter is not None:
+        stmt = stmt.where(source_filter)
+    return stmt
+
 
-        day_str = (s.timestamp.date().isoformat() if isinstance(s.timestamp, datetime) else str(s.timestamp))
-        history.setdefault(str(pid), []).append(
+def _load_deals(since: date, min_drop_pct: float, category: Optional[str], source: str, limit: int) -> dict:
+    stmt = deals_stmt(since, min_drop_pct, category, source, limit)
+    with Session(buy_smart_engine) as session:
+        rows = session.execute(stmt).all()
+    return {
+        "since": since.isoformat(),
+        "deals": [
             {
-                "day": day_str,
-                "price": float(s.price),
-                "unit": s.unit,
-                "unit_size": s.unit_size,
-                "price_per_unit_desc": s.price_per_unit_desc,
-                "url": s.url,
+                "internal_product_id": row.product_id,
+                "prod_name": row.prod_name,
+                "prod_category": row.prod_category,
+                "prod_img": row.image_url,
+                "source": row.source_name,
+                "day": row.day.isoformat(),
+                "old_price": from_agorot(row.old_agorot),
+                "new_price": from_agorot(row.new_agorot),
+                "change_pct": round(row.change_pct, 1),
+                "url": product_url(row.source_name, row.base_url, row.external_prod_id, row.barcode, row.prod_name),
             }
-        )
-        counts[pid] += 1
-
-    return {"history": history}
\ No newline at end of file
+            for row in rows
+        ],
+    }
@@ -1,11 +1,45 @@
+import asyncio
 import os
+import sqlite3
+import threading
+import time
 import traceback
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
 
 from .hetzi_hinam import HetziHinamScraper
-from .db_search import search_products_from_db, get_categories_from_db
+from .shufersal import ShufersalScraper
+from .db_search import _SOURCE_ALIASES, search_products_from_db, get_categories_from_db
+from .search_index import optimize_search_index
+from .scrapers_register import bump_catalog_generation
+from backend_portfolio.buy_smart_db import buy_smart_engine
+from backend_portfolio.routers.Projects.buy_smart.services.catalog_artifact import build_catalog_artifact
+from backend_portfolio.routers.Projects.buy_smart.services.catalog_index import (
+    catalog_index,
+    catalog_index_enabled,
+    catalog_index_mode,
+)
+from backend_portfolio.routers.Projects.buy_smart.services.price_rollups import refresh_price_rollups
+from backend_portfolio.routers.Projects.buy_smart.services.cache import (
+    ALL_SOURCES,
+    categories_cache,
+    invalidate_source,
+    normalize_query,
+    search_cache,
+)
 
-SCRAPERS = [HetziHinamScraper()]
+SCRAPERS = [HetziHinamScraper(), ShufersalScraper()]
+
+# Live mode: one shared pool for every request (no executor per search).
+LIVE_SOURCE_TIMEOUT_SEC = float(os.getenv("BUY_SMART_SOURCE_TIMEOUT_SEC", "8"))
+LIVE_SEARCH_BUDGET_SEC = float(os.getenv("BUY_SMART_SEARCH_BUDGET_SEC", "10"))
+_live_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="live-search")
+# search_all() called from inside an event loop runs its own loop here (not on _live_pool,
+# whose workers the scrapes it waits for need)
+_blocking_live_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="live-search-blocking")
+# live cache key → running scrape, shared by concurrent and follow-up requests
+_live_inflight: dict[tuple, Future] = {}
+_live_inflight_lock = threading.Lock()
 
 
 def _use_db_search() -> bool:
@@ -13,24 +47,155 @@ def _use_db_search() -> bool:
     return os.getenv("BUY_SMART_SEARCH_MODE", "db").strip().lower() != "live"
 
 
+def _loaded_catalog_index():
+    """In-memory index / artifact when enabled and already loaded, else None (fall back to DB)."""
+    if not catalog_index_enabled():
+        return None
+    return catalog_index.current()
+
+
+def _search_mode() -> str:
+    return "db" if _use_db_search() else "live"
+
+
 def search_all(q: str, sources: str = "all", limit: int = 50):
-    if _use_db_search():
-        return search_products_from_db(q, sources=sources, limit=limit)
+    """Blocking search (no per-source metadata). Concurrent identical misses share one DB query / scrape."""
+    if not _use_db_search():
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:  # plain thread: no loop to collide with
+            results, _meta = asyncio.run(search_live(q, sources=sources))
+        else:  # asyncio.run() refuses to start inside a running loop
+            results, _meta = _blocking_live_pool.submit(asyncio.run, search_live(q, sources=sources)).result()
+        return results
+    return _search_db_cached(q, sources=sources, limit=limit)
+
+
+async def search_all_with_meta(q: str, sources: str = "all", limit: int = 50) -> tuple[list, list[dict]]:
+    """
+    Search for the async /scrapers/search endpoint: (result blocks, per-source metadata).
+    DB mode runs in a worker thread; live mode fans out to every selected scraper.
+    """
+    if not _use_db_search():
+        return await search_live(q, sources=sources)
+
+    started = time.perf_counter()
+    results = await asyncio.to_thread(_search_db_cached, q, sources=sources, limit=limit)
+    meta = [{"source": "db", "status": "ok", "elapsed_ms": _elapsed_ms(started)}]
+    return results, meta
+
+
+def _search_db_cached(q: str, sources: str = "all", limit: int = 50):
+    source_name = _SOURCE_ALIASES.get(sources.lower(), sources.lower()) or ALL_SOURCES
+    key = (_search_mode(), normalize_query(q), source_name, limit)
+    return search_cache.get_or_compute(
+        key,
+        lambda: _search_db_uncached(q, sources=sources, limit=limit),
+        tags=(source_name,),
+    )
+
+
+def _search_db_uncached(q: str, sources: str = "all", limit: int = 50):
+    index = _loaded_catalog_index()
+    if index is not None:
+        try:
+            return index.search(q, sources=sources, limit=limit)
+        except sqlite3.Error as exc:  # artifact mode: unreadable file → live DB
+            print(f"Buy Smart catalog artifact search failed: {exc!r}")
+    return search_products_from_db(q, sources=sources, limit=limit)
+
+
+# --------- live mode: async fan-out with deadlines ---------
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _live_scrapers(sources: str) -> list:
+    source_name = _SOURCE_ALIASES.get(sources.lower(), sources.lower())
+    if not source_name:
+        return list(SCRAPERS)
+    return [scraper for scraper in SCRAPERS if scraper.name == source_name]
+
+
+def _live_cache_key(scraper, q: str) -> tuple:
+    return ("live", scraper.name, normalize_query(q))
+
 
-    results = []
-    with ThreadPoolExecutor(max_workers=4) as ex:
-        futures = [ex.submit(s.search, q) for s in SCRAPERS]
-        for f in futures:
-            try:
-                results.append(f.result())
-            except Exception as e:
-                print("SCRAPER ERROR:", repr(e))
-                traceback.print_exc()
-    return results
+def _start_live_scrape(scraper, q: str) -> Future:
+    """Start (or join) the scrape for (source, query). Its result is cached when it lands."""
+    key = _live_cache_key(scraper, q)
+    with _live_inflight_lock:
+        future = _live_inflight.get(key)
+        if future is not None:
+            return future
+        future = _live_pool.submit(scraper.search, q)
+        _live_inflight[key] = future
+
+    def _done(f: Future) -> None:
+        with _live_inflight_lock:
+            _live_inflight.pop(key, None)
+        if f.cancelled():
+            return
+        error = f.exception()
+        if error is not None:
+            print(f"SCRAPER ERROR ({scraper.name}):", repr(error))
+            traceback.print_exception(error)
+            return
+        # Also covers scrapes that missed their request's deadline: the next identical
+        # query is served from the cache instead of scraping again.
+        search_cache.put(key, f.result(), tags=(scraper.name,))
+
+    future.add_done_callback(_done)
+    return future
+
+
+async def _search_one_source(scraper, q: str, deadline: float) -> tuple[dict | None, dict]:
+    started = time.perf_counter()
+    found, cached = search_cache.get(_live_cache_key(scraper, q))
+    if found:
+        meta = {"source": scraper.name, "status": "cached", "elapsed_ms": _elapsed_ms(started)}
+        return cached, meta
+
+    future = asyncio.wrap_future(_start_live_scrape(scraper, q))
+    timeout = max(0.0, min(LIVE_SOURCE_TIMEOUT_SEC, deadline - time.monotonic()))
+    done, _pending = await asyncio.wait({future}, timeout=timeout)
+    meta = {"source": scraper.name, "elapsed_ms": _elapsed_ms(started)}
+    if not done:
+        # Not cancelled: the scrape keeps running and fills the cache for the next request.
+        meta["status"] = "timeout"
+        return None, meta
+    try:
+        block = future.result()
+    except Exception as exc:  # already logged by _start_live_scrape
+        meta.update(status="error", error=repr(exc))
+        return None, meta
+    meta["status"] = "ok"
+    return block, meta
+
+
+async def search_live(q: str, sources: str = "all") -> tuple[list, list[dict]]:
+    """
+    Query every selected scraper concurrently. Each source gets LIVE_SOURCE_TIMEOUT_SEC,
+    the whole request LIVE_SEARCH_BUDGET_SEC; whatever is ready by then is returned
+    (partial results) together with per-source status / timing.
+    """
+    deadline = time.monotonic() + LIVE_SEARCH_BUDGET_SEC
+    outcomes = await asyncio.gather(
+        *(_search_one_source(scraper, q, deadline) for scraper in _live_scrapers(sources))
+    )
+    results = [block for block, _meta in outcomes if block is not None]
+    return results, [meta for _block, meta in outcomes]
 
 
 def get_categories():
+    return categories_cache.get_or_compute(_search_mode(), _get_categories_uncached)
+
+
+def _get_categories_uncached():
     if _use_db_search():
+        index = _loaded_catalog_index()
+        if index is not None:
+            return index.get_categories()
         return get_categories_from_db()
 
     categories = []
@@ -45,12 +210,68 @@ def get_categories():
     return categories
 
 
-def sync_hetzi_catalog(delay_sec: float = 0.3) -> dict:
+def _sync_catalog(scraper, **options) -> dict:
     """
-    Bulk-fetch all Hetzi Hinam products and save to buy_smart.db / Supabase.
-    Intended to run locally (weekly cron), not on Render.
+    Run one scraper's sync_all_to_db(), refresh the week / month rollups it touched,
+    then tell API workers / caches about the new catalog (and, in artifact mode, write
+    the new catalog artifact).
     """
-    scraper = SCRAPERS[0]
     if not hasattr(scraper, "sync_all_to_db"):
         raise RuntimeError(f"{scraper.name} scraper has no sync_all_to_db()")
-    return scraper.sync_all_to_db(delay_sec=delay_sec)
+    sync_day = datetime.utcnow().date()
+    stats = scraper.sync_all_to_db(**options)
+    stats["rollups"] = refresh_price_rollups(since=sync_day)
+    optimize_search_index(buy_smart_engine)
+    if catalog_index_mode() == "artifact":
+        # before the bump: workers reload as soon as they see it, and must find this file
+        stats["catalog_artifact"] = build_catalog_artifact(pending_bump=scraper.name)
+    # API workers poll this marker and rebuild their in-memory catalog index / reopen the artifact
+    stats["catalog_generation"] = bump_catalog_generation(scraper.name)
+    invalidate_source(scraper.name)
+    return stats
+
+
+def _get_scraper(name: str):
+    for scraper in SCRAPERS:
+        if scraper.name == name:
+            return scraper
+    raise RuntimeError(f"No scraper named {name!r}")
+
+
+def sync_hetzi_catalog(
+    delay_sec: float = 0.3,
+    *,
+    concurrency: int = 1,
+    rate_per_sec: float | None = None,
+    delta: bool = False,
+    resume: bool = False,
+) -> dict:
+    """
+    Bulk-fetch all Hetzi Hinam products and save to buy_smart.db / Supabase.
+    Intended to run locally (weekly cron), not on Render.
+    """
+    return _sync_catalog(
+        _get_scraper("hetzi"),
+        delay_sec=delay_sec,
+        concurrency=concurrency,
+        rate_per_sec=rate_per_sec,
+        delta=delta,
+        resume=resume,
+    )
+
+
+def sync_shufersal_catalog(
+    *,
+    concurrency: int = 4,
+    rate_per_sec: float | None = None,
+    delta: bool = False,
+    resume: bool = False,
+) -> dict:
+    """Bulk-fetch the Shufersal Online catalog (all category pages) into buy_smart.db / Supabase."""
+    return _sync_catalog(
+        _get_scraper("shufersal"),
+        concurrency=concurrency,
+        rate_per_sec=rate_per_sec,
+        delta=delta,
+        resume=resume,
+    )
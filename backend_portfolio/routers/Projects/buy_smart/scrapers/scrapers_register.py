@@ -1,11 +1,31 @@
 # backend_portfolio/routers/Projects/buy_smart/scripts/scrapers_register.py
+import json
 import os
+import re
 from pathlib import Path
 from sqlmodel import SQLModel, Session, create_engine, select
-from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import Source,Product,PriceSnapshot
+from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+    CatalogGeneration,
+    PriceChange,
+    PriceSnapshot,
+    Product,
+    ProductLatestPrice,
+    Source,
+    SyncRun,
+    SyncRunSubcategory,
+)
 from backend_portfolio.buy_smart_db import buy_smart_engine
-from datetime import datetime,timedelta
-from sqlalchemy import func
+from backend_portfolio.routers.Projects.buy_smart.services.price_changes import record_price_changes
+from backend_portfolio.routers.Projects.buy_smart.services.price_history import (
+    carry_price_intervals,
+    price_key,
+    record_price_intervals,
+    to_agorot,
+)
+from backend_portfolio.routers.Projects.buy_smart.utils.normalizers import normalize_text
+from datetime import datetime
+from sqlalchemy import and_, case, delete, func, or_
+from sqlalchemy.dialects import postgresql, sqlite
 
 engine = buy_smart_engine
 
@@ -24,9 +44,25 @@ def register_source(name: str, base_url: str) -> Source:
         session.refresh(source)
         return source
     
-def register_product(source_id:int, external_prod_id:int, prod_name:str,prod_category:str | None = None,image_url:str | None = None) ->Product:
-    """Insert a Product row if it does not already exist."""
+# Per-product fields that used to be repeated on every snapshot
+STATIC_PRODUCT_FIELDS = ("barcode", "unit", "unit_size", "price_per_unit_desc")
+
+
+def register_product(
+    source_id:int,
+    external_prod_id:int,
+    prod_name:str,
+    prod_category:str | None = None,
+    image_url:str | None = None,
+    *,
+    barcode:str | None = None,
+    unit:str | None = None,
+    unit_size:str | None = None,
+    price_per_unit_desc:str | None = None,
+) ->Product:
+    """Insert a Product row if it does not already exist; refresh its static fields if they changed."""
     SQLModel.metadata.create_all(engine, tables=[Product.__table__])
+    static = {"barcode": barcode, "unit": unit, "unit_size": unit_size, "price_per_unit_desc": price_per_unit_desc}
     with Session(engine) as session:
         existing = session.exec(
             select(Product).where(
@@ -34,45 +70,510 @@ def register_product(source_id:int, external_prod_id:int, prod_name:str,prod_cat
                 Product.external_prod_id==external_prod_id)
         ).first()
         if existing:
+            changed = {k: v for k, v in static.items() if v is not None and getattr(existing, k) != v}
+            if changed:
+                for key, value in changed.items():
+                    setattr(existing, key, value)
+                session.add(existing)
+                session.commit()
+                session.refresh(existing)
             return existing
         else:
             product=Product(
                 source_id=source_id,
                 external_prod_id=external_prod_id,
                 prod_name=prod_name,
+                normalized_name=normalize_text(prod_name),
                 prod_category=prod_category,
-                image_url=image_url
+                image_url=image_url,
+                **static,
                 )
             session.add(product)
             session.commit()
             session.refresh(product)
         return product
 
-def register_PriceSnapshot(product_id:int,price:float,unit:str,unit_size:str,price_per_unit_desc:str,url:str):
-    """Insert a PriceSnapshot row if it does not already exist."""
-    SQLModel.metadata.create_all(engine, tables=[PriceSnapshot.__table__])
-    today = datetime.utcnow().date()
+def register_PriceSnapshot(product_id:int,price:float):
+    """Insert today's PriceSnapshot if it does not already exist (and refresh latest price / intervals / changes)."""
+    SQLModel.metadata.create_all(
+        engine, tables=[PriceSnapshot.__table__, ProductLatestPrice.__table__, PriceChange.__table__]
+    )
+    now = datetime.utcnow()
+    today = now.date()
+    price_agorot = to_agorot(price)
     stmt = select(PriceSnapshot).where(
         PriceSnapshot.product_id == product_id,
-        func.date(PriceSnapshot.timestamp) == today,
+        PriceSnapshot.snapshot_day == today,
     )
-    print(today)
     with Session(engine) as session:
+        previous = session.exec(
+            select(ProductLatestPrice.price_agorot).where(ProductLatestPrice.product_id == product_id)
+        ).first()
+        _upsert_latest_prices(session, [{"product_id": product_id, "price_agorot": price_agorot, "last_changed": now}])
+        record_price_changes(session, {product_id: (previous, price_agorot)}, today)
+        session.commit()
         existing = session.exec(stmt).first()
         if existing:
             return existing
         priceSnapshot=PriceSnapshot(
         product_id=product_id,
-        price=price,
-        unit=unit,
-        unit_size=unit_size,
-        price_per_unit_desc=price_per_unit_desc,
-        url=url
+        price_agorot=price_agorot,
+        timestamp=now,
+        snapshot_day=today,
         )
         session.add(priceSnapshot)
+        record_price_intervals(session, {product_id: {"price_agorot": price_agorot}}, today)
         session.commit()
         session.refresh(priceSnapshot)
         return priceSnapshot
-        
-    return priceSnapshot
 
+
+def bump_catalog_generation(source_name: str) -> int:
+    """Mark the source's catalog as changed (call once a sync finishes). Returns the new generation."""
+    SQLModel.metadata.create_all(engine, tables=[CatalogGeneration.__table__])
+    with Session(engine) as session:
+        source = session.exec(select(Source).where(Source.name == source_name)).first()
+        if source is None:
+            raise RuntimeError(f"Unknown source: {source_name}")
+        marker = session.get(CatalogGeneration, source.id)
+        if marker is None:
+            marker = CatalogGeneration(source_id=source.id)
+        marker.generation += 1
+        marker.updated_at = datetime.utcnow()
+        session.add(marker)
+        session.commit()
+        return marker.generation
+
+
+def read_catalog_generations(session: Session) -> dict[str, int]:
+    """Source.name → generation for every source that has been synced at least once."""
+    rows = session.exec(
+        select(Source.name, CatalogGeneration.generation)
+        .join(Source, CatalogGeneration.source_id == Source.id)
+    ).all()
+    return {name: generation for name, generation in rows}
+
+
+BULK_CHUNK_SIZE = 500
+
+
+def _dialect_insert(table):
+    """INSERT that supports ON CONFLICT on both SQLite and Postgres."""
+    if engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def load_latest_prices(source_id: int) -> dict[int, tuple[int, tuple]]:
+    """
+    external_prod_id → (product_id, price key) of the current price, for one source.
+    Reads product_latest_price + product; used by delta sync to diff fetched items in memory.
+    """
+    stmt = (
+        select(
+            Product.external_prod_id,
+            Product.id,
+            ProductLatestPrice.price_agorot,
+            Product.unit,
+            Product.unit_size,
+        )
+        .join(ProductLatestPrice, ProductLatestPrice.product_id == Product.id)
+        .where(Product.source_id == source_id)
+    )
+    with Session(engine) as session:
+        return {
+            ext_id: (pid, price_key(price_agorot, unit, unit_size))
+            for ext_id, pid, price_agorot, unit, unit_size in session.exec(stmt).all()
+        }
+
+
+# Hetzi: /catalog/products/{id}/{barkod}/{name} — Shufersal: /online/he/p/P_{barkod}
+_PRODUCT_URL_RE = re.compile(r"/catalog/products/\d+/([^/]+)/|/p/P_(\d+)")
+
+
+def barcode_from_url(url: str | None) -> str | None:
+    """Barcode embedded in a stored product URL (legacy rows; new rows carry `barcode`)."""
+    if not url:
+        return None
+    m = _PRODUCT_URL_RE.search(url)
+    return (m.group(1) or m.group(2)) if m else None
+
+
+# Product page per source, rebuilt from stored fields (Source.base_url + product columns)
+_PRODUCT_URL_TEMPLATES = {
+    "hetzi": "{base}/catalog/products/{external_id}/{barcode}/{name}",
+    "shufersal": "{base}/online/he/p/P_{external_id}",
+}
+
+
+def product_url(source_name: str, base_url: str, external_id: int, barcode: str | None, name: str) -> str | None:
+    template = _PRODUCT_URL_TEMPLATES.get(source_name)
+    if template is None or ("{barcode}" in template and not barcode):
+        return None
+    return template.format(base=base_url, external_id=external_id, barcode=barcode, name=name)
+
+
+def _upsert_latest_prices(session: Session, latest_rows: list[dict]) -> None:
+    """
+    INSERT ... ON CONFLICT (product_id) DO UPDATE into product_latest_price.
+    Rows: product_id, price_agorot, last_changed — last_changed only moves when the price differs.
+    Rows must have unique product_ids (Postgres rejects touching a row twice per statement).
+    """
+    if not latest_rows:
+        return
+    table = ProductLatestPrice.__table__
+    stmt = _dialect_insert(table)
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["product_id"],
+        set_={
+            "price_agorot": new.price_agorot,
+            "last_changed": case(
+                (table.c.price_agorot != new.price_agorot, new.last_changed),
+                else_=table.c.last_changed,
+            ),
+        },
+    )
+    session.execute(stmt, latest_rows)
+
+
+def rebuild_latest_prices(*, product_ids=None, batch_size: int = 2000, engine=engine) -> int:
+    """
+    Recompute product_latest_price from the full pricesnapshot history (one transaction).
+    last_changed = timestamp of the newest snapshot whose price differs from the
+    snapshot before it. product_ids: only recompute those products (e.g. after
+    replicating their snapshots). Returns the number of rows written.
+    """
+    SQLModel.metadata.create_all(engine, tables=[ProductLatestPrice.__table__])
+
+    def latest_stmt(ids):
+        history_order = (PriceSnapshot.snapshot_day, PriceSnapshot.id)
+        ordered = select(
+            PriceSnapshot.product_id,
+            PriceSnapshot.price_agorot,
+            PriceSnapshot.timestamp,
+            func.row_number()
+            .over(
+                partition_by=PriceSnapshot.product_id,
+                order_by=(PriceSnapshot.snapshot_day.desc(), PriceSnapshot.id.desc()),
+            )
+            .label("rn"),
+            func.lag(PriceSnapshot.price_agorot)
+            .over(partition_by=PriceSnapshot.product_id, order_by=history_order)
+            .label("prev_price"),
+        )
+        if ids is not None:
+            ordered = ordered.where(PriceSnapshot.product_id.in_(ids))
+        ordered = ordered.subquery("ordered")
+        is_change = or_(ordered.c.prev_price.is_(None), ordered.c.prev_price != ordered.c.price_agorot)
+        changes = select(
+            ordered,
+            func.max(case((is_change, ordered.c.timestamp)))
+            .over(partition_by=ordered.c.product_id)
+            .label("last_changed"),
+        ).subquery("changes")
+        return (
+            select(changes.c.product_id, changes.c.price_agorot, changes.c.last_changed)
+            .where(changes.c.rn == 1, changes.c.product_id.isnot(None))
+            .execution_options(yield_per=batch_size)
+        )
+
+    written = 0
+    insert_latest = ProductLatestPrice.__table__.insert()
+
+    def write(session: Session, stmt) -> None:
+        nonlocal written
+        batch = []
+        for product_id, price_agorot, last_changed in session.execute(stmt):
+            batch.append({"product_id": product_id, "price_agorot": price_agorot, "last_changed": last_changed})
+            if len(batch) >= batch_size:
+                session.execute(insert_latest, batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            session.execute(insert_latest, batch)
+            written += len(batch)
+
+    with Session(engine) as session:
+        if product_ids is None:
+            session.execute(delete(ProductLatestPrice))
+            write(session, latest_stmt(None))
+        else:
+            ids = sorted(set(product_ids))
+            for start in range(0, len(ids), batch_size):
+                chunk = ids[start:start + batch_size]
+                session.execute(delete(ProductLatestPrice).where(ProductLatestPrice.product_id.in_(chunk)))
+                write(session, latest_stmt(chunk))
+        session.commit()
+    return written
+
+
+def lookup_product_ids(source_id: int, external_ids: list[int]) -> dict[int, int]:
+    """external_prod_id → Product.id for the ids that already exist (one SELECT)."""
+    ids = [ext_id for ext_id in set(external_ids) if ext_id is not None]
+    if not ids:
+        return {}
+    stmt = select(Product.external_prod_id, Product.id).where(
+        Product.source_id == source_id,
+        Product.external_prod_id.in_(ids),
+    )
+    with Session(engine) as session:
+        return dict(session.exec(stmt).all())
+
+
+def _row_price_key(row: dict) -> tuple:
+    return price_key(to_agorot(row["price"]), row.get("unit"), row.get("unit_size"))
+
+
+def _upsert_products_stmt():
+    """Product insert that refreshes static fields on conflict — only when a new non-null value differs."""
+    table = Product.__table__
+    stmt = _dialect_insert(table)
+    new = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["source_id", "external_prod_id"],
+        set_={field: func.coalesce(new[field], table.c[field]) for field in STATIC_PRODUCT_FIELDS},
+        where=or_(
+            *(
+                and_(new[field].isnot(None), table.c[field].is_distinct_from(new[field]))
+                for field in STATIC_PRODUCT_FIELDS
+            )
+        ),
+    )
+
+
+def bulk_register_items(
+    source_id: int,
+    rows: list[dict],
+    *,
+    latest: dict[int, tuple[int, tuple]] | None = None,
+) -> dict:
+    """
+    Set-based persist for a batch of catalog items in ONE transaction.
+
+    Each row: external_prod_id, prod_name, prod_category, image_url, barcode,
+              price (shekels), unit, unit_size, price_per_unit_desc
+
+    Same rules as register_product / register_PriceSnapshot:
+    - products are inserted once per (source_id, external_prod_id), existing rows kept;
+      their static fields (barcode, unit, unit_size, price_per_unit_desc) follow the store
+    - at most one PriceSnapshot per product per (UTC) day, the first one wins
+    - product_latest_price always takes the newest observation; a price that differs
+      from the stored one is recorded in price_change (services/price_changes.py)
+    - priceinterval follows the snapshots (see services/price_history.py)
+
+    Delta mode (`latest` from load_latest_prices): rows whose price/unit/unit_size equal
+    the stored ones get no snapshot — their last priceinterval is stretched to today
+    instead, so history only stores changes; `latest` is updated in place with the
+    new/changed rows.
+
+    Returns {"product_ids": {external_prod_id: product.id}, "snapshots_inserted": n,
+             "price_changes": n, "new": n, "changed": n, "unchanged": n}.
+    """
+    product_ids: dict[int, int] = {}
+    counts = {"snapshots_inserted": 0, "price_changes": 0, "new": 0, "changed": 0, "unchanged": 0}
+    if not rows:
+        return {"product_ids": product_ids, **counts}
+
+    unchanged: dict[int, int] = {}  # product_id → price_agorot
+    if latest is not None:
+        pending = []
+        for row in rows:
+            known = latest.get(row["external_prod_id"])
+            if known is None:
+                counts["new"] += 1
+                pending.append(row)
+            elif known[1] == _row_price_key(row):
+                counts["unchanged"] += 1
+                product_ids[row["external_prod_id"]] = known[0]
+                unchanged[known[0]] = known[1][0]
+            else:
+                counts["changed"] += 1
+                pending.append(row)
+        rows = pending
+
+    now = datetime.utcnow()
+    today = now.date()
+
+    with Session(engine) as session:
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            chunk = rows[start:start + BULK_CHUNK_SIZE]
+            ext_ids = [row["external_prod_id"] for row in chunk]
+
+            # 1) products: INSERT ... ON CONFLICT (source_id, external_prod_id) DO UPDATE of the
+            #    static fields, only when they changed (one row per product: Postgres rejects
+            #    touching a row twice in one statement)
+            product_rows = {
+                row["external_prod_id"]: {
+                    "source_id": source_id,
+                    "external_prod_id": row["external_prod_id"],
+                    "prod_name": row["prod_name"],
+                    "normalized_name": normalize_text(row["prod_name"]),
+                    "prod_category": row.get("prod_category"),
+                    "image_url": row.get("image_url"),
+                    **{field: row.get(field) for field in STATIC_PRODUCT_FIELDS},
+                }
+                for row in chunk
+            }
+            session.execute(_upsert_products_stmt(), list(product_rows.values()))
+
+            # 2) resolve ids for the whole chunk in one SELECT
+            id_rows = session.exec(
+                select(Product.external_prod_id, Product.id).where(
+                    Product.source_id == source_id,
+                    Product.external_prod_id.in_(ext_ids),
+                )
+            ).all()
+            chunk_ids = {ext_id: pid for ext_id, pid in id_rows}
+            product_ids.update(chunk_ids)
+
+            # 3) current price: one upsert per product (last row of the chunk wins), and a
+            #    price_change row wherever it differs from the stored one — delta sync already
+            #    holds the stored prices, other callers read them in one SELECT
+            latest_rows = {}
+            for row in chunk:
+                pid = chunk_ids.get(row["external_prod_id"])
+                if pid is not None:
+                    latest_rows[pid] = {"product_id": pid, "price_agorot": to_agorot(row["price"]), "last_changed": now}
+            if latest is not None:
+                previous = {
+                    known[0]: known[1][0]
+                    for known in (latest.get(ext_id) for ext_id in ext_ids)
+                    if known is not None
+                }
+            else:
+                previous = dict(
+                    session.exec(
+                        select(ProductLatestPrice.product_id, ProductLatestPrice.price_agorot).where(
+                            ProductLatestPrice.product_id.in_(list(latest_rows))
+                        )
+                    ).all()
+                )
+            _upsert_latest_prices(session, list(latest_rows.values()))
+            counts["price_changes"] += record_price_changes(
+                session,
+                {pid: (previous.get(pid), row["price_agorot"]) for pid, row in latest_rows.items()},
+                today,
+            )
+
+            # 4) skip products that already have today's snapshot (served by ux_pricesnapshot_product_day)
+            already = set(
+                session.exec(
+                    select(PriceSnapshot.product_id).where(
+                        PriceSnapshot.product_id.in_(list(chunk_ids.values())),
+                        PriceSnapshot.snapshot_day == today,
+                    )
+                ).all()
+            )
+
+            # 5) snapshots: one executemany INSERT
+            snapshot_rows = []
+            for row in chunk:
+                pid = chunk_ids.get(row["external_prod_id"])
+                if pid is None or pid in already:
+                    continue
+                already.add(pid)
+                snapshot_rows.append(
+                    {
+                        "product_id": pid,
+                        "price_agorot": to_agorot(row["price"]),
+                        "timestamp": now,
+                        "snapshot_day": today,
+                    }
+                )
+            if snapshot_rows:
+                # DO NOTHING guards against a concurrent writer (e.g. the live-search write-behind
+                # flush) between the check and the insert; RETURNING reports the rows it skipped
+                insert_snapshots = (
+                    _dialect_insert(PriceSnapshot.__table__)
+                    .on_conflict_do_nothing(index_elements=["product_id", "snapshot_day"])
+                    .returning(PriceSnapshot.__table__.c.product_id)
+                )
+                inserted = set(session.execute(insert_snapshots, snapshot_rows).scalars())
+                counts["snapshots_inserted"] += len(inserted)
+                # 6) run-length history: extend yesterday's interval or open a new one
+                if inserted:
+                    record_price_intervals(
+                        session,
+                        {snap["product_id"]: snap for snap in snapshot_rows if snap["product_id"] in inserted},
+                        today,
+                    )
+
+        # 7) delta mode: unchanged products keep their interval running through today
+        carried = list(unchanged.items())
+        for start in range(0, len(carried), BULK_CHUNK_SIZE):
+            carry_price_intervals(session, dict(carried[start:start + BULK_CHUNK_SIZE]), today)
+
+        session.commit()
+
+    if latest is not None:
+        for row in rows:
+            pid = product_ids.get(row["external_prod_id"])
+            if pid is not None:
+                latest[row["external_prod_id"]] = (pid, _row_price_key(row))
+
+    return {"product_ids": product_ids, **counts}
+
+
+# --------- sync run checkpoints (resumable catalog sync) ---------
+def start_sync_run(source_id: int, subcategories: list[dict]) -> int:
+    """Record a new sync run with its subcategory list; returns the run id."""
+    with Session(engine) as session:
+        run = SyncRun(source_id=source_id, subcategories=json.dumps(subcategories, ensure_ascii=False))
+        session.add(run)
+        session.commit()
+        session.refresh(run)
+        return run.id
+
+
+def find_resumable_sync_run(source_id: int) -> tuple[int, list[dict], set[int]] | None:
+    """
+    Latest unfinished run for the source → (run_id, subcategories, completed subcategory ids).
+    None when the last run completed (nothing to resume).
+    """
+    with Session(engine) as session:
+        run = session.exec(
+            select(SyncRun)
+            .where(SyncRun.source_id == source_id)
+            .order_by(SyncRun.id.desc())
+            .limit(1)
+        ).first()
+        if run is None or run.status == "completed":
+            return None
+        done = session.exec(
+            select(SyncRunSubcategory.subcategory_id).where(SyncRunSubcategory.run_id == run.id)
+        ).all()
+        run.status = "running"
+        run.error = None
+        session.add(run)
+        session.commit()
+        return run.id, json.loads(run.subcategories), set(done)
+
+
+def mark_subcategory_done(run_id: int, subcategory_id: int, item_count: int) -> None:
+    with Session(engine) as session:
+        insert_done = _dialect_insert(SyncRunSubcategory.__table__).on_conflict_do_nothing(
+            index_elements=["run_id", "subcategory_id"]
+        )
+        session.execute(
+            insert_done,
+            {
+                "run_id": run_id,
+                "subcategory_id": subcategory_id,
+                "item_count": item_count,
+                "completed_at": datetime.utcnow(),
+            },
+        )
+        session.commit()
+
+
+def finish_sync_run(run_id: int, status: str, error: str | None = None) -> None:
+    with Session(engine) as session:
+        run = session.get(SyncRun, run_id)
+        if run is None:
+            return
+        run.status = status
+        run.error = error
+        run.finished_at = datetime.utcnow()
+        session.add(run)
+        session.commit()
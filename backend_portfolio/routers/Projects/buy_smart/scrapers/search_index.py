@@ -0,0 +1,178 @@
+"""
+Indexed product search for Buy Smart.
+
+Both backends index character trigrams rather than words, so a query matches
+anywhere inside a name exactly like the old ILIKE '%term%' filter — including
+Hebrew words with attached prefixes (ה/ו/ב/ל/מ/ש/כ), which a word tokenizer
+would miss.
+
+- Postgres: pg_trgm GIN indexes on product.normalized_name / prod_category.
+  ILIKE '%term%' is served by the index; results are ranked by similarity().
+- SQLite:   FTS5 external-content table `product_fts` (tokenize='trigram'),
+  kept in sync with `product` by triggers; results are ranked by bm25().
+
+Names are matched on product.normalized_name with the term run through the same
+normalize_text() (utils/normalizers.py), so final letters, niqqud, quotes and unit
+spellings don't break a match; categories are matched as stored.
+
+Terms shorter than 3 characters cannot use a trigram index and fall back to
+the plain ILIKE scan.
+"""
+from __future__ import annotations
+
+from sqlalchemy import Float, Integer, func, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend_portfolio.database import is_sqlite_url
+from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import Product
+
+FTS_TABLE = "product_fts"
+MIN_INDEXED_TERM_LEN = 3
+
+# engine url → whether product_fts exists (probed once per process)
+_fts_ready: dict[str, bool] = {}
+
+_SQLITE_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        normalized_name, prod_category,
+        content='product', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON product BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, normalized_name, prod_category)
+        VALUES (new.id, new.normalized_name, new.prod_category);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name, prod_category)
+        VALUES ('delete', old.id, old.normalized_name, old.prod_category);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON product BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, normalized_name, prod_category)
+        VALUES ('delete', old.id, old.normalized_name, old.prod_category);
+        INSERT INTO {FTS_TABLE}(rowid, normalized_name, prod_category)
+        VALUES (new.id, new.normalized_name, new.prod_category);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_product_normalized_name_trgm "
+    "ON product USING gin (normalized_name gin_trgm_ops)",
+    # Names are searched through normalized_name now; don't keep paying for the old index
+    "DROP INDEX IF EXISTS ix_product_prod_name_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_product_prod_category_trgm "
+    "ON product USING gin (prod_category gin_trgm_ops)",
+]
+
+
+def _engine_url(engine) -> str:
+    return engine.url.render_as_string(hide_password=False)
+
+
+def _sqlite_has_fts(conn) -> bool:
+    row = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    return row is not None
+
+
+def _sqlite_fts_outdated(conn) -> bool:
+    """product_fts created before it indexed normalized_name (it indexed prod_name)."""
+    ddl = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).scalar()
+    return ddl is not None and "normalized_name" not in ddl
+
+
+def _drop_sqlite_fts(conn) -> None:
+    for suffix in ("ai", "ad", "au"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def ensure_search_index(engine) -> None:
+    """Create the search index on an existing database (idempotent)."""
+    url = _engine_url(engine)
+    try:
+        with engine.connect() as conn:
+            if is_sqlite_url(url):
+                if _sqlite_fts_outdated(conn):
+                    _drop_sqlite_fts(conn)
+                existed = _sqlite_has_fts(conn)
+                for ddl in _SQLITE_FTS_DDL:
+                    conn.execute(text(ddl))
+                if not existed:
+                    # Index rows that were inserted before the table/triggers existed.
+                    conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            else:
+                for ddl in _POSTGRES_DDL:
+                    conn.execute(text(ddl))
+            conn.commit()
+    except SQLAlchemyError as exc:
+        # Search still works without the index (ILIKE scan) — don't block startup.
+        print(f"Buy Smart search index unavailable: {exc}")
+        _fts_ready[url] = False
+        return
+    _fts_ready[url] = is_sqlite_url(url)
+
+
+def optimize_search_index(engine) -> None:
+    """Compact the index after a bulk catalog sync."""
+    url = _engine_url(engine)
+    with engine.connect() as conn:
+        if is_sqlite_url(url):
+            if not _sqlite_has_fts(conn):
+                return
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+        else:
+            conn.execute(text("ANALYZE product"))
+        conn.commit()
+
+
+def sqlite_fts_available(engine) -> bool:
+    url = _engine_url(engine)
+    if url not in _fts_ready:
+        with engine.connect() as conn:
+            _fts_ready[url] = _sqlite_has_fts(conn)
+    return _fts_ready[url]
+
+
+def _fts_phrase(term: str) -> str:
+    """Quote the whole term as one FTS5 phrase (trigram phrase == substring match)."""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def sqlite_match_subquery(name_term: str, category_term: str):
+    """
+    FTS5 hits for `name_term` in normalized_name or `category_term` in prod_category as
+    a subquery with columns (product_id, rank).
+    Lower rank is better; name matches weigh 10× category matches.
+    """
+    match = f"normalized_name : {_fts_phrase(name_term)} OR prod_category : {_fts_phrase(category_term)}"
+    return (
+        text(
+            f"SELECT rowid AS product_id, bm25({FTS_TABLE}, 10.0, 1.0) AS rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+        )
+        .bindparams(match=match)
+        .columns(product_id=Integer, rank=Float)
+        .subquery("fts")
+    )
+
+
+def postgres_rank(name_term: str, category_term: str):
+    """Relevance expression for ORDER BY (pg_trgm similarity, higher is better)."""
+    return func.greatest(
+        func.similarity(func.coalesce(Product.normalized_name, ""), name_term),
+        func.similarity(func.coalesce(Product.prod_category, ""), category_term) * 0.5,
+    )
@@ -0,0 +1,313 @@
+import asyncio
+import re
+
+from .scrapers_register import (
+    bulk_register_items,
+    find_resumable_sync_run,
+    finish_sync_run,
+    load_latest_prices,
+    lookup_product_ids,
+    mark_subcategory_done,
+    register_source,
+    start_sync_run,
+)
+from backend_portfolio.routers.Projects.buy_smart.services.write_behind import live_search_writer
+from backend_portfolio.routers.Projects.buy_smart.utils.http import http_layer
+
+_DIGITS_RE = re.compile(r"\d+")
+
+
+class ShufersalScraper:
+    """
+    Scraper for www.shufersal.co.il (Shufersal Online).
+
+    The online store is an SAP Commerce (Hybris) site; its pages load products from JSON
+    "results" endpoints, which is what this scraper calls:
+    - search(q)            → GET /online/he/search/results?q=...       (live search)
+    - fetch_categories()   → category facet of the same endpoint
+    - sync_all_to_db()     → GET /online/he/c/{code}/results?page=N    (full catalog, every
+                             page of every top-level category, fetched concurrently)
+
+    Product ids are the numeric part of the product code ("P_7290004131074" → the barcode).
+    Expected response shapes: scrapers/fixtures/shufersal (served by scripts/shufersal_standin.py).
+    """
+
+    name = "shufersal"
+    BASE = "https://www.shufersal.co.il"
+
+    SEARCH_PATH = "/online/he/search/results"
+    CATEGORY_PATH = "/online/he/c/{code}/results"
+    PAGE_SIZE = 20
+
+    def __init__(self):
+        self.client = http_layer.client(base_url=self.BASE, timeout=20, headers=self.default_headers())
+        self._cached_source_id: int | None = None
+
+    def default_headers(self) -> dict:
+        return {
+            "Accept": "application/json, text/plain, */*",
+            "X-Requested-With": "XMLHttpRequest",
+            "Referer": self.BASE + "/online/he/",
+            "User-Agent": "Mozilla/5.0",
+        }
+
+    # --------- response parsing ---------
+    @staticmethod
+    def page_items(data: dict) -> list[dict]:
+        return data.get("results") or []
+
+    @staticmethod
+    def page_count(data: dict) -> int:
+        return int((data.get("pagination") or {}).get("numberOfPages") or 1)
+
+    @staticmethod
+    def external_id(item: dict) -> int | None:
+        """Numeric product id from the product code ("P_7290004131074" → 7290004131074)."""
+        digits = _DIGITS_RE.findall(item.get("code") or "")
+        return int("".join(digits)) if digits else None
+
+    @staticmethod
+    def _image_url(item: dict) -> str | None:
+        images = item.get("images") or []
+        for wanted in ("medium", "small", "zoom"):
+            for image in images:
+                if image.get("format") == wanted and image.get("url"):
+                    return image["url"]
+        return images[0].get("url") if images else None
+
+    @staticmethod
+    def _price(item: dict) -> float | None:
+        price = item.get("price") or {}
+        value = price.get("value") if isinstance(price, dict) else price
+        return float(value) if value is not None else None
+
+    @staticmethod
+    def _category(item: dict) -> tuple[str | None, str | None]:
+        categories = item.get("categories") or []
+        if categories:
+            return categories[-1].get("code"), categories[-1].get("name")
+        return item.get("_category_code"), item.get("_category_name")
+
+    # --------- DB helpers (shared by search + bulk sync) ---------
+    def _item_to_row(self, item: dict) -> dict:
+        """Shufersal item → row for scrapers_register.bulk_register_items()."""
+        _, category_name = self._category(item)
+        external_id = self.external_id(item)
+        return {
+            "external_prod_id": external_id,
+            "prod_name": item.get("name"),
+            "prod_category": category_name,
+            "image_url": self._image_url(item),
+            "barcode": str(external_id) if external_id is not None else None,
+            "price": self._price(item),
+            "unit": item.get("unitDescription"),
+            "unit_size": item.get("unitSize"),
+            "price_per_unit_desc": item.get("pricePerUnit"),
+        }
+
+    def _item_to_response(self, item: dict, internal_id: int | None) -> dict:
+        """Shufersal item → API-facing dict (same keys as HetziHinamScraper)."""
+        category_code, category_name = self._category(item)
+        external_id = self.external_id(item)
+        return {
+            "internal_product_id": internal_id,
+            "prod_id": external_id,
+            "prod_name": item.get("name"),
+            "prod_img": self._image_url(item),
+            "prod_cat_id": item.get("_category_code") or category_code,
+            "prod_cat_name": item.get("_category_name") or category_name,
+            "prod_sub_cat_id": category_code,
+            "prod_sub_cat_name": category_name,
+            "prod_unit_size_desc": item.get("unitDescription"),
+            "prod_unit_size": item.get("unitSize"),
+            "prod_price_per_unit": None,
+            "prod_price_net": self._price(item),
+            "prod_price_un_desc": item.get("pricePerUnit"),
+            "prod_barkod": str(external_id) if external_id is not None else None,
+        }
+
+    def _source_id(self) -> int:
+        """Source.id, looked up once per process."""
+        if self._cached_source_id is None:
+            self._cached_source_id = register_source(name=self.name, base_url=self.BASE).id
+        return self._cached_source_id
+
+    # --------- categories ---------
+    def _get_json(self, path: str, params: dict) -> dict:
+        r = self.client.get(path, params=params)
+        r.raise_for_status()
+        return r.json()
+
+    def list_categories(self) -> list[dict]:
+        """
+        Top-level categories from the search endpoint's category facet.
+        Returns [{id, code, name}]; `id` is the position, used for sync checkpoints.
+        """
+        data = self._get_json(self.SEARCH_PATH, {"q": ":relevance", "limit": 1})
+        categories: list[dict] = []
+        for facet in data.get("facets") or []:
+            if facet.get("code") != "category":
+                continue
+            for value in facet.get("values") or []:
+                if value.get("code"):
+                    categories.append(
+                        {"id": len(categories) + 1, "code": value["code"], "name": value.get("name")}
+                    )
+        return categories
+
+    def fetch_categories(self):
+        return [{"id": c["code"], "name": c["name"]} for c in self.list_categories()]
+
+    # --------- catalog pages (bulk sync) ---------
+    def category_path(self, code: str) -> str:
+        return self.CATEGORY_PATH.format(code=code)
+
+    def category_params(self, page: int) -> dict:
+        # same page-size parameter as search: the /results endpoints read `limit`
+        return {"q": ":relevance", "page": page, "limit": self.PAGE_SIZE}
+
+    @staticmethod
+    def _new_items(category: dict, items: list[dict], seen_ids: set[int]) -> list[dict]:
+        """Priced items not seen in an earlier category, tagged with this category."""
+        fresh = []
+        for item in items:
+            pid = ShufersalScraper.external_id(item)
+            if pid is None or pid in seen_ids or ShufersalScraper._price(item) is None:
+                continue
+            seen_ids.add(pid)
+            item["_category_code"] = category["code"]
+            item["_category_name"] = category["name"]
+            fresh.append(item)
+        return fresh
+
+    def sync_all_to_db(
+        self,
+        *,
+        concurrency: int = 4,
+        rate_per_sec: float | None = None,
+        delta: bool = False,
+        resume: bool = False,
+        batch_size: int = 500,
+    ) -> dict:
+        """
+        Full catalog sync: every page of every category → buy_smart.db / Supabase.
+        Same pipeline, checkpoints and delta/resume options as HetziHinamScraper.sync_all_to_db():
+        categories stream through services.sync_pipeline, pages of one category load
+        concurrently on a pooled async client (services.scraping_worker).
+        """
+        src = register_source(name=self.name, base_url=self.BASE)
+        latest = load_latest_prices(src.id) if delta else None
+
+        resumable = find_resumable_sync_run(src.id) if resume else None
+        if resumable:
+            run_id, categories, completed = resumable
+        else:
+            categories = self.list_categories()
+            run_id, completed = start_sync_run(src.id, categories), set()
+        pending = [c for c in categories if c["id"] not in completed]
+
+        seen_ids: set[int] = set()
+
+        def parse(category: dict, items: list[dict]) -> list[dict]:
+            return [self._item_to_row(item) for item in self._new_items(category, items, seen_ids)]
+
+        def persist(rows: list[dict]) -> dict:
+            return bulk_register_items(src.id, rows, latest=latest)
+
+        def checkpoint(category: dict, item_count: int) -> None:
+            mark_subcategory_done(run_id, category["id"], item_count)
+
+        try:
+            pipeline = asyncio.run(
+                self._run_sync_pipeline(
+                    pending,
+                    parse=parse,
+                    persist=persist,
+                    checkpoint=checkpoint,
+                    concurrency=concurrency,
+                    rate_per_sec=rate_per_sec,
+                    batch_size=batch_size,
+                )
+            )
+        except BaseException as exc:
+            finish_sync_run(run_id, "failed", error=repr(exc))
+            raise
+        finish_sync_run(run_id, "completed")
+        totals = pipeline["persist_totals"]
+
+        stats = {
+            "source": self.name,
+            "sync_run_id": run_id,
+            "resumed": bool(resumable),
+            "categories_fetched": len(pending),
+            "categories_skipped": len(categories) - len(pending),
+            "unique_products_saved": pipeline["rows"],
+            "snapshots_inserted": totals.get("snapshots_inserted", 0),
+            "price_changes": totals.get("price_changes", 0),
+            "batches_written": pipeline["batches"],
+            "elapsed_seconds": pipeline["elapsed_seconds"],
+            "persist_seconds": pipeline["persist_seconds"],
+        }
+        if delta:
+            stats.update(
+                products_new=totals.get("new", 0),
+                prices_changed=totals.get("changed", 0),
+                prices_unchanged=totals.get("unchanged", 0),
+            )
+        return stats
+
+    async def _run_sync_pipeline(
+        self,
+        categories: list[dict],
+        *,
+        parse,
+        persist,
+        checkpoint,
+        concurrency: int,
+        rate_per_sec: float | None,
+        batch_size: int,
+    ) -> dict:
+        from backend_portfolio.routers.Projects.buy_smart.services.scraping_worker import (
+            DEFAULT_RATE_PER_SEC,
+            ShufersalCategoryFetcher,
+        )
+        from backend_portfolio.routers.Projects.buy_smart.services.sync_pipeline import (
+            run_catalog_pipeline,
+        )
+
+        async with ShufersalCategoryFetcher(
+            self,
+            concurrency=concurrency,
+            rate_per_sec=DEFAULT_RATE_PER_SEC if rate_per_sec is None else rate_per_sec,
+        ) as fetcher:
+            return await run_catalog_pipeline(
+                categories,
+                fetch=lambda category: fetcher.fetch_category_items(category["code"]),
+                parse=parse,
+                persist=persist,
+                on_partition_done=checkpoint,
+                batch_size=batch_size,
+                # Each category already fans out over its pages; keep few categories in flight.
+                queue_size=2,
+            )
+
+    # --------- live search ---------
+    def search(self, q: str, page: int = 0, page_size: int = 10):
+        """
+        Live search, same contract as HetziHinamScraper.search(): the response is built
+        from the Shufersal payload and the hits are saved by the write-behind queue.
+        """
+        source_id = self._source_id()
+        data = self._get_json(self.SEARCH_PATH, {"q": q, "page": page, "limit": page_size})
+        items = [item for item in self.page_items(data) if self.external_id(item) is not None]
+        items = items[:page_size]
+
+        rows = [self._item_to_row(item) for item in items]
+        live_search_writer.enqueue(source_id, [row for row in rows if row["price"] is not None])
+        internal_ids = lookup_product_ids(source_id, [self.external_id(item) for item in items])
+        return {
+            "searched_results": [
+                self._item_to_response(item, internal_ids.get(self.external_id(item)))
+                for item in items
+            ]
+        }
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-item persist (_persist_item) vs batched upsert (_persist_batch) on SQLite.
+
+Uses a throw-away SQLite file and synthetic Hetzi-shaped items — no network, no Supabase.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_bulk_persist --items 2000
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from backend_portfolio.routers.Projects.buy_smart.scripts.temp_sqlite import use_temp_sqlite
+
+
+def _fake_items(count: int, offset: int = 0) -> list[dict]:
+    return [
+        {
+            "Id": 100000 + offset + i,
+            "Name": f"מוצר בדיקה {offset + i}",
+            "BarKod": f"729{offset + i:010d}",
+            "Img": None,
+            "CategoryName": f"קטגוריה {i % 40}",
+            "Price_NET": round(5 + (i % 97) * 0.37, 2),
+            "UnitSizeDesc": "גרם",
+            "UnitSize": "500",
+            "PricePerUnitDesc": "1.20 ₪ ל-100 גרם",
+        }
+        for i in range(count)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare per-item vs batched persist on SQLite")
+    parser.add_argument("--items", type=int, default=2000, help="Items per run (default: 2000)")
+    parser.add_argument("--batch", type=int, default=300, help="Items per subcategory batch (default: 300)")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="buy_smart_bench_"))
+    # Point buy_smart_engine at a fresh SQLite file before any other DB module is imported.
+    use_temp_sqlite(workdir / "bench.db")
+
+    from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.hetzi_hinam import HetziHinamScraper
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import register_source
+
+    create_db_and_tables()
+    scraper = HetziHinamScraper()
+    src = register_source(name=scraper.name, base_url=scraper.BASE)
+
+    items = _fake_items(args.items)
+    started = time.perf_counter()
+    for item in items:
+        scraper._persist_item(src, item)
+    per_item_sec = time.perf_counter() - started
+
+    items = _fake_items(args.items, offset=args.items)
+    started = time.perf_counter()
+    for start in range(0, len(items), args.batch):
+        scraper._persist_batch(src, items[start:start + args.batch])
+    batched_sec = time.perf_counter() - started
+
+    print(f"SQLite file: {workdir / 'bench.db'}")
+    print(f"  per-item: {args.items / per_item_sec:10.0f} rows/sec ({per_item_sec:.2f}s)")
+    print(f"  batched:  {args.items / batched_sec:10.0f} rows/sec ({batched_sec:.2f}s)")
+    print(f"  speedup:  {per_item_sec / batched_sec:10.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
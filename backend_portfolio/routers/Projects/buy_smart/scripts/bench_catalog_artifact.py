@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /scrapers/search served from the catalog artifact vs the live DB query.
+
+Builds the read-only catalog artifact (services/catalog_artifact.py) from the configured
+DB — Supabase when DATABASE_URL is set — into a temp file, then times the same queries
+through CatalogArtifact.search() and db_search.search_products_from_db() (the round
+trip every search makes without a local index) and reports avg / p95 latency.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_catalog_artifact
+
+Optional:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_catalog_artifact \\
+        --query חלב --query שוקולד --repeat 50
+
+    # no database at hand: seed a throw-away SQLite catalog instead
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_catalog_artifact \\
+        --synthetic 30000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from backend_portfolio.routers.Projects.buy_smart.scripts.temp_sqlite import use_temp_sqlite
+
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+
+_WORDS = ("חלב", "שוקולד", "במבה", "גבינה", "לחם", "קפה", "אורז", "שמן", "ביצים", "יוגורט", "מים", "פסטה")
+_BRANDS = ("תנובה", "שטראוס", "אסם", "עלית", "טרה", "יטבתה", "נסטלה", "סוגת")
+
+
+def _seed_synthetic(products: int, seed: int) -> None:
+    from sqlmodel import Session
+
+    from backend_portfolio.buy_smart_db import buy_smart_engine
+    from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
+    from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+        Product,
+        ProductLatestPrice,
+        Source,
+    )
+    from backend_portfolio.routers.Projects.buy_smart.utils.normalizers import normalize_text
+
+    rng = random.Random(seed)
+    create_db_and_tables()
+    with Session(buy_smart_engine) as session:
+        sources = [Source(name="hetzi", base_url="https://shop.hazi-hinam.co.il"),
+                   Source(name="shufersal", base_url="https://www.shufersal.co.il")]
+        session.add_all(sources)
+        session.commit()
+        rows = []
+        for i in range(1, products + 1):
+            name = f"{rng.choice(_WORDS)} {rng.choice(_BRANDS)} {rng.randint(1, 3000)} גרם"
+            rows.append(
+                {
+                    "source_id": sources[i % 2].id,
+                    "external_prod_id": i,
+                    "prod_name": name,
+                    "normalized_name": normalize_text(name),
+                    "prod_category": f"{rng.choice(_WORDS)} ומוצרים",
+                    "barcode": f"729{i:010d}",
+                }
+            )
+        session.execute(Product.__table__.insert(), rows)
+        session.execute(
+            ProductLatestPrice.__table__.insert(),
+            [{"product_id": i, "price_agorot": rng.randint(300, 6000)} for i in range(1, products + 1)],
+        )
+        session.commit()
+
+
+def _time_ms(fn, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _summary(timings: list[float]) -> str:
+    p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) >= 2 else timings[0]
+    return f"{statistics.fmean(timings):8.2f} {p95:8.2f}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare catalog artifact search with live DB search")
+    parser.add_argument("--query", action="append", default=None, help="Query to time (repeatable)")
+    parser.add_argument("--repeat", type=int, default=20, help="Searches per query and backend (default: 20)")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--synthetic", type=int, default=None, metavar="PRODUCTS",
+                        help="Seed a throw-away SQLite catalog with this many products instead of using .env")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="buy_smart_artifact_bench_"))
+    if args.synthetic:
+        # Point buy_smart_engine at a fresh SQLite file before any other DB module is imported.
+        use_temp_sqlite(workdir / "bench.db")
+    else:
+        load_dotenv(_ENV, override=True)
+
+    from backend_portfolio.buy_smart_db import DB_URL
+    from backend_portfolio.database import describe_db_target
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.db_search import search_products_from_db
+    from backend_portfolio.routers.Projects.buy_smart.services.catalog_artifact import (
+        CatalogArtifact,
+        build_catalog_artifact,
+    )
+
+    if args.synthetic:
+        _seed_synthetic(args.synthetic, args.seed)
+    print(f"Database target: {describe_db_target(DB_URL)}")
+
+    built = build_catalog_artifact(workdir / "catalog.sqlite")
+    print(f"Artifact: {built['products']:,} products, {built['file_bytes'] / 1024 / 1024:.1f} MiB, "
+          f"built in {built['build_seconds']}s")
+    started = time.perf_counter()
+    artifact = CatalogArtifact(workdir / "catalog.sqlite")
+    print(f"Opened in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print()
+    print(f"{'query':14}{'hits':>6}  {'artifact avg / p95 ms':>22}  {'db avg / p95 ms':>22}  speedup")
+    for q in args.query or ["חלב", "שוקולד", "במבה", "גבינה תנובה", "ח"]:
+        hits = len(artifact.search(q, limit=args.limit)[0]["searched_results"])
+        search_products_from_db(q, limit=args.limit)  # warm the pool / plan
+        local = _time_ms(lambda: artifact.search(q, limit=args.limit), args.repeat)
+        remote = _time_ms(lambda: search_products_from_db(q, limit=args.limit), args.repeat)
+        speedup = statistics.fmean(remote) / max(statistics.fmean(local), 1e-9)
+        print(f"{q!r:14}{hits:>6}  {_summary(local):>22}  {_summary(remote):>22}  {speedup:6.1f}×")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: HetziHinamScraper.sync_all_to_db() against the local replay server
+(scripts/hetzi_replay.py) into a throw-away SQLite file — no home IP, no live site.
+
+Reports items/sec, DB round trips (cursor executes + commits) and peak RSS of the sync
+process. The replay server runs in a child process so its memory is not counted.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_hetzi_sync \\
+        --subcategories 300 --items 60 --latency-ms 80 --concurrency 8
+
+    # recorded fixtures, flaky network, short-lived guest tokens, two runs (2nd = delta)
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_hetzi_sync \\
+        --fixtures /tmp/hetzi_fixtures --error-rate 0.02 --token-ttl 5 --runs 2 --delta
+"""
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from backend_portfolio.routers.Projects.buy_smart.scripts.temp_sqlite import use_temp_sqlite
+
+
+def _replay_child(conn, fixtures: str, options: dict) -> None:
+    import threading
+
+    from backend_portfolio.routers.Projects.buy_smart.scripts.hetzi_replay import make_replay_server
+
+    server = make_replay_server(Path(fixtures), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn.send(server.server_port)
+    conn.recv()  # parent says stop
+    server.shutdown()
+    conn.send(dict(server.stats))
+
+
+def _rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KiB
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Hetzi catalog sync against a replay server")
+    parser.add_argument("--fixtures", type=Path, default=None, help="Recorded fixture dir (default: synthesize)")
+    parser.add_argument("--subcategories", type=int, default=200, help="Synthetic subcategories (default: 200)")
+    parser.add_argument("--items", type=int, default=50, help="Synthetic items per subcategory (default: 50)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Replay latency per response (default: 50)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of replayed requests answered 503")
+    parser.add_argument("--token-ttl", type=float, default=0.0, help="Replay guest-token lifetime, seconds (0 = never)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel subcategory requests (default: 4)")
+    parser.add_argument("--rate", type=float, default=0.0, help="Max requests/sec, 0 = unlimited (default: 0)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per DB batch (default: 500)")
+    parser.add_argument("--delta", action="store_true", help="Run the sync in delta mode")
+    parser.add_argument("--runs", type=int, default=1, help="Sync runs on the same DB (default: 1)")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="buy_smart_sync_bench_"))
+    # Point buy_smart_engine at a fresh SQLite file before any other DB module is imported.
+    use_temp_sqlite(workdir / "bench.db")
+
+    from backend_portfolio.routers.Projects.buy_smart.scripts.hetzi_replay import synthesize
+
+    fixtures = args.fixtures
+    if fixtures is None:
+        fixtures = workdir / "fixtures"
+        synthesize(fixtures, subcategories=args.subcategories, items=args.items)
+
+    ctx = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe()
+    child = ctx.Process(
+        target=_replay_child,
+        args=(
+            child_conn,
+            str(fixtures),
+            {"latency_ms": args.latency_ms, "error_rate": args.error_rate, "token_ttl": args.token_ttl},
+        ),
+        daemon=True,
+    )
+    child.start()
+    port = parent_conn.recv()
+
+    from sqlalchemy import event
+
+    from backend_portfolio.buy_smart_db import buy_smart_engine
+    from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.hetzi_hinam import HetziHinamScraper
+
+    create_db_and_tables()
+    round_trips = {"executes": 0, "commits": 0}
+
+    @event.listens_for(buy_smart_engine, "before_cursor_execute")
+    def _count_execute(*_args) -> None:
+        round_trips["executes"] += 1
+
+    @event.listens_for(buy_smart_engine, "commit")
+    def _count_commit(*_args) -> None:
+        round_trips["commits"] += 1
+
+    scraper = HetziHinamScraper()
+    scraper.BASE = f"http://127.0.0.1:{port}"
+    scraper.client.base_url = scraper.BASE
+    scraper.client.headers.update(scraper.default_headers())
+
+    print(f"Fixtures: {fixtures}")
+    print(f"SQLite file: {workdir / 'bench.db'}")
+    print(
+        f"Replay: latency {args.latency_ms} ms, error rate {args.error_rate}, token ttl {args.token_ttl or '∞'} s; "
+        f"concurrency {args.concurrency}, rate {args.rate or '∞'}/s, batch {args.batch_size}"
+    )
+    print(f"Peak RSS before sync: {_rss_mib():.1f} MiB")
+
+    try:
+        for run in range(1, args.runs + 1):
+            round_trips.update(executes=0, commits=0)
+            started = time.perf_counter()
+            stats = scraper.sync_all_to_db(
+                delay_sec=0,
+                concurrency=args.concurrency,
+                rate_per_sec=args.rate,
+                delta=args.delta,
+                batch_size=args.batch_size,
+            )
+            elapsed = time.perf_counter() - started
+            items = stats["unique_products_saved"]
+            print()
+            print(f"Run {run}:")
+            print(f"  items:          {items} from {stats['subcategories_fetched']} subcategories")
+            print(f"  wall time:      {elapsed:.2f} s (DB writes {stats['persist_seconds']:.2f} s)")
+            print(f"  items/sec:      {items / elapsed:,.0f}")
+            print(f"  snapshots:      {stats['snapshots_inserted']} inserted")
+            print(f"  DB round trips: {round_trips['executes']} executes + {round_trips['commits']} commits")
+            print(f"  peak RSS:       {_rss_mib():.1f} MiB")
+    finally:
+        parent_conn.send("stop")
+        print()
+        print(f"Replay server: {parent_conn.recv()}")
+        child.join(timeout=5)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: utils/normalizers.normalize_text() over the full catalog.
+
+Reads every product name from the configured DB — Supabase when DATABASE_URL is set —
+and times normalize_text() over all of them (best of --repeat passes), next to the plain
+str.casefold() the search used before, and reports names/s and µs per name. Also
+prints how many distinct names collapse into the same normalized key.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_normalizers
+
+Optional:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_normalizers --repeat 10
+
+    # no database at hand: names with the spelling variants stores actually send
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_normalizers \\
+        --synthetic 100000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+
+_WORDS = ("חלב", "שוקולד", "במבה", "גבינה לבנה", "לחם", "קפה נמס", "אורז", "שמן זית", "ביצים", "יוגורט")
+_BRANDS = ("תנובה", "שטראוס", "אסם", "עלית", "טרה", "יטבתה", "נסטלה", "סוגת")
+_UNITS = ("גרם", "גר'", "ג", "ק\"ג", "ק״ג", "קג", "kg", "ליטר", "ל", "מ\"ל", "ml", "יח'")
+_NIQQUD = "ְֱֲֳִֵֶַָֹֻּׁׂ"
+
+
+def _synthetic_names(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        word = rng.choice(_WORDS)
+        if rng.random() < 0.1:
+            word = "".join(ch + (rng.choice(_NIQQUD) if rng.random() < 0.5 else "") for ch in word)
+        gap = "" if rng.random() < 0.3 else " "
+        names.append(f"{word} {rng.choice(_BRANDS)} - {rng.randint(1, 1500)}{gap}{rng.choice(_UNITS)}")
+    return names
+
+
+def _catalog_names() -> list[str]:
+    from sqlmodel import Session, select
+
+    from backend_portfolio.buy_smart_db import DB_URL, buy_smart_engine
+    from backend_portfolio.database import describe_db_target
+    from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import Product
+
+    print(f"Database target: {describe_db_target(DB_URL)}")
+    with Session(buy_smart_engine) as session:
+        return list(session.exec(select(Product.prod_name).execution_options(yield_per=5000)))
+
+
+def _best_seconds(fn, names: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for name in names:
+            fn(name)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Time normalize_text() over the Buy Smart catalog")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the catalog; the best is reported")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="NAMES",
+                        help="Generate this many names instead of reading the DB from .env")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        names = _synthetic_names(args.synthetic, args.seed)
+    else:
+        load_dotenv(_ENV, override=True)
+        names = _catalog_names()
+    if not names:
+        print("No product names to normalize.")
+        return 1
+
+    from backend_portfolio.routers.Projects.buy_smart.utils.normalizers import normalize_text
+
+    chars = sum(len(name) for name in names)
+    print(f"Names: {len(names):,} ({chars / len(names):.1f} chars avg)")
+    print()
+    print(f"{'':16}{'seconds':>9}{'names/s':>13}{'µs/name':>9}")
+    for label, fn in (("str.casefold", str.casefold), ("normalize_text", normalize_text)):
+        seconds = _best_seconds(fn, names, args.repeat)
+        print(f"{label:16}{seconds:9.3f}{len(names) / seconds:13,.0f}{seconds / len(names) * 1e6:9.2f}")
+
+    folded = {name.casefold() for name in names}
+    keys = {normalize_text(name) for name in names}
+    print()
+    print(f"Distinct names: {len(folded):,} casefolded → {len(keys):,} normalized keys")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark: daily pricesnapshot rows vs run-length priceinterval rows on a synthetic year.
+
+Builds a throw-away SQLite file with `--products` products × `--days` days of snapshots
+(prices change every few weeks, a few products skip days), folds them with
+compact_price_history(), then reports:
+
+- rows and on-disk bytes (table + index pages, via SQLite's dbstat) of both tables
+- /prices/history query time: ROW_NUMBER over pricesnapshot vs intervals expanded per day
+- that both return the same per-day history
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.bench_price_history \\
+        --products 2000 --days 365
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from backend_portfolio.routers.Projects.buy_smart.scripts.temp_sqlite import use_temp_sqlite
+
+
+def _synthetic_snapshots(product_ids: list[int], days: int, seed: int):
+    """Yield snapshot rows day by day: ~3-8 week price runs, 2% of products skip a day."""
+    rng = random.Random(seed)
+    start = datetime.utcnow().date() - timedelta(days=days)
+    price = {pid: rng.randint(300, 6000) for pid in product_ids}  # agorot
+    next_change = {pid: rng.randint(21, 56) for pid in product_ids}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        timestamp = datetime.combine(day, datetime.min.time()) + timedelta(hours=3)
+        rows = []
+        for pid in product_ids:
+            if offset >= next_change[pid]:
+                price[pid] = round(price[pid] * rng.choice((0.9, 0.95, 1.05, 1.1)))
+                next_change[pid] = offset + rng.randint(21, 56)
+            if rng.random() < 0.02:
+                continue
+            rows.append(
+                {
+                    "product_id": pid,
+                    "price_agorot": price[pid],
+                    "timestamp": timestamp,
+                    "snapshot_day": day,
+                }
+            )
+        yield rows
+
+
+def _table_bytes(conn, table: str) -> int | None:
+    try:
+        return conn.exec_driver_sql(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = ? "
+            "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?)",
+            (table, table),
+        ).scalar()
+    except Exception:
+        return None  # SQLite built without dbstat
+
+
+def _fmt_bytes(value: int | None) -> str:
+    return "n/a" if value is None else f"{value / 1024 / 1024:,.1f} MiB"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare daily snapshots vs price intervals on SQLite")
+    parser.add_argument("--products", type=int, default=2000, help="Synthetic products (default: 2000)")
+    parser.add_argument("--days", type=int, default=365, help="Days of history (default: 365)")
+    parser.add_argument("--queries", type=int, default=200, help="History requests to time (default: 200)")
+    parser.add_argument("--ids-per-query", type=int, default=10, help="product_ids per request (default: 10)")
+    parser.add_argument("--limit", type=int, default=30, help="per_product_limit (default: 30)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="buy_smart_history_bench_"))
+    # Point buy_smart_engine at a fresh SQLite file before any other DB module is imported.
+    use_temp_sqlite(workdir / "bench.db")
+
+    from sqlalchemy import func
+    from sqlmodel import Session, select
+
+    from backend_portfolio.buy_smart_db import buy_smart_engine
+    from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
+    from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+        PriceSnapshot,
+        Product,
+        Source,
+    )
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.history_api import _load_prices_history
+    from backend_portfolio.routers.Projects.buy_smart.services.price_history import (
+        compact_price_history,
+        from_agorot,
+    )
+
+    create_db_and_tables()
+    with Session(buy_smart_engine) as session:
+        source = Source(name="hetzi", base_url="https://shop.hazi-hinam.co.il")
+        session.add(source)
+        session.commit()
+        session.execute(
+            Product.__table__.insert(),
+            [
+                {
+                    "source_id": source.id,
+                    "external_prod_id": i,
+                    "prod_name": f"מוצר בדיקה {i}",
+                    "barcode": f"729{i:010d}",
+                    "unit": "גרם",
+                    "unit_size": "500",
+                }
+                for i in range(1, args.products + 1)
+            ],
+        )
+        session.commit()
+        product_ids = list(session.exec(select(Product.id)).all())
+
+    print(f"SQLite file: {workdir / 'bench.db'}")
+    started = time.perf_counter()
+    with Session(buy_smart_engine) as session:
+        for rows in _synthetic_snapshots(product_ids, args.days, args.seed):
+            session.execute(PriceSnapshot.__table__.insert(), rows)
+        session.commit()
+    print(f"Generated {args.products} products × {args.days} days in {time.perf_counter() - started:.1f}s")
+
+    compact = compact_price_history()
+    print(f"Compaction: {compact}")
+
+    with buy_smart_engine.connect() as conn:
+        snapshot_rows = conn.exec_driver_sql("SELECT COUNT(*) FROM pricesnapshot").scalar()
+        interval_rows = conn.exec_driver_sql("SELECT COUNT(*) FROM priceinterval").scalar()
+        snapshot_bytes = _table_bytes(conn, "pricesnapshot")
+        interval_bytes = _table_bytes(conn, "priceinterval")
+
+    # Baseline: the per-day query /prices/history ran against pricesnapshot
+    def snapshot_history(ids: list[int], min_days: int, limit: int) -> dict:
+        qualifying = (
+            select(PriceSnapshot.product_id)
+            .where(PriceSnapshot.product_id.in_(ids))
+            .group_by(PriceSnapshot.product_id)
+            .having(func.count(func.distinct(PriceSnapshot.snapshot_day)) >= min_days)
+        )
+        ranked = (
+            select(
+                PriceSnapshot.product_id,
+                PriceSnapshot.snapshot_day,
+                PriceSnapshot.price_agorot,
+                func.row_number()
+                .over(partition_by=PriceSnapshot.product_id, order_by=PriceSnapshot.snapshot_day.desc())
+                .label("rn"),
+            )
+            .where(PriceSnapshot.product_id.in_(qualifying))
+            .subquery()
+        )
+        stmt = select(ranked).where(ranked.c.rn <= limit).order_by(ranked.c.product_id, ranked.c.rn)
+        history: dict[str, list] = {}
+        with Session(buy_smart_engine) as session:
+            for row in session.execute(stmt):
+                history.setdefault(str(row.product_id), []).append(
+                    (row.snapshot_day.isoformat(), from_agorot(row.price_agorot))
+                )
+        return history
+
+    rng = random.Random(args.seed)
+    requests = [rng.sample(product_ids, args.ids_per_query) for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    baseline = [snapshot_history(ids, 2, args.limit) for ids in requests]
+    snapshot_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    intervals = [_load_prices_history(ids, 2, args.limit)["history"] for ids in requests]
+    interval_seconds = time.perf_counter() - started
+
+    same = all(
+        {pid: [(e["day"], e["price"]) for e in entries] for pid, entries in got.items()} == expected
+        for got, expected in zip(intervals, baseline)
+    )
+
+    print()
+    print(f"{'':24}{'pricesnapshot':>16}{'priceinterval':>16}")
+    print(f"{'rows':24}{snapshot_rows:>16,}{interval_rows:>16,}")
+    print(f"{'table + index bytes':24}{_fmt_bytes(snapshot_bytes):>16}{_fmt_bytes(interval_bytes):>16}")
+    print(
+        f"{'history query (avg)':24}{snapshot_seconds / args.queries * 1000:>13.2f} ms"
+        f"{interval_seconds / args.queries * 1000:>13.2f} ms"
+    )
+    print(f"Same per-day history: {same}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
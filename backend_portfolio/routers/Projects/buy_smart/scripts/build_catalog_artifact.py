@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Build the read-only Buy Smart catalog artifact (services/catalog_artifact.py) from the
+configured DB. Catalog syncs already do this when BUY_SMART_CATALOG_INDEX=artifact; use
+this to (re)build it by hand, e.g. before shipping the file with a deploy.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.build_catalog_artifact
+
+Optional:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.build_catalog_artifact \\
+        --path backend_portfolio/buy_smart_catalog.sqlite
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+load_dotenv(_ENV, override=True)
+
+from backend_portfolio.buy_smart_db import DB_URL
+from backend_portfolio.database import describe_db_target
+from backend_portfolio.routers.Projects.buy_smart.services.catalog_artifact import (
+    build_catalog_artifact,
+    catalog_artifact_path,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the Buy Smart read-only catalog artifact")
+    parser.add_argument(
+        "--path",
+        type=Path,
+        default=None,
+        help=f"Output file (default: BUY_SMART_CATALOG_ARTIFACT_PATH or {catalog_artifact_path()})",
+    )
+    args = parser.parse_args()
+
+    print(f"Database target: {describe_db_target(DB_URL)}")
+    stats = build_catalog_artifact(args.path)
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
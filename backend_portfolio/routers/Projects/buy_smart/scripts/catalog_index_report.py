@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Build the in-memory Buy Smart catalog index from the configured DB and report its size.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.catalog_index_report
+
+Optional:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.catalog_index_report \\
+        --query חלב --repeat 1000
+"""
+from __future__ import annotations
+
+import argparse
+import resource
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+load_dotenv(_ENV, override=True)
+
+from backend_portfolio.buy_smart_db import DB_URL
+from backend_portfolio.database import describe_db_target
+from backend_portfolio.routers.Projects.buy_smart.services.catalog_index import build_catalog_index
+
+
+def _rss_kib() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Report Buy Smart in-memory catalog index size and speed")
+    parser.add_argument("--query", action="append", default=None, help="Query to time (repeatable)")
+    parser.add_argument("--repeat", type=int, default=200, help="Searches per query (default: 200)")
+    args = parser.parse_args()
+
+    print(f"Database target: {describe_db_target(DB_URL)}")
+    rss_before = _rss_kib()
+    index = build_catalog_index()
+    rss_after = _rss_kib()
+
+    print("Index:")
+    for key, value in index.stats().items():
+        print(f"  {key}: {value}")
+    print(f"  peak_rss_growth_kib: {rss_after - rss_before}")
+
+    print("Search latency:")
+    for q in args.query or ["חלב", "שוקולד", "במבה", "ח"]:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            hits = index.search(q, limit=50)[0]["searched_results"]
+        avg_us = (time.perf_counter() - started) / args.repeat * 1e6
+        print(f"  {q!r}: {len(hits)} hits, {avg_us:.0f} µs/search")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
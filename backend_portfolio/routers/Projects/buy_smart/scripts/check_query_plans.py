@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression check: EXPLAIN the hot Buy Smart queries and fail unless each one
+reads its table through the expected index.
+
+- SQLite: EXPLAIN QUERY PLAN — the table must be SEARCHed / SCANned USING the index
+  (search: the product_fts virtual table must be queried through its FTS5 index)
+- Postgres: EXPLAIN (FORMAT JSON) with enable_seqscan off (small tables would otherwise
+  legitimately prefer a seq scan) — an Index / Index Only / Bitmap Index Scan on the index
+
+/scrapers/search, /scrapers/matches, getCategories and /prices/deals are checked with the
+statements their endpoints run (db_search.py / history_api.py builders). The other
+lookups mirror scrapers_register.py and the services; when one of those changes shape,
+update its twin here.
+
+Run from repository root (configured DB — Supabase when DATABASE_URL is set):
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.check_query_plans
+
+Optional:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.check_query_plans \\
+        --sqlite-path backend_portfolio/buy_smart.db
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.check_query_plans --fresh
+
+Exit status 1 when any query misses its index.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+from datetime import date
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from backend_portfolio.routers.Projects.buy_smart.scripts.temp_sqlite import use_temp_sqlite
+
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+
+PRIMARY_KEY = "PRIMARY KEY"
+FTS5_INDEX = "FTS5"
+
+
+def _hot_queries(engine):
+    """
+    (label, table, expected index, statement) of every hot read / upsert lookup; the
+    index may be a tuple of acceptable ones.
+    """
+    from sqlalchemy import func
+    from sqlmodel import select
+
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.db_search import (
+        categories_stmt,
+        find_products_stmt,
+        search_products_stmt,
+    )
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.history_api import deals_stmt
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.search_index import FTS_TABLE
+    from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+        CategoryPriceRollup,
+        PriceInterval,
+        PriceRollup,
+        PriceSnapshot,
+        Product,
+        ProductLatestPrice,
+        Source,
+    )
+
+    day = date(2026, 1, 1)
+    ids = [1, 2, 3]
+    if engine.dialect.name == "postgresql":
+        search_table, search_index = "product", "ix_product_normalized_name_trgm"
+    else:
+        search_table, search_index = FTS_TABLE, FTS5_INDEX
+    return [
+        ("/scrapers/search", search_table, search_index,
+         search_products_stmt("שוקולד", sources="all", limit=50, engine=engine)),
+        ("/scrapers/matches", "product", "ix_product_normalized_name",
+         find_products_stmt("חלב תנובה 3% 1 ליטר", exclude_source="hetzi")),
+        ("getCategories", "product", "ix_product_source_category", categories_stmt()),
+        ("/prices/deals", "price_change", "ix_price_change_day_pct",
+         deals_stmt(day, 0, None, "all", 50)),
+        # a category / source filter may drive the join from product instead
+        ("/prices/deals?category&source", "price_change",
+         ("ix_price_change_day_pct", "ux_price_change_product_day"),
+         deals_stmt(day, 10, "חלב", "shufersal", 50)),
+        ("source by name", "source", "ix_source_name",
+         select(Source.id).where(Source.name == "hetzi")),
+        ("register_product lookup", "product", "ux_product_source_external",
+         select(Product).where(Product.source_id == 1, Product.external_prod_id == 1)),
+        ("snapshot of a product on a day", "pricesnapshot", "ux_pricesnapshot_product_day",
+         select(PriceSnapshot.id).where(PriceSnapshot.product_id == 1, PriceSnapshot.snapshot_day == day)),
+        ("latest prices of search hits", "product_latest_price", PRIMARY_KEY,
+         select(ProductLatestPrice).where(ProductLatestPrice.product_id.in_(ids))),
+        ("/prices/history intervals", "priceinterval", "ux_priceinterval_product_from",
+         select(PriceInterval).where(PriceInterval.product_id.in_(ids)).order_by(
+             PriceInterval.product_id, PriceInterval.valid_from.desc()
+         )),
+        ("compaction watermark", "priceinterval", "ux_priceinterval_product_from",
+         select(PriceInterval.product_id, func.max(PriceInterval.valid_to))
+         .where(PriceInterval.product_id.in_(ids))
+         .group_by(PriceInterval.product_id)),
+        ("/prices/rollups", "price_rollup", "ux_price_rollup_product_period",
+         select(PriceRollup).where(
+             PriceRollup.product_id.in_(ids), PriceRollup.period == "week", PriceRollup.period_start >= day
+         )),
+        ("category rollup refresh", "price_rollup", "ix_price_rollup_period_start",
+         select(PriceRollup.period_start, func.count())
+         .where(PriceRollup.period == "week", PriceRollup.period_start >= day)
+         .group_by(PriceRollup.period_start)),
+        ("/prices/categories/rollups", "category_price_rollup", "ux_category_price_rollup_period",
+         select(CategoryPriceRollup).where(
+             CategoryPriceRollup.source_id == 1,
+             CategoryPriceRollup.prod_category == "חלב",
+             CategoryPriceRollup.period == "week",
+             CategoryPriceRollup.period_start >= day,
+         )),
+    ]
+
+
+def _sqlite_plan(conn, sql: str, table: str, index: str) -> tuple[bool, str]:
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    details = [row[-1] for row in rows]
+    reads = [d for d in details if d.split(" ")[:2] in (["SEARCH", table], ["SCAN", table])]
+    if index == PRIMARY_KEY:
+        ok = bool(reads) and all("PRIMARY KEY" in d or "sqlite_autoindex" in d for d in reads)
+    elif index == FTS5_INDEX:
+        ok = bool(reads) and all("VIRTUAL TABLE INDEX" in d for d in reads)
+    else:
+        indexes = index if isinstance(index, tuple) else (index,)
+        ok = bool(reads) and all(any(f"INDEX {name} " in f"{d} " for name in indexes) for d in reads)
+    return ok, " | ".join(details)
+
+
+def _postgres_index_scans(node: dict, found: list[tuple[str, str]]) -> None:
+    if node.get("Relation Name") or node.get("Index Name"):
+        found.append((node.get("Node Type", ""), node.get("Index Name") or node.get("Relation Name")))
+    for child in node.get("Plans", ()):
+        _postgres_index_scans(child, found)
+
+
+def _postgres_plan(conn, sql: str, table: str, index: str) -> tuple[bool, str]:
+    with conn.begin():
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        raw = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    found: list[tuple[str, str]] = []
+    _postgres_index_scans(plan[0]["Plan"], found)
+    expected = (f"{table}_pkey",) if index == PRIMARY_KEY else index if isinstance(index, tuple) else (index,)
+    ok = any(name in expected and "Index" in node for node, name in found)
+    return ok, ", ".join(f"{node} on {name}" for node, name in found)
+
+
+def check_query_plans(engine) -> bool:
+    """Print one OK / FAIL line per hot query. Returns True when every plan uses its index."""
+    postgres = engine.dialect.name == "postgresql"
+    all_ok = True
+    with engine.connect() as conn:
+        for label, table, index, stmt in _hot_queries(engine):
+            sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+            try:
+                ok, plan = (_postgres_plan if postgres else _sqlite_plan)(conn, sql, table, index)
+            except Exception as exc:
+                ok, plan = False, f"error: {exc}"
+            all_ok &= ok
+            print(f"{'OK  ' if ok else 'FAIL'} {label:32} {' | '.join(index) if isinstance(index, tuple) else index}")
+            if not ok:
+                print(f"     plan: {plan}")
+    return all_ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check that the hot Buy Smart queries use their indexes")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--sqlite-path", type=Path, default=None, help="Check this SQLite file instead of .env")
+    target.add_argument("--fresh", action="store_true",
+                        help="Check a new, empty SQLite database created by init_db")
+    args = parser.parse_args()
+
+    if args.fresh:
+        # Point buy_smart_engine at a fresh SQLite file before any other DB module is imported.
+        use_temp_sqlite(Path(tempfile.mkdtemp(prefix="buy_smart_plans_")) / "plans.db")
+    else:
+        load_dotenv(_ENV, override=True)
+
+    from backend_portfolio.buy_smart_db import DB_URL, buy_smart_engine
+    from backend_portfolio.database import create_sqlmodel_engine, describe_db_target
+    from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
+
+    if args.sqlite_path:
+        engine = create_sqlmodel_engine(f"sqlite:///{args.sqlite_path.resolve()}")
+        print(f"Database target: sqlite ({args.sqlite_path.resolve()})")
+    else:
+        engine = buy_smart_engine
+        print(f"Database target: {describe_db_target(DB_URL)}")
+    if args.fresh:
+        create_db_and_tables(engine)
+
+    return 0 if check_query_plans(engine) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
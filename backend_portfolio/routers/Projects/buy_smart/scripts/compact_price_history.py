@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Local script: fold daily price snapshots into run-length intervals (priceinterval) and
+optionally prune old snapshots. Sync keeps intervals current on its own; run this after
+importing snapshots directly, and with --prune-days to reclaim pricesnapshot storage.
+Week / month rollups from the first folded day onwards are refreshed afterwards.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.compact_price_history
+
+    # keep only the last 30 days of daily snapshots (history is served from intervals)
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.compact_price_history --prune-days 30
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load .env before any DB module import (override corrupted shell vars).
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+load_dotenv(_ENV, override=True)
+
+from backend_portfolio.buy_smart_db import DB_URL
+from backend_portfolio.database import describe_db_target
+from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
+from backend_portfolio.routers.Projects.buy_smart.services.price_history import compact_price_history
+from backend_portfolio.routers.Projects.buy_smart.services.price_rollups import refresh_price_rollups
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fold pricesnapshot rows into priceinterval")
+    parser.add_argument(
+        "--prune-days",
+        type=int,
+        default=None,
+        help="Delete snapshots older than N days after folding (each product keeps its newest)",
+    )
+    parser.add_argument("--chunk", type=int, default=500, help="Products per transaction (default: 500)")
+    args = parser.parse_args()
+
+    print(f"Database target: {describe_db_target(DB_URL)}")
+    try:
+        create_db_and_tables()
+        stats = compact_price_history(prune_days=args.prune_days, chunk_products=args.chunk)
+        if stats["first_day_folded"] is not None:
+            stats["rollups"] = refresh_price_rollups(since=stats["first_day_folded"])
+    except Exception as exc:
+        print(f"Compaction failed: {exc}", file=sys.stderr)
+        return 1
+
+    print("Done.")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Record / replay stand-in for the Hetzi Hinam API, so scraper performance work does not
+need a home IP or the live site.
+
+    record      call the live site once (home IP) and save the responses as fixture files:
+                /proxy/init (cookie shape only — the guest token is not stored),
+                Catalog/get, getItemsBySubCategory per subcategory, getItemsBySearch per term
+    synthesize  write a fixture set of any size (N subcategories × M items) for benchmarks
+    serve       replay a fixture directory on localhost with configurable latency, error
+                rate and guest-token expiry (expired / unknown H_Authentication → 401)
+
+Fixture layout (one directory):
+
+    init.json                   {"cookie": {"expires_in": ...}}
+    catalog.json                Catalog/get response
+    subcategory_<id>.json       getItemsBySubCategory response
+    search_index.json           {"<search phrase>": "search_<n>.json"}
+    search_<n>.json             getItemsBySearch response
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.hetzi_replay record \\
+        --out /tmp/hetzi_fixtures --max-subcategories 50 --search חלב --search לחם
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.hetzi_replay serve \\
+        --fixtures /tmp/hetzi_fixtures --port 8766 --latency-ms 80 --error-rate 0.02 --token-ttl 30
+
+Point a scraper at the replay server with HetziHinamScraper.BASE = "http://127.0.0.1:8766".
+The end-to-end benchmark (scripts/bench_hetzi_sync.py) starts one for you.
+Without --fixtures, `serve` uses the small sample set in scrapers/fixtures/hetzi.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+SAMPLE_FIXTURES = Path(__file__).resolve().parents[1] / "scrapers" / "fixtures" / "hetzi"
+
+INIT_PATH = "/proxy/init"
+CATALOG_PATH = "/proxy/api/Catalog/get"
+SUBCATEGORY_PATH = "/proxy/api/item/getItemsBySubCategory"
+SEARCH_PATH = "/proxy/api/item/getItemsBySearch"
+
+_EMPTY_SEARCH = {"IsOK": True, "Results": {"Categories": []}}
+
+
+def _write_json(path: Path, data) -> None:
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+def _read_json(path: Path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+# --------- record ---------
+def record(out: Path, *, max_subcategories: int | None, searches: list[str], delay_sec: float) -> dict:
+    """Capture live responses into `out` (run from a home IP — Hetzi blocks cloud hosts)."""
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.hetzi_hinam import HetziHinamScraper
+
+    out.mkdir(parents=True, exist_ok=True)
+    scraper = HetziHinamScraper()
+
+    scraper._bootstrap_guest()
+    _token, expires_in = scraper._parse_h_auth_cookie()
+    _write_json(out / "init.json", {"cookie": {"expires_in": expires_in}})
+
+    catalog = scraper.fetch_catalog_tree()
+    _write_json(out / "catalog.json", catalog)
+
+    subs = scraper.list_subcategories()[:max_subcategories]
+    for sub in subs:
+        r = scraper._request_with_guest(
+            "GET",
+            scraper.SUBCATEGORY_PATH,
+            params=scraper.subcategory_params(sub["id"]),
+            timeout=scraper.SUBCATEGORY_TIMEOUT,
+        )
+        r.raise_for_status()
+        _write_json(out / f"subcategory_{sub['id']}.json", r.json())
+        if delay_sec:
+            time.sleep(delay_sec)
+
+    index = {}
+    for n, phrase in enumerate(searches):
+        payload = {
+            "Object": {"SearchPhrase": phrase, "SearchPhrases": None, "ItemGroupping": 1},
+            "Paging": {"Page": 1, "PageSize": 10},
+        }
+        r = scraper._request_with_guest("POST", SEARCH_PATH, json=payload)
+        r.raise_for_status()
+        index[phrase] = f"search_{n}.json"
+        _write_json(out / index[phrase], r.json())
+    _write_json(out / "search_index.json", index)
+
+    return {"subcategories": len(subs), "searches": len(index), "out": str(out)}
+
+
+# --------- synthesize ---------
+def _synthetic_item(item_id: int, sub_id: int, sub_name: str) -> dict:
+    price = round(3 + (item_id % 97) * 0.41, 2)
+    return {
+        "Id": item_id,
+        "Name": f"מוצר {item_id}",
+        "BarKod": f"729{item_id:010d}",
+        "Img": f"https://img.example/{item_id}.jpg",
+        "CategoryId": sub_id // 10,
+        "CategoryName": f"קטגוריה {sub_id // 10}",
+        "SubCategoryId": sub_id,
+        "SubCategoryName": sub_name,
+        "Price_NET": price,
+        "PricePerUnit": round(price / 5, 2),
+        "UnitSizeDesc": "גרם",
+        "UnitSize": "500",
+        "PricePerUnitDesc": f"{price / 5:.2f} ₪ ל-100 גרם",
+    }
+
+
+def synthesize(out: Path, *, subcategories: int, items: int, overlap: float = 0.1) -> dict:
+    """Fixture set with `subcategories` × `items`; ~`overlap` of items are cross-listed."""
+    out.mkdir(parents=True, exist_ok=True)
+    _write_json(out / "init.json", {"cookie": {"expires_in": 3600}})
+
+    subs = [{"Id": 1000 + n, "Name": f"תת קטגוריה {n}"} for n in range(subcategories)]
+    _write_json(
+        out / "catalog.json",
+        {"IsOK": True, "Results": {"Categories": [{"Id": 1, "Name": "סופר", "SubCategories": subs}]}},
+    )
+
+    rng = random.Random(7)
+    total = 0
+    for n, sub in enumerate(subs):
+        ids = [100000 + n * items + i for i in range(items)]
+        if n:
+            shared = int(items * overlap)
+            ids[:shared] = rng.sample(range(100000, 100000 + n * items), min(shared, n * items))
+        listing = [_synthetic_item(i, sub["Id"], sub["Name"]) for i in ids]
+        total += len(listing)
+        _write_json(
+            out / f"subcategory_{sub['Id']}.json",
+            {"IsOK": True, "Results": {"Category": {"SubCategory": {"Items": listing}}}},
+        )
+
+    first = _read_json(out / f"subcategory_{subs[0]['Id']}.json") if subs else None
+    sample = first["Results"]["Category"]["SubCategory"]["Items"][:5] if first else []
+    _write_json(out / "search_0.json", {"IsOK": True, "Results": {"Categories": [{"Items": sample}]}})
+    _write_json(out / "search_index.json", {"מוצר": "search_0.json"})
+    return {"subcategories": subcategories, "items": total, "out": str(out)}
+
+
+# --------- replay ---------
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves one fixture directory. Settings live on the server (see make_replay_server)."""
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, status: int, obj, cookie: str | None = None) -> None:
+        body = json.dumps(obj, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if cookie:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _token_ok(self) -> bool:
+        server = self.server
+        for part in (self.headers.get("Cookie") or "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name != "H_Authentication":
+                continue
+            try:
+                token = json.loads(unquote(value)).get("access_token")
+            except ValueError:
+                return False
+            with server.lock:
+                issued = server.tokens.get(token)
+            return issued is not None and (
+                not server.token_ttl or time.monotonic() - issued < server.token_ttl
+            )
+        return False
+
+    def _serve(self, method: str) -> None:
+        server = self.server
+        url = urlparse(self.path)
+        with server.lock:
+            server.stats["requests"] += 1
+        if server.latency:
+            time.sleep(server.latency * (0.5 + random.random()))
+
+        if url.path == INIT_PATH:
+            with server.lock:
+                server.stats["inits"] += 1
+                token = f"replay-{server.stats['inits']}"
+                server.tokens[token] = time.monotonic()
+            cookie = {"access_token": token, "expires_in": server.expires_in}
+            return self._send(200, {}, cookie=f"H_Authentication={quote(json.dumps(cookie))}; Path=/")
+
+        if not self._token_ok():
+            with server.lock:
+                server.stats["unauthorized"] += 1
+            return self._send(401, {"Message": "Authorization has been denied for this request."})
+
+        if server.error_rate and random.random() < server.error_rate:
+            with server.lock:
+                server.stats["injected_errors"] += 1
+            return self._send(503, {"Message": "injected error"})
+
+        fixtures: Path = server.fixtures
+        if method == "GET" and url.path == CATALOG_PATH:
+            return self._send(200, _read_json(fixtures / "catalog.json"))
+        if method == "GET" and url.path == SUBCATEGORY_PATH:
+            sub_id = (parse_qs(url.query).get("Id") or [""])[0]
+            path = fixtures / f"subcategory_{sub_id}.json"
+            if path.exists():
+                return self._send(200, _read_json(path))
+            return self._send(404, {"Message": f"no fixture for subcategory {sub_id}"})
+        if method == "POST" and url.path == SEARCH_PATH:
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            phrase = (payload.get("Object") or {}).get("SearchPhrase")
+            name = server.search_index.get(phrase)
+            return self._send(200, _read_json(fixtures / name) if name else _EMPTY_SEARCH)
+        self._send(404, {"Message": "not recorded"})
+
+    def do_GET(self) -> None:
+        self._serve("GET")
+
+    def do_POST(self) -> None:
+        self._serve("POST")
+
+
+def make_replay_server(
+    fixtures: Path = SAMPLE_FIXTURES,
+    *,
+    port: int = 0,
+    latency_ms: float = 0.0,
+    error_rate: float = 0.0,
+    token_ttl: float = 0.0,
+) -> ThreadingHTTPServer:
+    """
+    Replay server (not started). latency_ms is the mean per-response delay (±50% jitter),
+    error_rate the share of data requests answered with 503, token_ttl the seconds after
+    which a guest token gets 401 (0 = never).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), ReplayHandler)
+    server.daemon_threads = True
+    server.fixtures = Path(fixtures)
+    server.latency = latency_ms / 1000
+    server.error_rate = error_rate
+    server.token_ttl = token_ttl
+    index = server.fixtures / "search_index.json"
+    server.search_index = _read_json(index) if index.exists() else {}
+    init = server.fixtures / "init.json"
+    server.expires_in = (_read_json(init).get("cookie") or {}).get("expires_in", 3600) if init.exists() else 3600
+    server.tokens = {}
+    server.lock = threading.Lock()
+    server.stats = {"requests": 0, "inits": 0, "unauthorized": 0, "injected_errors": 0}
+    return server
+
+
+def start_replay_server(fixtures: Path = SAMPLE_FIXTURES, **options) -> ThreadingHTTPServer:
+    """make_replay_server() running on a background thread; base URL from .server_port."""
+    server = make_replay_server(fixtures, **options)
+    threading.Thread(target=server.serve_forever, name="hetzi-replay", daemon=True).start()
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Record / replay the Hetzi Hinam API on localhost")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="Save live responses as fixtures (needs home IP)")
+    rec.add_argument("--out", type=Path, required=True, help="Fixture directory to write")
+    rec.add_argument("--max-subcategories", type=int, default=None, help="Only the first N subcategories")
+    rec.add_argument("--search", action="append", default=[], help="Search phrase to record (repeatable)")
+    rec.add_argument("--delay", type=float, default=0.3, help="Seconds between subcategory requests")
+
+    syn = sub.add_parser("synthesize", help="Write a synthetic fixture set for benchmarks")
+    syn.add_argument("--out", type=Path, required=True, help="Fixture directory to write")
+    syn.add_argument("--subcategories", type=int, default=200)
+    syn.add_argument("--items", type=int, default=50, help="Items per subcategory")
+
+    srv = sub.add_parser("serve", help="Replay a fixture directory")
+    srv.add_argument("--fixtures", type=Path, default=SAMPLE_FIXTURES)
+    srv.add_argument("--port", type=int, default=8766)
+    srv.add_argument("--latency-ms", type=float, default=0.0, help="Mean delay per response")
+    srv.add_argument("--error-rate", type=float, default=0.0, help="Share of data requests answered 503")
+    srv.add_argument("--token-ttl", type=float, default=0.0, help="Guest token lifetime in seconds (0 = never)")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        print(record(args.out, max_subcategories=args.max_subcategories, searches=args.search, delay_sec=args.delay))
+        return 0
+    if args.command == "synthesize":
+        print(synthesize(args.out, subcategories=args.subcategories, items=args.items))
+        return 0
+
+    server = make_replay_server(
+        args.fixtures,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        token_ttl=args.token_ttl,
+    )
+    print(f"Hetzi replay on http://127.0.0.1:{server.server_port} (fixtures: {args.fixtures})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"stats: {server.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
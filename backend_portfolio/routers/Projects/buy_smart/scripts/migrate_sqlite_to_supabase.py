@@ -2,7 +2,19 @@
 """
 One-time bulk copy: local buy_smart.db (SQLite) → Supabase (Postgres).
 
-Migrates only Buy Smart tables: source, product, pricesnapshot.
+Migrates only Buy Smart tables: source, product, pricesnapshot — then rebuilds the derived
+tables (priceinterval, product_latest_price, price_change, rollups) on the target.
+
+Streaming copy engine:
+- destination keys (source names, (source_id, external_prod_id), (product_id, snapshot_day))
+  are loaded once up front — no existence SELECT per row
+- the SQLite tables are read with keyset pagination (WHERE id > last ORDER BY id), so every
+  batch costs the same however far into the file it is
+- products go in with a multi-row INSERT ... RETURNING id, snapshots with COPY FROM STDIN
+  (psycopg2) or executemany on other drivers
+- progress is reported as rows/sec
+
+Rows that already exist on the target are skipped, so an interrupted copy can be re-run.
 
 Run from repository root:
 
@@ -11,40 +23,65 @@ Run from repository root:
 Optional:
 
     python -m backend_portfolio.routers.Projects.buy_smart.scripts.migrate_sqlite_to_supabase \\
-        --sqlite-path backend_portfolio/buy_smart.db --batch-size 1000
+        --sqlite-path backend_portfolio/buy_smart.db --batch-size 5000
 
 Do NOT `source backend_portfolio/.env` in bash if your DB password contains `$` or `!`.
 """
 from __future__ import annotations
 
 import argparse
+import csv
+import io
 import sys
-from datetime import datetime
+import time
+from datetime import date
 from pathlib import Path
 
 from dotenv import load_dotenv
-from sqlalchemy import func, text
-from sqlmodel import Session, SQLModel, select
+from sqlalchemy import func, insert, text
+from sqlmodel import Session, select
 
 _ENV = Path(__file__).resolve().parents[4] / ".env"
 load_dotenv(_ENV, override=True)
 
 from backend_portfolio.buy_smart_db import DB_URL, buy_smart_engine
 from backend_portfolio.database import create_sqlmodel_engine, describe_db_target, is_sqlite_url
+from backend_portfolio.routers.Projects.buy_smart.init_db import (
+    create_db_and_tables,
+    migrate_compact_price_schema,
+    migrate_snapshot_day,
+)
 from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
     PriceSnapshot,
     Product,
     Source,
 )
+from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import rebuild_latest_prices
+from backend_portfolio.routers.Projects.buy_smart.services.price_changes import rebuild_price_changes
+from backend_portfolio.routers.Projects.buy_smart.services.price_history import (
+    compact_price_history,
+    refold_price_intervals,
+)
+from backend_portfolio.routers.Projects.buy_smart.services.price_rollups import refresh_price_rollups
+from backend_portfolio.routers.Projects.buy_smart.services.replication import (
+    PRODUCT_COLUMNS,
+    SNAPSHOT_COLUMNS,
+    keyset_batches,
+    refresh_derived_tables,
+)
+from backend_portfolio.routers.Projects.buy_smart.utils.normalizers import normalize_text
 
 DEFAULT_SQLITE = Path(__file__).resolve().parents[4] / "buy_smart.db"
 
-
 def _ensure_tables() -> None:
-    SQLModel.metadata.create_all(
-        buy_smart_engine,
-        tables=[Source.__table__, Product.__table__, PriceSnapshot.__table__],
-    )
+    # Same tables / migrations as the API startup (snapshot_day, product_latest_price, ...)
+    create_db_and_tables()
+
+
+def _upgrade_source(sqlite_engine) -> None:
+    # Older buy_smart.db files: add snapshot_day, move to price_agorot + product static fields
+    migrate_snapshot_day(sqlite_engine)
+    migrate_compact_price_schema(sqlite_engine)
 
 
 def _verify_target() -> int:
@@ -62,29 +99,52 @@ def _verify_target() -> int:
         return 1
 
 
+class _Progress:
+    """Running rows/sec line for one table."""
+
+    def __init__(self, table: str):
+        self.table = table
+        self.started = time.perf_counter()
+        self.read = 0
+        self.written = 0
+
+    def update(self, read: int, written: int) -> None:
+        self.read += read
+        self.written += written
+        print(
+            f"  {self.table}: {self.read:,} read, {self.written:,} written, {self.rate():,.0f} rows/s",
+            end="\r",
+            flush=True,
+        )
+
+    def rate(self) -> float:
+        return self.read / max(time.perf_counter() - self.started, 1e-9)
+
+    def done(self) -> None:
+        elapsed = time.perf_counter() - self.started
+        print(
+            f"  {self.table}: {self.read:,} read, {self.written:,} written "
+            f"in {elapsed:.1f}s ({self.rate():,.0f} rows/s)"
+        )
+
+
 def migrate_sources(sqlite_engine, stats: dict) -> dict[int, int]:
     """source sqlite id → postgres id"""
     id_map: dict[int, int] = {}
     with Session(sqlite_engine) as src_sess, Session(buy_smart_engine) as dst_sess:
-        rows = src_sess.exec(select(Source)).all()
-        for row in rows:
+        existing = {name: source_id for source_id, name in dst_sess.exec(select(Source.id, Source.name)).all()}
+        for row in src_sess.exec(select(Source)).all():
             if row.id is None:
                 continue
-            existing = dst_sess.exec(select(Source).where(Source.name == row.name)).first()
-            if existing:
-                id_map[row.id] = existing.id
+            if row.name in existing:
+                id_map[row.id] = existing[row.name]
                 stats["source_skipped"] += 1
-            else:
-                created = Source(
-                    name=row.name,
-                    base_url=row.base_url,
-                    last_seen=row.last_seen,
-                )
-                dst_sess.add(created)
-                dst_sess.commit()
-                dst_sess.refresh(created)
-                id_map[row.id] = created.id
-                stats["source_inserted"] += 1
+                continue
+            created = Source(name=row.name, base_url=row.base_url, last_seen=row.last_seen)
+            dst_sess.add(created)
+            dst_sess.commit()
+            id_map[row.id] = existing[row.name] = created.id
+            stats["source_inserted"] += 1
     return id_map
 
 
@@ -95,100 +155,182 @@ def migrate_products(
     stats: dict,
 ) -> dict[int, int]:
     """product sqlite id → postgres id"""
+    with Session(buy_smart_engine) as dst_sess:
+        existing = {
+            (source_id, ext_id): product_id
+            for product_id, source_id, ext_id in dst_sess.execute(
+                select(Product.id, Product.source_id, Product.external_prod_id)
+            )
+        }
+    print(f"  target products preloaded: {len(existing):,}")
+
+    table = Product.__table__
+    insert_returning = insert(table).returning(table.c.id, sort_by_parameter_order=True)
     id_map: dict[int, int] = {}
-    offset = 0
-    while True:
-        with Session(sqlite_engine) as src_sess:
-            rows = src_sess.exec(select(Product).offset(offset).limit(batch_size)).all()
-        if not rows:
-            break
-
-        with Session(buy_smart_engine) as dst_sess:
-            for row in rows:
-                if row.id is None:
-                    continue
-                pg_source_id = source_id_map.get(row.source_id)
-                if pg_source_id is None:
-                    stats["product_skipped_no_source"] += 1
-                    continue
-
-                existing = dst_sess.exec(
-                    select(Product).where(
-                        Product.source_id == pg_source_id,
-                        Product.external_prod_id == row.external_prod_id,
-                    )
-                ).first()
-                if existing:
-                    id_map[row.id] = existing.id
-                    stats["product_skipped"] += 1
-                else:
-                    created = Product(
-                        source_id=pg_source_id,
-                        external_prod_id=row.external_prod_id,
-                        prod_name=row.prod_name,
-                        prod_category=row.prod_category,
-                        image_url=row.image_url,
-                    )
-                    dst_sess.add(created)
-                    dst_sess.flush()
-                    id_map[row.id] = created.id
-                    stats["product_inserted"] += 1
-            dst_sess.commit()
-
-        offset += batch_size
-        print(f"  products processed: {offset}", end="\r", flush=True)
-    print()
+    progress = _Progress("product")
+    for rows in keyset_batches(sqlite_engine, table, ("source_id", *PRODUCT_COLUMNS), batch_size):
+        new_rows: list[dict] = []
+        new_keys: list[tuple[int, int, int]] = []  # (sqlite id, pg source id, external id)
+        for row in rows:
+            pg_source_id = source_id_map.get(row.source_id)
+            if pg_source_id is None:
+                stats["product_skipped_no_source"] += 1
+                continue
+            key = (pg_source_id, row.external_prod_id)
+            if key in existing:
+                if existing[key] is not None:
+                    id_map[row.id] = existing[key]
+                stats["product_skipped"] += 1
+                continue
+            existing[key] = None  # duplicates later in the file map to this row once inserted
+            new_keys.append((row.id, *key))
+            new_rows.append(
+                {
+                    "source_id": pg_source_id,
+                    **{name: row._mapping[name] for name in PRODUCT_COLUMNS},
+                    "normalized_name": normalize_text(row.prod_name),
+                }
+            )
+
+        if new_rows:
+            with Session(buy_smart_engine) as dst_sess:
+                new_ids = dst_sess.execute(insert_returning, new_rows).scalars().all()
+                dst_sess.commit()
+            for (sqlite_id, pg_source_id, ext_id), product_id in zip(new_keys, new_ids):
+                existing[(pg_source_id, ext_id)] = product_id
+                id_map[sqlite_id] = product_id
+            stats["product_inserted"] += len(new_rows)
+        # rows whose key was first seen earlier in this batch
+        for row in rows:
+            if id_map.get(row.id) is None:
+                product_id = existing.get((source_id_map.get(row.source_id), row.external_prod_id))
+                if product_id is not None:
+                    id_map[row.id] = product_id
+        progress.update(len(rows), len(new_rows))
+    progress.done()
     return id_map
 
 
+def _snapshot_key(product_id: int, day: date) -> int:
+    # one int per (product_id, snapshot_day): ~3x smaller than a set of tuples
+    return product_id * 1_000_000 + day.toordinal()
+
+
+def _load_target_snapshot_keys(product_ids: set[int], chunk_size: int = 2000) -> set[int]:
+    """Snapshot keys the target already has for `product_ids` (chunked product_id IN (...))."""
+    keys: set[int] = set()
+    ids = sorted(product_ids)
+    with Session(buy_smart_engine) as dst_sess:
+        for start in range(0, len(ids), chunk_size):
+            stmt = select(PriceSnapshot.product_id, PriceSnapshot.snapshot_day).where(
+                PriceSnapshot.product_id.in_(ids[start:start + chunk_size])
+            )
+            for product_id, day in dst_sess.execute(stmt.execution_options(yield_per=50_000)):
+                keys.add(_snapshot_key(product_id, day))
+    return keys
+
+
+def _copy_rows(conn, table_name: str, columns: tuple[str, ...], rows: list[dict]) -> None:
+    """COPY FROM STDIN (CSV) on psycopg2 — one round trip per batch."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["" if row[name] is None else row[name] for name in columns])
+    buf.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+
+
 def migrate_price_snapshots(
     sqlite_engine,
     product_id_map: dict[int, int],
     batch_size: int,
     stats: dict,
-) -> None:
-    offset = 0
-    while True:
-        with Session(sqlite_engine) as src_sess:
-            rows = src_sess.exec(select(PriceSnapshot).offset(offset).limit(batch_size)).all()
-        if not rows:
-            break
-
-        with Session(buy_smart_engine) as dst_sess:
-            for row in rows:
-                pg_product_id = product_id_map.get(row.product_id)
-                if pg_product_id is None:
-                    stats["snapshot_skipped_no_product"] += 1
-                    continue
-
-                snap_day = row.timestamp.date() if row.timestamp else datetime.utcnow().date()
-                existing = dst_sess.exec(
-                    select(PriceSnapshot).where(
-                        PriceSnapshot.product_id == pg_product_id,
-                        func.date(PriceSnapshot.timestamp) == snap_day,
-                    )
-                ).first()
-                if existing:
-                    stats["snapshot_skipped"] += 1
-                    continue
-
-                dst_sess.add(
-                    PriceSnapshot(
-                        product_id=pg_product_id,
-                        price=row.price,
-                        unit=row.unit,
-                        unit_size=row.unit_size,
-                        price_per_unit_desc=row.price_per_unit_desc,
-                        timestamp=row.timestamp,
-                        url=row.url,
-                    )
+) -> dict[int, date]:
+    """Copy snapshots; returns target product_id → oldest snapshot_day copied in (empty if none)."""
+    seen = _load_target_snapshot_keys(set(product_id_map.values()))
+    print(f"  target snapshot keys preloaded: {len(seen):,}")
+
+    use_copy = buy_smart_engine.dialect.name == "postgresql" and buy_smart_engine.dialect.driver == "psycopg2"
+    table = PriceSnapshot.__table__
+    first_days: dict[int, date] = {}
+    progress = _Progress("pricesnapshot")
+    for rows in keyset_batches(sqlite_engine, table, SNAPSHOT_COLUMNS, batch_size):
+        new_rows = []
+        for row in rows:
+            pg_product_id = product_id_map.get(row.product_id)
+            if pg_product_id is None:
+                stats["snapshot_skipped_no_product"] += 1
+                continue
+            snap_day = row.snapshot_day or row.timestamp.date()
+            key = _snapshot_key(pg_product_id, snap_day)
+            if key in seen:
+                stats["snapshot_skipped"] += 1
+                continue
+            seen.add(key)
+            new_rows.append(
+                {
+                    "product_id": pg_product_id,
+                    "price_agorot": row.price_agorot,
+                    "timestamp": row.timestamp,
+                    "snapshot_day": snap_day,
+                }
+            )
+            if pg_product_id not in first_days or snap_day < first_days[pg_product_id]:
+                first_days[pg_product_id] = snap_day
+
+        if new_rows:
+            with buy_smart_engine.begin() as conn:
+                if use_copy:
+                    _copy_rows(conn, table.name, SNAPSHOT_COLUMNS, new_rows)
+                else:
+                    conn.execute(insert(table), new_rows)
+            stats["snapshot_inserted"] += len(new_rows)
+        progress.update(len(rows), len(new_rows))
+    progress.done()
+    return first_days
+
+
+def _target_first_days() -> dict[int, date]:
+    """product_id → oldest snapshot_day on the target, i.e. every product's whole history."""
+    with Session(buy_smart_engine) as session:
+        return dict(
+            session.exec(
+                select(PriceSnapshot.product_id, func.min(PriceSnapshot.snapshot_day)).group_by(
+                    PriceSnapshot.product_id
                 )
-                stats["snapshot_inserted"] += 1
-            dst_sess.commit()
-
-        offset += batch_size
-        print(f"  price snapshots processed: {offset}", end="\r", flush=True)
-    print()
+            ).all()
+        )
+
+
+def rebuild_derived_tables(first_days: dict[int, date]) -> None:
+    """
+    Intervals, latest prices, change events and rollups for the copied snapshots.
+
+    Copied history can be older than a product's last interval on the target, which
+    compact_price_history() alone never folds — so it is merged into the intervals from
+    the oldest copied day on (replication.refresh_derived_tables); days only the target's
+    intervals still know (pruned snapshots) keep their price. Nothing new copied (e.g.
+    re-running an interrupted copy): refold and rebuild everything.
+    """
+    started = time.perf_counter()
+    if first_days:
+        derived = refresh_derived_tables(buy_smart_engine, first_days)
+        for key, value in derived.items():
+            print(f"  {key}: {value}")
+    else:
+        refold = refold_price_intervals(_target_first_days())
+        print(f"  priceinterval: {refold['intervals_deleted']} replaced by {refold['intervals_inserted']}")
+        compact = compact_price_history()
+        print(f"  priceinterval: {compact['intervals_inserted']} inserted, {compact['intervals_extended']} extended")
+        print(f"  product_latest_price: {rebuild_latest_prices()} rows")
+        print(f"  price_change: {rebuild_price_changes()} rows")
+        rollups = refresh_price_rollups()
+        print(f"  rollups: {rollups['product_rollups']} product, {rollups['category_rollups']} category")
+    print(f"  derived tables rebuilt in {time.perf_counter() - started:.1f}s")
 
 
 def count_sqlite(sqlite_engine, table: str) -> int:
@@ -214,8 +356,8 @@ def main() -> int:
     parser.add_argument(
         "--batch-size",
         type=int,
-        default=500,
-        help="Rows per batch commit (default: 500)",
+        default=5000,
+        help="Source rows per batch / target transaction (default: 5000)",
     )
     args = parser.parse_args()
 
@@ -229,6 +371,7 @@ def main() -> int:
 
     print(f"Source file: {sqlite_path}")
     sqlite_engine = create_sqlmodel_engine(f"sqlite:///{sqlite_path}")
+    _upgrade_source(sqlite_engine)
 
     print("SQLite row counts:")
     for table in ("source", "product", "pricesnapshot"):
@@ -264,10 +407,13 @@ def main() -> int:
     )
 
     print("Migrating pricesnapshot...")
-    migrate_price_snapshots(
+    first_days = migrate_price_snapshots(
         sqlite_engine, product_id_map, args.batch_size, stats
     )
 
+    print("Rebuilding derived tables...")
+    rebuild_derived_tables(first_days)
+
     print()
     print("Done.")
     for key, value in stats.items():
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Local script: recompute product_latest_price (current price per product) from the full
+pricesnapshot history. Sync and live search keep the table up to date on their own; run
+this after importing / editing snapshots directly, or if the table looks out of sync.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.rebuild_latest_prices
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load .env before any DB module import (override corrupted shell vars).
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+load_dotenv(_ENV, override=True)
+
+from backend_portfolio.buy_smart_db import DB_URL
+from backend_portfolio.database import describe_db_target
+from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import rebuild_latest_prices
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild product_latest_price from pricesnapshot")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Rows per INSERT batch (default: 2000)")
+    args = parser.parse_args()
+
+    print(f"Database target: {describe_db_target(DB_URL)}")
+    started = time.perf_counter()
+    try:
+        rows = rebuild_latest_prices(batch_size=args.batch_size)
+    except Exception as exc:
+        print(f"Rebuild failed: {exc}", file=sys.stderr)
+        return 1
+    print(f"product_latest_price rebuilt: {rows} rows in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
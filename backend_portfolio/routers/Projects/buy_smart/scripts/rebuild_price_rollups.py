@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Local script: rebuild the week / month price rollups (price_rollup, category_price_rollup)
+from priceinterval. Catalog syncs keep the current periods up to date; run this to backfill
+after importing history, or with --since to redo the periods from a given day onwards.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.rebuild_price_rollups
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.rebuild_price_rollups --since 2026-01-01
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load .env before any DB module import (override corrupted shell vars).
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+load_dotenv(_ENV, override=True)
+
+from backend_portfolio.buy_smart_db import DB_URL
+from backend_portfolio.database import describe_db_target
+from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
+from backend_portfolio.routers.Projects.buy_smart.services.price_rollups import refresh_price_rollups
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild price_rollup / category_price_rollup")
+    parser.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        default=None,
+        help="Only recompute periods ending on or after this day, YYYY-MM-DD (default: whole history)",
+    )
+    parser.add_argument("--chunk", type=int, default=500, help="Products per transaction (default: 500)")
+    args = parser.parse_args()
+
+    print(f"Database target: {describe_db_target(DB_URL)}")
+    try:
+        create_db_and_tables()
+        stats = refresh_price_rollups(since=args.since, chunk_products=args.chunk)
+    except Exception as exc:
+        print(f"Rollup rebuild failed: {exc}", file=sys.stderr)
+        return 1
+
+    print("Done.")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
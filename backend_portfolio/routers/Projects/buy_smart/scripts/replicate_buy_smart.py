@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Incremental sync between Supabase (Postgres) and a local buy_smart.db (SQLite):
+source, product, pricesnapshot — see services/replication.py.
+
+Each side remembers, per peer and table, the highest id it already copied
+(replication_watermark), so a re-run only streams the rows added since.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.replicate_buy_smart pull
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.replicate_buy_smart push
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.replicate_buy_smart both \\
+        --sqlite-path backend_portfolio/buy_smart.db --batch-size 5000
+
+pull: Supabase → local, push: local → Supabase, both: push then pull.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+load_dotenv(_ENV, override=True)
+
+from backend_portfolio.buy_smart_db import DB_URL, buy_smart_engine
+from backend_portfolio.database import create_sqlmodel_engine, describe_db_target, is_sqlite_url
+from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
+from backend_portfolio.routers.Projects.buy_smart.services.replication import (
+    REPLICATION_BATCH_SIZE,
+    replicate,
+)
+
+DEFAULT_SQLITE = Path(__file__).resolve().parents[4] / "buy_smart.db"
+
+
+class _Progress:
+    """Running rows/sec line per table."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows: dict[str, int] = {}
+
+    def __call__(self, table: str, rows: int) -> None:
+        self.rows[table] = self.rows.get(table, 0) + rows
+        rate = sum(self.rows.values()) / max(time.perf_counter() - self.started, 1e-9)
+        print(f"  {table}: {self.rows[table]:,} read, {rate:,.0f} rows/s", end="\r", flush=True)
+
+
+def _run(src, dst, peer: str, label: str, batch_size: int) -> None:
+    print(f"{label}...")
+    stats = replicate(src, dst, peer=peer, batch_size=batch_size, progress=_Progress())
+    read = stats["products_read"] + stats["snapshots_read"]
+    print(" " * 60, end="\r")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+    print(f"  rows/s: {read / max(stats['elapsed_seconds'], 1e-9):,.0f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Incremental buy_smart sync between Supabase and local SQLite")
+    parser.add_argument("direction", choices=("pull", "push", "both"))
+    parser.add_argument(
+        "--sqlite-path",
+        type=Path,
+        default=DEFAULT_SQLITE,
+        help=f"Path to local SQLite file (default: {DEFAULT_SQLITE})",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=REPLICATION_BATCH_SIZE,
+        help=f"Rows per batch / destination transaction (default: {REPLICATION_BATCH_SIZE})",
+    )
+    args = parser.parse_args()
+
+    if is_sqlite_url(DB_URL):
+        print("Error: DATABASE_URL must point to Supabase (Postgres), not SQLite.", file=sys.stderr)
+        print(f"  Set DATABASE_URL in {_ENV}", file=sys.stderr)
+        return 1
+    try:
+        with buy_smart_engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as exc:
+        print(f"Supabase connection failed: {exc}", file=sys.stderr)
+        return 1
+
+    sqlite_path = args.sqlite_path.resolve()
+    local_engine = create_sqlmodel_engine(f"sqlite:///{sqlite_path}")
+    remote = describe_db_target(DB_URL)
+    local = f"sqlite:{sqlite_path}"
+    print(f"Remote: {remote}")
+    print(f"Local:  {sqlite_path}")
+
+    # Same tables / migrations as the API startup, on both sides
+    create_db_and_tables(buy_smart_engine)
+    create_db_and_tables(local_engine)
+
+    if args.direction in ("push", "both"):
+        _run(local_engine, buy_smart_engine, local, "Push local → Supabase", args.batch_size)
+    if args.direction in ("pull", "both"):
+        _run(buy_smart_engine, local_engine, remote, "Pull Supabase → local", args.batch_size)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
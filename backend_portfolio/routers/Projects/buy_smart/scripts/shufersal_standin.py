@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Shufersal Online JSON endpoints, served from fixture responses.
+Lets you run ShufersalScraper without touching the real site.
+
+    record      call the live site once and save its responses as a fixture directory
+                (search_root, the first pages of each category, searches)
+    (default)   serve a fixture directory on localhost, or --smoke run the scraper on it
+
+Fixture layout (one directory):
+
+    search_root.json                /search/results?q=:relevance (category facet)
+    category_<code>_page<n>.json    /c/<code>/results?page=<n>
+    search_index.json               {"<search text>": "search_<n>.json"}
+    search_<n>.json                 /search/results?q=<text>
+
+Searches that were not recorded are answered from the category pages (products whose
+name contains the text). Without --fixtures the small sample set in
+scrapers/fixtures/shufersal is served: two categories with a cross-listed and an unpriced
+product, trimmed by hand to the /results shape — `record` replaces it with live payloads.
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.shufersal_standin record \\
+        --out /tmp/shufersal_fixtures --max-categories 5 --max-pages 3 --search חלב --search לחם
+
+    # serve only (point a scraper at it with ShufersalScraper.BASE = "http://127.0.0.1:8765")
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.shufersal_standin --port 8765 \\
+        --fixtures /tmp/shufersal_fixtures
+
+    # smoke run: search + categories + full sync into a throw-away SQLite file
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.shufersal_standin --smoke --latency-ms 50
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from backend_portfolio.routers.Projects.buy_smart.scripts.temp_sqlite import use_temp_sqlite
+
+FIXTURES = Path(__file__).resolve().parents[1] / "scrapers" / "fixtures" / "shufersal"
+_CATEGORY_RE = re.compile(r"^/online/he/c/([^/]+)/results$")
+
+
+def _write_json(path: Path, data) -> None:
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+# --------- record ---------
+def record(
+    out: Path,
+    *,
+    max_categories: int | None,
+    max_pages: int | None,
+    searches: list[str],
+    delay_sec: float,
+) -> dict:
+    """Capture live responses into `out`, fetched with the scraper's own paths and params."""
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.shufersal import ShufersalScraper
+
+    out.mkdir(parents=True, exist_ok=True)
+    scraper = ShufersalScraper()
+
+    _write_json(out / "search_root.json", scraper._get_json(scraper.SEARCH_PATH, {"q": ":relevance", "limit": 1}))
+
+    categories = scraper.list_categories()[:max_categories]
+    pages_written = 0
+    for category in categories:
+        path = scraper.category_path(category["code"])
+        page, pages = 0, 1
+        while page < pages and (max_pages is None or page < max_pages):
+            data = scraper._get_json(path, scraper.category_params(page))
+            pages = scraper.page_count(data)
+            if max_pages is not None and pages > max_pages:
+                # a sync against the stand-in then stops at the last recorded page
+                data["pagination"]["numberOfPages"] = pages = max_pages
+            _write_json(out / f"category_{category['code']}_page{page}.json", data)
+            pages_written += 1
+            page += 1
+            if delay_sec:
+                time.sleep(delay_sec)
+
+    index = {}
+    for n, q in enumerate(searches):
+        index[q] = f"search_{n}.json"
+        _write_json(out / index[q], scraper._get_json(scraper.SEARCH_PATH, {"q": q, "page": 0, "limit": 10}))
+    _write_json(out / "search_index.json", index)
+
+    return {"categories": len(categories), "pages": pages_written, "searches": len(index), "out": str(out)}
+
+
+# --------- serve ---------
+def _load(fixtures: Path, name: str) -> dict | None:
+    path = fixtures / name
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _search_fixture(fixtures: Path, q: str, limit: int, page: int) -> dict:
+    items: dict[str, dict] = {}  # by product code: cross-listed products appear once
+    for path in sorted(fixtures.glob("category_*_page*.json")):
+        for item in json.loads(path.read_text(encoding="utf-8"))["results"]:
+            items.setdefault(item["code"], item)
+    hits = [item for item in items.values() if q in (item.get("name") or "")]
+    pages = max(1, (len(hits) + limit - 1) // limit)
+    return {
+        "results": hits[page * limit:(page + 1) * limit],
+        "pagination": {
+            "pageSize": limit,
+            "currentPage": page,
+            "numberOfPages": pages,
+            "totalNumberOfResults": len(hits),
+        },
+        "facets": [],
+    }
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    fixtures = FIXTURES
+    search_index: dict[str, str] = {}
+    latency_sec = 0.0
+    requests = 0
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _json(self, obj: dict | None, status: int = 200) -> None:
+        body = json.dumps(obj if obj is not None else {"error": "no fixture"}, ensure_ascii=False).encode()
+        self.send_response(status if obj is not None else 404)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        type(self).requests += 1
+        if self.latency_sec:
+            time.sleep(self.latency_sec)
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        page = int(query.get("page", 0))
+
+        if url.path == "/online/he/search/results":
+            q = query.get("q", "")
+            if q.startswith(":"):
+                return self._json(_load(self.fixtures, "search_root.json"))
+            if q in self.search_index:
+                return self._json(_load(self.fixtures, self.search_index[q]))
+            return self._json(_search_fixture(self.fixtures, q, int(query.get("limit", 20)), page))
+
+        match = _CATEGORY_RE.match(url.path)
+        if match:
+            return self._json(_load(self.fixtures, f"category_{match.group(1)}_page{page}.json"))
+
+        self._json(None)
+
+
+def serve(port: int = 0, latency_ms: float = 0.0, fixtures: Path = FIXTURES) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread; returns the server (see .server_port)."""
+    StandinHandler.fixtures = Path(fixtures)
+    StandinHandler.search_index = _load(StandinHandler.fixtures, "search_index.json") or {}
+    StandinHandler.latency_sec = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", port), StandinHandler)
+    threading.Thread(target=server.serve_forever, name="shufersal-standin", daemon=True).start()
+    return server
+
+
+def _smoke(server: ThreadingHTTPServer) -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="buy_smart_shufersal_"))
+    # Point buy_smart_engine at a fresh SQLite file before any other DB module is imported.
+    use_temp_sqlite(workdir / "standin.db")
+
+    from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
+    from backend_portfolio.routers.Projects.buy_smart.scrapers.shufersal import ShufersalScraper
+    from backend_portfolio.routers.Projects.buy_smart.services.write_behind import live_search_writer
+
+    create_db_and_tables()
+    scraper = ShufersalScraper()
+    scraper.BASE = f"http://127.0.0.1:{server.server_port}"
+    scraper.client.base_url = scraper.BASE
+
+    categories = scraper.fetch_categories()
+    print(f"categories: {categories}")
+
+    hits = scraper.search("חלב")["searched_results"]
+    print(f"search 'חלב': {len(hits)} hits, first: {hits[0]['prod_name'] if hits else None}")
+    live_search_writer.flush()
+
+    stats = scraper.sync_all_to_db(concurrency=4, rate_per_sec=0)
+    print(f"sync (SQLite file {workdir / 'standin.db'}):")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+    print(f"  stand-in requests: {StandinHandler.requests}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Record / serve Shufersal fixtures on localhost")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every response")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES, help="Fixture directory to serve")
+    parser.add_argument("--smoke", action="store_true", help="Run the scraper against the stand-in and exit")
+    sub = parser.add_subparsers(dest="command")
+
+    rec = sub.add_parser("record", help="Save live responses as fixtures")
+    rec.add_argument("--out", type=Path, required=True, help="Fixture directory to write")
+    rec.add_argument("--max-categories", type=int, default=None, help="Only the first N categories")
+    rec.add_argument("--max-pages", type=int, default=None, help="Only the first N pages of each category")
+    rec.add_argument("--search", action="append", default=[], help="Search text to record (repeatable)")
+    rec.add_argument("--delay", type=float, default=0.3, help="Seconds between category page requests")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        print(
+            record(
+                args.out,
+                max_categories=args.max_categories,
+                max_pages=args.max_pages,
+                searches=args.search,
+                delay_sec=args.delay,
+            )
+        )
+        return 0
+
+    server = serve(0 if args.smoke else args.port, args.latency_ms, args.fixtures)
+    if args.smoke:
+        try:
+            return _smoke(server)
+        finally:
+            server.shutdown()
+
+    print(f"Shufersal stand-in on http://127.0.0.1:{server.server_port} (fixtures: {args.fixtures})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -23,6 +23,7 @@ load_dotenv(_ENV, override=True)
 
 from backend_portfolio.buy_smart_db import DB_URL, buy_smart_engine
 from backend_portfolio.database import describe_db_target, is_sqlite_url
+from backend_portfolio.routers.Projects.buy_smart.init_db import create_db_and_tables
 from backend_portfolio.routers.Projects.buy_smart.scrapers.manager import sync_hetzi_catalog
 
 
@@ -33,6 +34,8 @@ def _verify_db_connection() -> int:
         print("Warning: DATABASE_URL not set — syncing to local SQLite, not Supabase.")
         print(f"  Set DATABASE_URL in {_ENV}")
     try:
+        # Idempotent: new tables / migrations (e.g. product_latest_price) before writing
+        create_db_and_tables()
         with buy_smart_engine.connect() as conn:
             count = conn.execute(text("SELECT COUNT(*) FROM product")).scalar()
         print(f"Connection OK — product rows before sync: {count}")
@@ -52,7 +55,29 @@ def main() -> int:
         "--delay",
         type=float,
         default=0.3,
-        help="Seconds to wait between subcategory requests (default: 0.3)",
+        help="Seconds to wait between subcategory requests when --concurrency is 1 (default: 0.3)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Parallel subcategory requests; >1 uses the async worker with a rate limiter (default: 1)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=None,
+        help="Max requests/sec for --concurrency > 1 (default: 4)",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Only write price snapshots for new products and changed prices",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last interrupted sync from its last completed subcategory",
     )
     args = parser.parse_args()
 
@@ -67,9 +92,16 @@ def main() -> int:
     print()
 
     try:
-        stats = sync_hetzi_catalog(delay_sec=args.delay)
+        stats = sync_hetzi_catalog(
+            delay_sec=args.delay,
+            concurrency=args.concurrency,
+            rate_per_sec=args.rate,
+            delta=args.delta,
+            resume=args.resume,
+        )
     except Exception as exc:
         print(f"Sync failed: {exc}", file=sys.stderr)
+        print("Tip: re-run with --resume to continue from the last completed subcategory.", file=sys.stderr)
         return 1
 
     print("Done.")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Local script: bulk-sync the Shufersal Online catalog into Supabase (or local SQLite fallback).
+
+Run from repository root:
+
+    python -m backend_portfolio.routers.Projects.buy_smart.scripts.sync_shufersal_catalog
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+# Load .env before any DB module import (override corrupted shell vars).
+_ENV = Path(__file__).resolve().parents[4] / ".env"
+load_dotenv(_ENV, override=True)
+
+from backend_portfolio.buy_smart_db import buy_smart_engine
+from backend_portfolio.routers.Projects.buy_smart.scrapers.manager import sync_shufersal_catalog
+from backend_portfolio.routers.Projects.buy_smart.scripts.sync_hetzi_catalog import _verify_db_connection
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Sync full Shufersal Online catalog to Supabase / buy_smart.db")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Parallel page requests on the pooled async client (default: 4)",
+    )
+    parser.add_argument("--rate", type=float, default=None, help="Max requests/sec (default: 4)")
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        help="Only write price snapshots for new products and changed prices",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last interrupted sync from its last completed category",
+    )
+    args = parser.parse_args()
+
+    if _verify_db_connection() != 0:
+        return 1
+
+    print()
+    print("Starting Shufersal catalog sync...")
+    print("  Step 1: GET /online/he/search/results?q=:relevance   (category facet)")
+    print("  Step 2: GET /online/he/c/{code}/results?page=N       (every page, concurrently)")
+    print()
+
+    try:
+        stats = sync_shufersal_catalog(
+            concurrency=args.concurrency,
+            rate_per_sec=args.rate,
+            delta=args.delta,
+            resume=args.resume,
+        )
+    except Exception as exc:
+        print(f"Sync failed: {exc}", file=sys.stderr)
+        print("Tip: re-run with --resume to continue from the last completed category.", file=sys.stderr)
+        return 1
+
+    print("Done.")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+
+    try:
+        with buy_smart_engine.connect() as conn:
+            count = conn.execute(text("SELECT COUNT(*) FROM product")).scalar()
+        print(f"  product_rows_in_db: {count}")
+    except Exception:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
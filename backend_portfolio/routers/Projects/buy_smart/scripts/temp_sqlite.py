@@ -0,0 +1,34 @@
+"""
+Throw-away SQLite target for the benchmark / stand-in scripts.
+
+backend_portfolio/database.py loads .env with override=True when it is first imported,
+so clearing DATABASE_URL before importing the DB modules does not keep a script off the
+configured database — the import puts it right back. use_temp_sqlite() imports
+database.py first (the .env load happens now, not after the pin), then pins
+BUY_SMART_DATABASE_URL, which resolve_database_url() reads before anything else, and
+refuses to go on unless buy_smart_engine really points at the temp file.
+
+Call it before importing any other Buy Smart DB module.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def use_temp_sqlite(path: Path) -> str:
+    """Point buy_smart_engine at the SQLite file `path`. Returns its URL; exits if that didn't take."""
+    from backend_portfolio.database import describe_db_target
+
+    url = f"sqlite:///{Path(path).resolve()}"
+    os.environ["BUY_SMART_DATABASE_URL"] = url
+    os.environ["SQL_ECHO"] = "false"
+
+    from backend_portfolio.buy_smart_db import DB_URL
+
+    if DB_URL != url:
+        raise SystemExit(
+            f"Refusing to run: Buy Smart DB target is {describe_db_target(DB_URL)}, "
+            f"expected the throw-away {describe_db_target(url)}"
+        )
+    return url
@@ -0,0 +1,194 @@
+"""
+Bounded TTL + LRU result cache for Buy Smart reads (search, categories, price history).
+
+- size bound: least-recently-used entry is evicted when a cache is full
+- TTL bound:  entries expire after `ttl` seconds even if no sync happened
+- single-flight: concurrent misses for the same key wait for one computation,
+  so a burst of the same popular search produces one DB query
+- invalidation: entries are tagged with the source they read; when a catalog sync
+  finishes (generation bump) every entry for that source — and every "all sources"
+  entry — is dropped
+
+Tune with BUY_SMART_CACHE_SIZE (entries per cache) and BUY_SMART_CACHE_TTL_SEC.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable
+
+ALL_SOURCES = "all"
+
+DEFAULT_MAXSIZE = int(os.getenv("BUY_SMART_CACHE_SIZE", "1024"))
+DEFAULT_TTL_SEC = float(os.getenv("BUY_SMART_CACHE_TTL_SEC", "600"))
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_query(q: str | None) -> str:
+    """Cache-key form of a search phrase: trimmed, casefolded, single spaces."""
+    return _WS_RE.sub(" ", (q or "").strip()).casefold()
+
+
+class _Flight:
+    """One in-progress computation that concurrent callers wait on."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class TTLCache:
+    def __init__(self, name: str, *, maxsize: int = DEFAULT_MAXSIZE, ttl: float = DEFAULT_TTL_SEC):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key → (expires_at, value, tags)
+        self._entries: OrderedDict[Hashable, tuple[float, Any, frozenset[str]]] = OrderedDict()
+        self._inflight: dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    # --------- internal (call with lock held) ---------
+    def _lookup(self, key: Hashable, now: float) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value, _tags = entry
+        if expires_at <= now:
+            del self._entries[key]
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any, tags: frozenset[str], now: float) -> None:
+        self._entries[key] = (now + self.ttl, value, tags)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # --------- public API ---------
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+            return found, value
+
+    def put(self, key: Hashable, value: Any, *, tags: Iterable[str] = (ALL_SOURCES,)) -> None:
+        with self._lock:
+            self._store(key, value, frozenset(tags), time.monotonic())
+
+    def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Any],
+        *,
+        tags: Iterable[str] = (ALL_SOURCES,),
+    ) -> Any:
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            if found:
+                self.hits += 1
+                return value
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = compute()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        else:
+            flight.value = value
+            with self._lock:
+                # A sync may have invalidated this key while we computed; store anyway —
+                # the next invalidation or TTL bounds how long it can be stale.
+                self._store(key, value, frozenset(tags), time.monotonic())
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Drop every entry carrying any of `tags`. Returns the number of entries removed."""
+        tags = set(tags)
+        with self._lock:
+            doomed = [key for key, (_, _, entry_tags) in self._entries.items() if entry_tags & tags]
+            for key in doomed:
+                del self._entries[key]
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_sec": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else None,
+            }
+
+
+search_cache = TTLCache("search")
+categories_cache = TTLCache("categories", maxsize=16)
+history_cache = TTLCache("history")
+
+_CACHES = (search_cache, categories_cache, history_cache)
+
+
+def invalidate_source(source_name: str) -> int:
+    """Drop cached reads for one source (plus cross-source entries) after its catalog changed."""
+    return sum(cache.invalidate_tags({source_name, ALL_SOURCES}) for cache in _CACHES)
+
+
+def on_generation_change(changed: set[str]) -> None:
+    """Catalog generation watcher listener."""
+    if "*" in changed:
+        for cache in _CACHES:
+            cache.clear()
+        return
+    for source_name in changed:
+        invalidate_source(source_name)
+
+
+def cache_stats() -> dict:
+    return {cache.name: cache.stats() for cache in _CACHES}
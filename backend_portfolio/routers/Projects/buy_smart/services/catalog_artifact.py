@@ -0,0 +1,266 @@
+"""
+Read-only SQLite catalog artifact (BUY_SMART_CATALOG_INDEX=artifact).
+
+The in-memory index (catalog_index.py) rebuilds the whole catalog in every worker's
+heap. The artifact is the same data written once to a compact SQLite file that workers
+open `immutable=1` and memory-map, so the catalog lives in the shared page cache:
+
+- item: only the search response columns, latest price already joined in, rows stored in
+  ranking order (shorter names first) so rowid doubles as the tiebreak
+- item_fts: FTS5 trigram index over the normalized name / category (substring match)
+- category: the /scrapers/getCategories lists, precomputed
+- meta: format version and the cataloggeneration it was built from
+
+Ranking and matching are the memory index's (match_bucket), so both modes answer
+identically.
+
+The file is written next to its final path and moved over it with os.replace — open
+connections keep reading the old inode, new connections see the new version. The catalog
+sync rebuilds it (manager._sync_catalog); an API worker whose file is missing or older
+than the DB's cataloggeneration rebuilds it from the DB before swapping it in. When the
+artifact can't be built or read, reads fall back to the live DB.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlmodel import Session
+
+from backend_portfolio.buy_smart_db import buy_smart_engine
+from backend_portfolio.routers.Projects.buy_smart.scrapers.db_search import _SOURCE_ALIASES, category_blocks
+from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import (
+    read_catalog_generations,
+)
+from backend_portfolio.routers.Projects.buy_smart.scrapers.search_index import MIN_INDEXED_TERM_LEN
+from backend_portfolio.routers.Projects.buy_smart.services.catalog_index import (
+    _ITEM_KEYS,
+    load_catalog_records,
+    match_bucket,
+)
+from backend_portfolio.routers.Projects.buy_smart.utils.normalizers import normalize_text
+
+ARTIFACT_FORMAT = 2  # 2: names / categories are normalize_text() keys
+DEFAULT_ARTIFACT_PATH = Path(__file__).resolve().parents[4] / "buy_smart_catalog.sqlite"
+MMAP_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = f"""
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE source (idx INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE category (source_name TEXT NOT NULL, position INTEGER NOT NULL, name TEXT NOT NULL,
+                       PRIMARY KEY (source_name, position)) WITHOUT ROWID;
+CREATE TABLE item (
+    id INTEGER PRIMARY KEY,
+    source_idx INTEGER NOT NULL,
+    name_fold TEXT NOT NULL,
+    category_fold TEXT NOT NULL,
+    {", ".join(_ITEM_KEYS)}
+);
+CREATE VIRTUAL TABLE item_fts USING fts5(
+    name_fold, category_fold,
+    content='item', content_rowid='id',
+    tokenize='trigram'
+);
+"""
+
+_ITEM_COLUMNS = ", ".join(f"item.{key}" for key in _ITEM_KEYS)
+
+
+def catalog_artifact_path() -> Path:
+    return Path(os.getenv("BUY_SMART_CATALOG_ARTIFACT_PATH", str(DEFAULT_ARTIFACT_PATH)))
+
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_catalog_artifact(
+    path: Path | None = None,
+    *,
+    engine=buy_smart_engine,
+    pending_bump: str | None = None,
+) -> dict:
+    """
+    Write a new artifact from the DB and atomically replace `path` with it.
+
+    pending_bump: source whose cataloggeneration the caller bumps right after the build
+    (manager._sync_catalog). The artifact records the post-bump generation, so workers
+    that see the bump find a matching file instead of each rebuilding it.
+    """
+    started = time.perf_counter()
+    path = Path(path or catalog_artifact_path())
+    generation, source_names, records, category_names = load_catalog_records(engine)
+    if pending_bump is not None:
+        generation[pending_bump] = generation.get(pending_bump, 0) + 1
+
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    try:
+        conn = sqlite3.connect(tmp)
+        try:
+            conn.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + _SCHEMA)
+            conn.executemany("INSERT INTO source VALUES (?, ?)", enumerate(source_names))
+            conn.executemany(
+                "INSERT INTO category VALUES (?, ?, ?)",
+                [(src, pos, name) for src, names in category_names.items() for pos, name in enumerate(names)],
+            )
+            placeholders = ", ".join("?" * (4 + len(_ITEM_KEYS)))
+            conn.executemany(
+                f"INSERT INTO item VALUES ({placeholders})",
+                (
+                    (row, source_idx, name, category, *values)
+                    for row, (name, category, source_idx, values) in enumerate(records, start=1)
+                ),
+            )
+            conn.execute("INSERT INTO item_fts(item_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO item_fts(item_fts) VALUES ('optimize')")
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [
+                    ("format", str(ARTIFACT_FORMAT)),
+                    ("generation", json.dumps(generation, sort_keys=True)),
+                    ("built_at", datetime.utcnow().isoformat()),
+                ],
+            )
+            conn.commit()
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        os.replace(tmp, path)  # atomic swap
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return {
+        "path": str(path),
+        "generation": generation,
+        "products": len(records),
+        "file_bytes": path.stat().st_size,
+        "build_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class CatalogArtifact:
+    """One opened artifact version; same read API as catalog_index.CatalogIndex."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._uri = f"{self.path.resolve().as_uri()}?mode=ro&immutable=1"
+        self._local = threading.local()  # sqlite3 connections are per thread
+        conn = self._conn()
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if int(meta.get("format", 0)) != ARTIFACT_FORMAT:
+            raise sqlite3.DatabaseError(f"catalog artifact format {meta.get('format')} != {ARTIFACT_FORMAT}")
+        self.generation: dict[str, int] = json.loads(meta["generation"])
+        self.built_at = meta.get("built_at")
+        self.source_names = [name for _, name in conn.execute("SELECT idx, name FROM source ORDER BY idx")]
+        self.category_names: dict[str, list[str]] = {}
+        for source_name, name in conn.execute("SELECT source_name, name FROM category ORDER BY source_name, position"):
+            self.category_names.setdefault(source_name, []).append(name)
+        self.products = conn.execute("SELECT COUNT(*) FROM item").fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+            self._local.conn = conn
+        return conn
+
+    def search(self, q: str, *, sources: str = "all", limit: int = 50) -> list[dict]:
+        """Same contract and shape as db_search.search_products_from_db()."""
+        term = normalize_text(q)
+        if not term:
+            return [{"searched_results": []}]
+
+        limit = min(limit, 200)
+        params: dict = {}
+        source_filter = ""
+        source_name = _SOURCE_ALIASES.get(sources.lower(), sources.lower())
+        if source_name:
+            if source_name not in self.source_names:
+                return [{"searched_results": []}]
+            params["source"] = self.source_names.index(source_name)
+            source_filter = "AND item.source_idx = :source"
+
+        # Same scan as CatalogIndex.search: candidates in rowid (= tiebreak) order, bucketed
+        # in Python, stopping once the best bucket is full; only the hits' columns are read.
+        if len(term) >= MIN_INDEXED_TERM_LEN:
+            params["phrase"] = _fts_phrase(term)
+            candidates = (
+                "SELECT item.id, item.name_fold, item.category_fold "
+                "FROM item_fts JOIN item ON item.id = item_fts.rowid "
+                f"WHERE item_fts MATCH :phrase {source_filter} ORDER BY item_fts.rowid"
+            )
+        else:
+            candidates = (
+                "SELECT item.id, item.name_fold, item.category_fold FROM item "
+                f"WHERE 1 {source_filter} ORDER BY item.id"
+            )
+        buckets: tuple[list[int], ...] = ([], [], [], [])
+        conn = self._conn()
+        for row_id, name, category in conn.execute(candidates, params):
+            bucket = match_bucket(name, category, term)
+            if bucket is None:
+                continue
+            buckets[bucket].append(row_id)
+            if bucket == 0 and len(buckets[0]) >= limit:
+                break
+
+        hits = [row_id for bucket in buckets for row_id in bucket][:limit]
+        if not hits:
+            return [{"searched_results": []}]
+        rows = {
+            row[0]: row[1:]
+            for row in conn.execute(
+                f"SELECT item.id, {_ITEM_COLUMNS} FROM item WHERE item.id IN ({', '.join('?' * len(hits))})",
+                hits,
+            )
+        }
+        items = [dict(zip(_ITEM_KEYS, rows[row_id])) for row_id in hits]
+        return [{"searched_results": items}]
+
+    def get_categories(self) -> list[dict]:
+        """Same shape as db_search.get_categories_from_db()."""
+        return category_blocks(self.category_names)
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.generation,
+            "path": str(self.path),
+            "products": self.products,
+            "file_bytes": self.path.stat().st_size if self.path.exists() else None,
+            "built_at": self.built_at,
+        }
+
+
+def load_catalog_artifact(path: Path | None = None, *, engine=buy_smart_engine) -> CatalogArtifact:
+    """
+    Open the artifact at `path` when it matches the DB's cataloggeneration, otherwise
+    build it from the DB first.
+    """
+    path = Path(path or catalog_artifact_path())
+    with Session(engine) as session:
+        generation = read_catalog_generations(session)
+
+    artifact = None
+    if path.is_file():
+        try:
+            artifact = CatalogArtifact(path)
+        except sqlite3.Error as exc:
+            print(f"Buy Smart catalog artifact unreadable, rebuilding: {exc!r}")
+        if artifact is not None and artifact.generation != generation:
+            artifact = None
+    if artifact is None:
+        built = build_catalog_artifact(path, engine=engine)
+        artifact = CatalogArtifact(path)
+        print(
+            f"Buy Smart catalog artifact built: {built['products']} products, "
+            f"{built['file_bytes'] // 1024} KiB in {built['build_seconds']}s"
+        )
+    print(f"Buy Smart catalog artifact loaded: {artifact.path} ({artifact.products} products)")
+    return artifact
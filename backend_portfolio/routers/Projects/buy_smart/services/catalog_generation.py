@@ -0,0 +1,86 @@
+"""
+Watches the `cataloggeneration` table and notifies in-process listeners after a sync.
+
+The weekly sync runs in another process (local script), so API workers learn about a
+new catalog by polling one tiny table. Listeners (catalog index reload, cache
+invalidation) run on the watcher thread, never on the request path.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Callable
+
+from sqlmodel import Session
+
+from backend_portfolio.buy_smart_db import buy_smart_engine
+from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import (
+    read_catalog_generations,
+)
+
+POLL_INTERVAL_SEC = float(os.getenv("BUY_SMART_CATALOG_POLL_SEC", "60"))
+
+# Called with the set of Source.name values whose generation changed.
+GenerationListener = Callable[[set[str]], None]
+
+
+class CatalogGenerationWatcher:
+    def __init__(self, engine=buy_smart_engine, poll_interval: float = POLL_INTERVAL_SEC):
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.generations: dict[str, int] | None = None
+        self._listeners: list[GenerationListener] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def subscribe(self, listener: GenerationListener) -> None:
+        self._listeners.append(listener)
+
+    def read(self) -> dict[str, int]:
+        with Session(self.engine) as session:
+            return read_catalog_generations(session)
+
+    def poll_once(self) -> set[str]:
+        """Compare DB generations with the last seen ones and notify listeners."""
+        current = self.read()
+        previous = self.generations
+        if previous is None:
+            changed = set(current) | {"*"}  # first poll: everyone (re)loads
+        else:
+            changed = {
+                name
+                for name in set(current) | set(previous)
+                if current.get(name) != previous.get(name)
+            }
+        self.generations = current
+        if changed:
+            for listener in self._listeners:
+                try:
+                    listener(changed)
+                except Exception as exc:
+                    print(f"Catalog generation listener failed: {exc!r}")
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as exc:
+                print(f"Catalog generation poll failed: {exc!r}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-generation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+catalog_generation_watcher = CatalogGenerationWatcher()
@@ -0,0 +1,283 @@
+"""
+In-process Buy Smart catalog index.
+
+The catalog only changes on the weekly sync, so API workers keep a compact copy of it
+in memory and answer /scrapers/search and /scrapers/getCategories without touching the DB:
+
+- one row per product (response values stored as tuples, dicts are built only for hits)
+- an inverted trigram index: trigram → array('I') of row numbers (sorted postings)
+- matching keeps the DB contract: substring of the name or category, both compared as
+  normalize_text() keys (utils/normalizers.py; names come from product.normalized_name)
+
+When a sync bumps the `cataloggeneration` table, the generation watcher thread
+(catalog_generation.py) builds a new index off the request path and it is swapped in
+with a single reference assignment.
+
+BUY_SMART_CATALOG_INDEX=memory (default) | artifact | off. `artifact` serves the same
+reads from a read-only SQLite file instead (catalog_artifact.py).
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+
+from sqlmodel import Session, select
+
+from backend_portfolio.buy_smart_db import buy_smart_engine
+from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+    Product,
+    ProductLatestPrice,
+    Source,
+)
+from backend_portfolio.routers.Projects.buy_smart.scrapers.db_search import (
+    _SOURCE_ALIASES,
+    _row_to_search_item,
+    category_blocks,
+)
+from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import (
+    read_catalog_generations,
+)
+from backend_portfolio.routers.Projects.buy_smart.utils.normalizers import normalize_text
+
+NGRAM = 3
+
+_ITEM_KEYS = (
+    "internal_product_id",
+    "prod_id",
+    "prod_name",
+    "prod_img",
+    "prod_cat_id",
+    "prod_cat_name",
+    "prod_sub_cat_id",
+    "prod_sub_cat_name",
+    "prod_unit_size_desc",
+    "prod_unit_size",
+    "prod_price_per_unit",
+    "prod_price_net",
+    "prod_price_un_desc",
+    "prod_barkod",
+)
+
+
+def catalog_index_mode() -> str:
+    return os.getenv("BUY_SMART_CATALOG_INDEX", "memory").strip().lower()
+
+
+def catalog_index_enabled() -> bool:
+    return catalog_index_mode() in ("memory", "artifact")
+
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def match_bucket(name: str, category: str, term: str) -> int | None:
+    """
+    Ranking bucket of a normalized row for `term`: 0 name prefix, 1 name word start,
+    2 name anywhere, 3 category only, None no match (CatalogIndex.search inlines this).
+    """
+    pos = name.find(term)
+    if pos == 0:
+        return 0
+    if pos > 0:
+        return 1 if not name[pos - 1].isalnum() else 2
+    return 3 if term in category else None
+
+
+@dataclass
+class CatalogIndex:
+    generation: dict[str, int]
+    source_names: list[str]
+    # Parallel per-row columns
+    rows: list[tuple] = field(default_factory=list)
+    names: list[str] = field(default_factory=list)        # normalized prod_name
+    categories: list[str] = field(default_factory=list)   # normalized prod_category
+    row_source: array = field(default_factory=lambda: array("H"))
+    postings: dict[str, array] = field(default_factory=dict)
+    category_names: dict[str, list[str]] = field(default_factory=dict)
+    build_seconds: float = 0.0
+
+    # --------- reads ---------
+    def _candidates(self, term: str):
+        """
+        Row numbers that may contain `term`, in ascending (rank-tiebreak) order.
+        The shortest posting list among the term's trigrams is a superset of the
+        matches; every candidate is verified with a substring test anyway.
+        """
+        if len(term) < NGRAM:
+            return range(len(self.rows))
+        shortest = None
+        for gram in _ngrams(term):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return ()
+            if shortest is None or len(posting) < len(shortest):
+                shortest = posting
+        return shortest
+
+    def search(self, q: str, *, sources: str = "all", limit: int = 50) -> list[dict]:
+        """Same contract and shape as db_search.search_products_from_db()."""
+        term = normalize_text(q)
+        if not term:
+            return [{"searched_results": []}]
+
+        source_name = _SOURCE_ALIASES.get(sources.lower(), sources.lower())
+        source_idx = None
+        if source_name:
+            if source_name not in self.source_names:
+                return [{"searched_results": []}]
+            source_idx = self.source_names.index(source_name)
+
+        limit = min(limit, 200)
+        # Buckets: name prefix, name word start, name anywhere, category only.
+        # Rows are stored sorted by (len(name), name), so each bucket fills in final
+        # order and the scan can stop as soon as the best bucket is full.
+        buckets: tuple[list[int], ...] = ([], [], [], [])
+        names, categories, row_source = self.names, self.categories, self.row_source
+        for row in self._candidates(term):
+            if source_idx is not None and row_source[row] != source_idx:
+                continue
+            name = names[row]
+            pos = name.find(term)
+            if pos == 0:
+                buckets[0].append(row)
+                if len(buckets[0]) >= limit:
+                    break
+            elif pos > 0:
+                buckets[1 if not name[pos - 1].isalnum() else 2].append(row)
+            elif term in categories[row]:
+                buckets[3].append(row)
+
+        hits = [row for bucket in buckets for row in bucket][:limit]
+        items = [dict(zip(_ITEM_KEYS, self.rows[row])) for row in hits]
+        return [{"searched_results": items}]
+
+    def get_categories(self) -> list[dict]:
+        """Same shape as db_search.get_categories_from_db()."""
+        return category_blocks(self.category_names)
+
+    # --------- reporting ---------
+    def stats(self) -> dict:
+        postings_bytes = sum(p.buffer_info()[1] * p.itemsize for p in self.postings.values())
+        keys_bytes = sum(sys.getsizeof(k) for k in self.postings)
+        rows_bytes = sum(sys.getsizeof(r) for r in self.rows) + sum(
+            sys.getsizeof(v) for r in self.rows for v in r if isinstance(v, str)
+        )
+        text_bytes = sum(sys.getsizeof(s) for s in self.names) + sum(
+            sys.getsizeof(s) for s in self.categories
+        )
+        return {
+            "generation": self.generation,
+            "products": len(self.rows),
+            "trigrams": len(self.postings),
+            "postings": sum(len(p) for p in self.postings.values()),
+            "approx_bytes": postings_bytes + keys_bytes + rows_bytes + text_bytes,
+            "build_seconds": round(self.build_seconds, 3),
+        }
+
+
+def load_catalog_records(engine=buy_smart_engine) -> tuple[dict, list[str], list[tuple], dict[str, list[str]]]:
+    """
+    Product + product_latest_price in one streamed query.
+    Returns (generation, source names, records, source name → sorted categories); each
+    record is (normalized name, normalized category, source position, _ITEM_KEYS values),
+    sorted by (len(name), name) — the ranking tiebreak.
+    """
+    with Session(engine) as session:
+        generation = read_catalog_generations(session)
+        source_rows = session.exec(select(Source.id, Source.name)).all()
+        source_names = [name for _, name in source_rows]
+        source_pos = {sid: idx for idx, (sid, _) in enumerate(source_rows)}
+
+        stmt = (
+            select(Product, ProductLatestPrice)
+            .outerjoin(ProductLatestPrice, ProductLatestPrice.product_id == Product.id)
+            .order_by(Product.id)
+            .execution_options(yield_per=2000)
+        )
+        records = []
+        categories: dict[str, set[str]] = {}
+        for product, latest in session.exec(stmt):
+            item = _row_to_search_item(product, latest)
+            name = product.normalized_name or normalize_text(product.prod_name)
+            records.append(
+                (
+                    name,
+                    normalize_text(product.prod_category),
+                    source_pos.get(product.source_id, 0),
+                    tuple(item[k] for k in _ITEM_KEYS),
+                )
+            )
+            if product.prod_category and product.source_id in source_pos:
+                src_name = source_names[source_pos[product.source_id]]
+                categories.setdefault(src_name, set()).add(product.prod_category)
+
+    records.sort(key=lambda r: (len(r[0]), r[0]))
+    return generation, source_names, records, {src: sorted(names) for src, names in categories.items()}
+
+
+def build_catalog_index(engine=buy_smart_engine) -> CatalogIndex:
+    """Load the catalog (load_catalog_records) and index it."""
+    started = time.perf_counter()
+    generation, source_names, records, category_names = load_catalog_records(engine)
+    index = CatalogIndex(generation=generation, source_names=source_names)
+
+    # Row order doubles as the ranking tiebreak: shorter names first, then by name.
+    grams: dict[str, list[int]] = {}
+    for row, (name, category, source_idx, values) in enumerate(records):
+        index.rows.append(values)
+        index.names.append(name)
+        index.categories.append(category)
+        index.row_source.append(source_idx)
+        for gram in _ngrams(name) | _ngrams(category):
+            grams.setdefault(gram, []).append(row)
+
+    # Rows were appended in order, so every posting list is already sorted.
+    index.postings = {gram: array("I", rows) for gram, rows in grams.items()}
+    index.category_names = category_names
+    index.build_seconds = time.perf_counter() - started
+    return index
+
+
+class CatalogIndexHolder:
+    """
+    Owns the live CatalogIndex (or CatalogArtifact in artifact mode); reloaded by the
+    catalog generation watcher after a sync.
+    """
+
+    def __init__(self, engine=buy_smart_engine):
+        self.engine = engine
+        self.index: CatalogIndex | None = None
+        self._reload_lock = threading.Lock()
+
+    def current(self) -> CatalogIndex | None:
+        return self.index
+
+    def reload(self):
+        with self._reload_lock:
+            if catalog_index_mode() == "artifact":
+                from backend_portfolio.routers.Projects.buy_smart.services.catalog_artifact import (
+                    load_catalog_artifact,
+                )
+
+                self.index = load_catalog_artifact(engine=self.engine)
+                return self.index
+            index = build_catalog_index(self.engine)
+            self.index = index  # atomic swap — readers keep the old object until done
+            stats = index.stats()
+            print(
+                f"Buy Smart catalog index loaded: {stats['products']} products, "
+                f"{stats['trigrams']} trigrams, ~{stats['approx_bytes'] // 1024} KiB "
+                f"in {stats['build_seconds']}s"
+            )
+            return index
+
+    def on_generation_change(self, changed: set[str]) -> None:
+        self.reload()
+
+
+catalog_index = CatalogIndexHolder()
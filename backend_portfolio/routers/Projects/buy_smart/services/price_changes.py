@@ -0,0 +1,111 @@
+"""
+Price change events (`price_change`) behind /prices/deals.
+
+The persist paths already know each product's previous price — delta sync preloads it,
+the other paths read product_latest_price right before upserting it — so they record a
+change row whenever the new price differs:
+
+    product_id  day         old_agorot  new_agorot  change_pct
+    12          2026-03-02  990         890         -10.1
+
+/prices/deals then reads a (day, change_pct) index range instead of comparing the last
+two prices of every product. rebuild_price_changes() derives the same rows from
+priceinterval for history recorded before the table existed.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import Float, cast, delete, func, insert, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from backend_portfolio.buy_smart_db import buy_smart_engine
+from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+    PriceChange,
+    PriceInterval,
+)
+
+
+def change_pct(old_agorot: int, new_agorot: int) -> float:
+    return (new_agorot - old_agorot) * 100 / old_agorot
+
+
+def record_price_changes(session: Session, changes: dict[int, tuple[int | None, int | None]], day: date) -> int:
+    """
+    Upsert one price_change row per product whose price moved (caller commits).
+    `changes`: product_id → (previous price_agorot, new price_agorot); unknown or equal
+    previous prices are ignored. Returns the number of changes recorded.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "product_id": product_id,
+            "day": day,
+            "old_agorot": old,
+            "new_agorot": new,
+            "change_pct": change_pct(old, new),
+            "detected_at": now,
+        }
+        for product_id, (old, new) in changes.items()
+        if old and new is not None and old != new
+    ]
+    if not rows:
+        return 0
+    table = PriceChange.__table__
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(table)
+    new = stmt.excluded
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["product_id", "day"],
+            set_={
+                "new_agorot": new.new_agorot,
+                "change_pct": (new.new_agorot - table.c.old_agorot) * 100.0 / table.c.old_agorot,
+                "detected_at": new.detected_at,
+            },
+        ),
+        rows,
+    )
+    return len(rows)
+
+
+def rebuild_price_changes(*, since: date | None = None, engine=buy_smart_engine) -> int:
+    """
+    Recompute price_change from consecutive priceinterval rows (one transaction);
+    since: only the changes on or after that day. Returns rows written.
+    """
+    previous = (
+        func.lag(PriceInterval.price_agorot)
+        .over(partition_by=PriceInterval.product_id, order_by=PriceInterval.valid_from)
+        .label("old_agorot")
+    )
+    ordered = select(
+        PriceInterval.product_id,
+        PriceInterval.valid_from,
+        PriceInterval.price_agorot,
+        previous,
+    ).subquery("ordered")
+    changes = select(
+        ordered.c.product_id,
+        ordered.c.valid_from,
+        ordered.c.old_agorot,
+        ordered.c.price_agorot,
+        (ordered.c.price_agorot - ordered.c.old_agorot) * 100.0 / cast(ordered.c.old_agorot, Float),
+        literal(datetime.utcnow()),
+    ).where(ordered.c.old_agorot > 0, ordered.c.old_agorot != ordered.c.price_agorot)
+    stale = delete(PriceChange)
+    if since is not None:
+        changes = changes.where(ordered.c.valid_from >= since)
+        stale = stale.where(PriceChange.day >= since)
+
+    with Session(engine) as session:
+        session.execute(stale)
+        written = session.execute(
+            insert(PriceChange.__table__).from_select(
+                ["product_id", "day", "old_agorot", "new_agorot", "change_pct", "detected_at"],
+                changes,
+            )
+        ).rowcount
+        session.commit()
+    return written
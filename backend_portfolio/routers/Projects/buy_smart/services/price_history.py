@@ -0,0 +1,362 @@
+"""
+Interval-encoded price history (`priceinterval`).
+
+Grocery prices stay the same for weeks, but `pricesnapshot` stores one full row per
+product per day. `priceinterval` stores one row per run of consecutive days with the
+same price (unit / size / description live on `product`):
+
+    product_id  price_agorot  valid_from   valid_to     days
+    12          890           2026-01-03   2026-02-20   49
+
+- record_price_intervals(): called by the persist paths in the same transaction as the
+  snapshot — extends yesterday's interval or opens a new one (first observation of the
+  day wins, like snapshots)
+- carry_price_intervals(): delta sync stores no snapshot for an unchanged price; it
+  stretches the product's last interval to today instead
+- compact_price_history(): folds daily snapshots that are not in an interval yet
+  (databases that predate the table, migrated snapshots) and can prune old snapshots
+- refold_price_intervals(): merges snapshots that arrived older than the last interval
+  (replication, migration) into the existing intervals
+- expand_interval_days(): turns intervals back into the per-day rows /prices/history returns
+
+Snapshots are only folded over consecutive days, so expanding the intervals gives back
+the (day, price) rows of the snapshots, plus the days delta sync saw a product unchanged.
+"""
+from __future__ import annotations
+
+import time
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from sqlalchemy import Date, Integer, and_, bindparam, cast, delete, func, literal, or_, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from backend_portfolio.buy_smart_db import buy_smart_engine
+from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+    PriceInterval,
+    PriceSnapshot,
+)
+
+COMPACT_CHUNK_PRODUCTS = 500
+
+
+def to_agorot(price) -> int | None:
+    """Shekel amount from a store payload (8.9, "8.90") → integer agorot (890)."""
+    if price is None:
+        return None
+    return int((Decimal(str(price)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_agorot(price_agorot: int | None) -> float | None:
+    """Stored agorot → the shekel float the API returns."""
+    return price_agorot / 100 if price_agorot is not None else None
+
+
+def price_key(price_agorot: int | None, unit, unit_size) -> tuple:
+    """What delta sync treats as a change: the price or the product's unit / size."""
+    return (price_agorot, unit, unit_size)
+
+
+class _Run:
+    """Interval being built or extended while folding (id is None until inserted)."""
+
+    __slots__ = ("id", "product_id", "price_agorot", "valid_from", "valid_to", "days", "dirty")
+
+    def __init__(self, product_id, price_agorot, valid_from, valid_to, days=1, interval_id=None):
+        self.id = interval_id
+        self.product_id = product_id
+        self.price_agorot = price_agorot
+        self.valid_from = valid_from
+        self.valid_to = valid_to
+        self.days = days
+        self.dirty = interval_id is None
+
+    def continues(self, price_agorot: int, day: date) -> bool:
+        return price_agorot == self.price_agorot and day == self.valid_to + timedelta(days=1)
+
+    def extend(self, day: date) -> None:
+        self.valid_to = day
+        self.days += 1
+        self.dirty = True
+
+    def as_row(self) -> dict:
+        return {
+            "product_id": self.product_id,
+            "price_agorot": self.price_agorot,
+            "valid_from": self.valid_from,
+            "valid_to": self.valid_to,
+            "days": self.days,
+        }
+
+
+def _last_intervals(session: Session, product_ids: list[int]) -> dict[int, _Run]:
+    """Newest interval of each product (one window query)."""
+    if not product_ids:
+        return {}
+    ranked = (
+        select(
+            PriceInterval,
+            func.row_number()
+            .over(partition_by=PriceInterval.product_id, order_by=PriceInterval.valid_from.desc())
+            .label("rn"),
+        )
+        .where(PriceInterval.product_id.in_(product_ids))
+        .subquery("ranked")
+    )
+    last = aliased(PriceInterval, ranked)
+    runs = {}
+    for interval in session.exec(select(last).where(ranked.c.rn == 1)).all():
+        runs[interval.product_id] = _Run(
+            interval.product_id, interval.price_agorot, interval.valid_from, interval.valid_to,
+            interval.days, interval_id=interval.id,
+        )
+    return runs
+
+
+def _write_runs(session: Session, runs: list[_Run]) -> tuple[int, int]:
+    """Insert new runs, update extended ones. Returns (inserted, extended)."""
+    inserts = [run.as_row() for run in runs if run.id is None]
+    updates = [
+        {"interval_id": run.id, "valid_to": run.valid_to, "days": run.days}
+        for run in runs
+        if run.id is not None and run.dirty
+    ]
+    if inserts:
+        table = PriceInterval.__table__
+        dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+        # A concurrent writer may have opened the same day's interval first — it wins
+        session.execute(
+            dialect.insert(table).on_conflict_do_nothing(index_elements=["product_id", "valid_from"]),
+            inserts,
+        )
+    if updates:
+        table = PriceInterval.__table__
+        session.execute(
+            update(table)
+            .where(table.c.id == bindparam("interval_id"))
+            .values(valid_to=bindparam("valid_to"), days=bindparam("days")),
+            updates,
+        )
+    return len(inserts), len(updates)
+
+
+def record_price_intervals(session: Session, observations: dict[int, dict], day: date) -> tuple[int, int]:
+    """
+    Fold today's observations into the interval table (caller commits).
+    `observations`: product_id → row with price_agorot.
+    Returns (intervals inserted, intervals extended).
+    """
+    last = _last_intervals(session, list(observations))
+    runs = []
+    for product_id, row in observations.items():
+        run = last.get(product_id)
+        if run is not None and run.valid_to >= day:
+            continue  # already recorded today
+        if run is not None and run.continues(row["price_agorot"], day):
+            run.extend(day)
+        else:
+            run = _Run(product_id, row["price_agorot"], day, day)
+        runs.append(run)
+    return _write_runs(session, runs)
+
+
+def carry_price_intervals(session: Session, prices: dict[int, int], day: date) -> int:
+    """
+    Stretch the last interval of products seen unchanged on `day` up to `day` — one
+    UPDATE, caller commits. Delta sync stores no snapshot for them, so without this
+    their history would stop at the last price change. `prices`: product_id →
+    price_agorot; an interval with another price is left alone. Returns intervals updated.
+    """
+    if not prices:
+        return 0
+    table = PriceInterval.__table__
+    newer = aliased(PriceInterval)
+    if session.get_bind().dialect.name == "postgresql":
+        days = literal(day, Date) - table.c.valid_from + 1
+    else:
+        days = cast(func.julianday(literal(day, Date)) - func.julianday(table.c.valid_from), Integer) + 1
+    return session.execute(
+        update(table)
+        .where(
+            tuple_(table.c.product_id, table.c.price_agorot).in_(list(prices.items())),
+            table.c.valid_to < day,
+            ~select(newer.id)
+            .where(newer.product_id == table.c.product_id, newer.valid_from > table.c.valid_from)
+            .exists(),
+        )
+        .values(valid_to=day, days=days)
+    ).rowcount
+
+
+def compact_price_history(
+    *,
+    prune_days: int | None = None,
+    chunk_products: int = COMPACT_CHUNK_PRODUCTS,
+    engine=buy_smart_engine,
+) -> dict:
+    """
+    Fold every snapshot newer than its product's last interval into intervals
+    (incremental and idempotent — the first run folds the whole history).
+
+    prune_days: afterwards delete snapshots older than that many days, always keeping
+    each product's newest snapshot (rebuild_latest_prices reads it).
+    """
+    started = time.perf_counter()
+    stats = {"products": 0, "snapshots_folded": 0, "intervals_inserted": 0,
+             "intervals_extended": 0, "snapshots_pruned": 0, "first_day_folded": None}
+    cursor = 0
+    while True:
+        with Session(engine) as session:
+            product_ids = session.exec(
+                select(PriceSnapshot.product_id)
+                .where(PriceSnapshot.product_id > cursor)
+                .group_by(PriceSnapshot.product_id)
+                .order_by(PriceSnapshot.product_id)
+                .limit(chunk_products)
+            ).all()
+            if not product_ids:
+                break
+            cursor = product_ids[-1]
+
+            watermark = (
+                select(PriceInterval.product_id, func.max(PriceInterval.valid_to).label("last_day"))
+                .where(PriceInterval.product_id.in_(product_ids))
+                .group_by(PriceInterval.product_id)
+                .subquery("watermark")
+            )
+            snapshots = session.execute(
+                select(
+                    PriceSnapshot.product_id,
+                    PriceSnapshot.snapshot_day,
+                    PriceSnapshot.price_agorot,
+                )
+                .outerjoin(watermark, watermark.c.product_id == PriceSnapshot.product_id)
+                .where(
+                    PriceSnapshot.product_id.in_(product_ids),
+                    or_(watermark.c.last_day.is_(None), PriceSnapshot.snapshot_day > watermark.c.last_day),
+                )
+                .order_by(PriceSnapshot.product_id, PriceSnapshot.snapshot_day)
+            ).all()
+            if snapshots:
+                last = _last_intervals(session, sorted({snap.product_id for snap in snapshots}))
+                runs: list[_Run] = []
+                for snap in snapshots:
+                    run = last.get(snap.product_id)
+                    if run is not None and run.continues(snap.price_agorot, snap.snapshot_day):
+                        run.extend(snap.snapshot_day)
+                        continue
+                    if run is not None:
+                        runs.append(run)
+                    last[snap.product_id] = _Run(
+                        snap.product_id, snap.price_agorot, snap.snapshot_day, snap.snapshot_day
+                    )
+                runs.extend(last.values())
+                inserted, extended = _write_runs(session, runs)
+                session.commit()
+                stats["products"] += len({snap.product_id for snap in snapshots})
+                stats["snapshots_folded"] += len(snapshots)
+                stats["intervals_inserted"] += inserted
+                stats["intervals_extended"] += extended
+                first_day = min(snap.snapshot_day for snap in snapshots)
+                if stats["first_day_folded"] is None or first_day < stats["first_day_folded"]:
+                    stats["first_day_folded"] = first_day
+
+    if prune_days is not None:
+        cutoff = datetime.utcnow().date() - timedelta(days=prune_days)
+        newer = aliased(PriceSnapshot)
+        has_newer = (
+            select(newer.id)
+            .where(and_(newer.product_id == PriceSnapshot.product_id, newer.snapshot_day > PriceSnapshot.snapshot_day))
+            .exists()
+        )
+        with Session(engine) as session:
+            stats["snapshots_pruned"] = session.execute(
+                delete(PriceSnapshot).where(PriceSnapshot.snapshot_day < cutoff, has_newer)
+            ).rowcount
+            session.commit()
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def refold_price_intervals(first_days: dict[int, date], *, engine=buy_smart_engine) -> dict:
+    """
+    Merge snapshots that arrived older than their product's last interval (replicated or
+    migrated history) into priceinterval: from first_days[product_id] on, the product's
+    runs are rebuilt from its intervals and snapshots together. A day an interval already
+    covers keeps that price — days whose snapshots compact_price_history(prune_days=...)
+    pruned, or that delta sync carried, exist nowhere else — the other days take the
+    snapshot's. Returns {"intervals_deleted": n, "intervals_inserted": n}.
+    """
+    stats = {"intervals_deleted": 0, "intervals_inserted": 0}
+    product_ids = sorted(first_days)
+    for start in range(0, len(product_ids), COMPACT_CHUNK_PRODUCTS):
+        chunk = product_ids[start:start + COMPACT_CHUNK_PRODUCTS]
+        since = min(first_days[product_id] for product_id in chunk)
+        with Session(engine) as session:
+            # from the interval ending the day before: a run continuing into the copied days merges with it
+            intervals = [
+                interval
+                for interval in session.exec(
+                    select(PriceInterval).where(
+                        PriceInterval.product_id.in_(chunk),
+                        PriceInterval.valid_to >= since - timedelta(days=1),
+                    )
+                ).all()
+                if interval.valid_to >= first_days[interval.product_id] - timedelta(days=1)
+            ]
+            snapshots = session.execute(
+                select(PriceSnapshot.product_id, PriceSnapshot.snapshot_day, PriceSnapshot.price_agorot).where(
+                    PriceSnapshot.product_id.in_(chunk), PriceSnapshot.snapshot_day >= since
+                )
+            ).all()
+
+            prices: dict[int, dict[date, int]] = {}
+            for interval in intervals:
+                days = prices.setdefault(interval.product_id, {})
+                day = interval.valid_from
+                while day <= interval.valid_to:
+                    days[day] = interval.price_agorot
+                    day += timedelta(days=1)
+            for snap in snapshots:
+                if snap.snapshot_day >= first_days[snap.product_id]:
+                    prices.setdefault(snap.product_id, {}).setdefault(snap.snapshot_day, snap.price_agorot)
+
+            runs: list[_Run] = []
+            for product_id, days in prices.items():
+                run = None
+                for day in sorted(days):
+                    if run is not None and run.continues(days[day], day):
+                        run.extend(day)
+                    else:
+                        run = _Run(product_id, days[day], day, day)
+                        runs.append(run)
+
+            interval_ids = [interval.id for interval in intervals]
+            for offset in range(0, len(interval_ids), COMPACT_CHUNK_PRODUCTS):
+                session.execute(
+                    delete(PriceInterval).where(PriceInterval.id.in_(interval_ids[offset:offset + COMPACT_CHUNK_PRODUCTS]))
+                )
+            inserted, _ = _write_runs(session, runs)
+            session.commit()
+        stats["intervals_deleted"] += len(interval_ids)
+        stats["intervals_inserted"] += inserted
+    return stats
+
+
+def expand_interval_days(intervals, limit: int):
+    """
+    Yield (day, interval) newest day first, at most `limit` days, for one product's
+    intervals given newest first.
+    """
+    emitted = 0
+    for interval in intervals:
+        day = interval.valid_to
+        while day >= interval.valid_from and emitted < limit:
+            yield day, interval
+            emitted += 1
+            day -= timedelta(days=1)
+        if emitted >= limit:
+            return
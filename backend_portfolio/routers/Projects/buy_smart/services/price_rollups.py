@@ -0,0 +1,209 @@
+"""
+Weekly / monthly price rollups (`price_rollup`, `category_price_rollup`).
+
+/prices/history expands at most 60 days of intervals; long-range charts and the category
+price index read these tables instead:
+
+- price_rollup: per product per period — min / max / sum / days / last price, folded from
+  priceinterval (an interval that spans several periods counts in each of them)
+- category_price_rollup: per source + prod_category per period, aggregated from price_rollup
+
+refresh_price_rollups(since=day) recomputes every period that ends on or after `day`
+(delete + insert, so reruns are idempotent). The catalog sync calls it with the sync's
+start day — only the current week / month change — and scripts/rebuild_price_rollups.py
+calls it with since=None to backfill the whole history.
+"""
+from __future__ import annotations
+
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import Integer, and_, cast, delete, func, insert, or_
+from sqlmodel import Session, select
+
+from backend_portfolio.buy_smart_db import buy_smart_engine
+from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+    CategoryPriceRollup,
+    PriceInterval,
+    PriceRollup,
+    Product,
+)
+
+PERIODS = ("week", "month")
+ROLLUP_CHUNK_PRODUCTS = 500
+
+
+def period_start(day: date, period: str) -> date:
+    """First day of the week (Monday) / month containing `day`."""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown rollup period: {period!r}")
+
+
+def next_period_start(start: date, period: str) -> date:
+    if period == "week":
+        return start + timedelta(days=7)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def periods_back(day: date, period: str, count: int) -> date:
+    """Start of the period `count - 1` periods before the one containing `day` (chart window start)."""
+    start = period_start(day, period)
+    if period == "week":
+        return start - timedelta(weeks=count - 1)
+    year, month = divmod(start.year * 12 + start.month - 1 - (count - 1), 12)
+    return date(year, month + 1, 1)
+
+
+def _fold_intervals(intervals, period: str, first: date) -> list[dict]:
+    """price_rollup rows of `period` for periods starting at `first` or later."""
+    buckets: dict[tuple[int, date], dict] = {}
+    for interval in intervals:
+        day = max(interval.valid_from, first)
+        while day <= interval.valid_to:
+            start = period_start(day, period)
+            through = min(interval.valid_to, next_period_start(start, period) - timedelta(days=1))
+            days = (through - day).days + 1
+            price = interval.price_agorot
+            bucket = buckets.get((interval.product_id, start))
+            if bucket is None:
+                bucket = buckets[(interval.product_id, start)] = {
+                    "product_id": interval.product_id,
+                    "period": period,
+                    "period_start": start,
+                    "min_agorot": price,
+                    "max_agorot": price,
+                    "sum_agorot": 0,
+                    "days": 0,
+                    "last_agorot": price,
+                    "last_day": through,
+                }
+            bucket["min_agorot"] = min(bucket["min_agorot"], price)
+            bucket["max_agorot"] = max(bucket["max_agorot"], price)
+            bucket["sum_agorot"] += price * days
+            bucket["days"] += days
+            if through >= bucket["last_day"]:
+                bucket["last_agorot"], bucket["last_day"] = price, through
+            day = through + timedelta(days=1)
+    return list(buckets.values())
+
+
+def _refresh_category_rollups(session: Session, starts: dict[str, date]) -> int:
+    rolled = 0
+    table = CategoryPriceRollup.__table__
+    for period, start in starts.items():
+        session.execute(
+            delete(CategoryPriceRollup).where(
+                CategoryPriceRollup.period == period,
+                CategoryPriceRollup.period_start >= start,
+            )
+        )
+        aggregated = (
+            select(
+                Product.source_id,
+                Product.prod_category,
+                PriceRollup.period,
+                PriceRollup.period_start,
+                func.min(PriceRollup.min_agorot),
+                func.max(PriceRollup.max_agorot),
+                func.sum(PriceRollup.sum_agorot),
+                func.sum(PriceRollup.days),
+                cast(func.round(func.avg(PriceRollup.last_agorot)), Integer),
+                func.count(),
+            )
+            .join(Product, Product.id == PriceRollup.product_id)
+            .where(
+                PriceRollup.period == period,
+                PriceRollup.period_start >= start,
+                Product.prod_category.isnot(None),
+            )
+            .group_by(Product.source_id, Product.prod_category, PriceRollup.period, PriceRollup.period_start)
+        )
+        rolled += session.execute(
+            insert(table).from_select(
+                [
+                    "source_id", "prod_category", "period", "period_start", "min_agorot",
+                    "max_agorot", "sum_agorot", "days", "last_agorot", "products",
+                ],
+                aggregated,
+            )
+        ).rowcount
+    return rolled
+
+
+def refresh_price_rollups(
+    *,
+    since: date | None = None,
+    chunk_products: int = ROLLUP_CHUNK_PRODUCTS,
+    engine=buy_smart_engine,
+) -> dict:
+    """
+    Recompute the week and month rollups of every period ending on or after `since`
+    (since=None: the whole history). Product rollups are written per chunk of products,
+    category rollups in one transaction at the end.
+    """
+    started = time.perf_counter()
+    stats = {"since": None, "products": 0, "product_rollups": 0, "category_rollups": 0}
+    if since is None:
+        with Session(engine) as session:
+            since = session.exec(select(func.min(PriceInterval.valid_from))).first()
+    if since is None:
+        stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        return stats
+    stats["since"] = since.isoformat()
+
+    starts = {period: period_start(since, period) for period in PERIODS}
+    first = min(starts.values())
+    stale = or_(
+        *(and_(PriceRollup.period == period, PriceRollup.period_start >= start) for period, start in starts.items())
+    )
+    cursor = 0
+    while True:
+        with Session(engine) as session:
+            product_ids = session.exec(
+                select(PriceInterval.product_id)
+                .where(PriceInterval.product_id > cursor, PriceInterval.valid_to >= first)
+                .group_by(PriceInterval.product_id)
+                .order_by(PriceInterval.product_id)
+                .limit(chunk_products)
+            ).all()
+            if not product_ids:
+                break
+            cursor = product_ids[-1]
+
+            intervals = session.execute(
+                select(
+                    PriceInterval.product_id,
+                    PriceInterval.price_agorot,
+                    PriceInterval.valid_from,
+                    PriceInterval.valid_to,
+                ).where(PriceInterval.product_id.in_(product_ids), PriceInterval.valid_to >= first)
+            ).all()
+            rows = [row for period, start in starts.items() for row in _fold_intervals(intervals, period, start)]
+            session.execute(delete(PriceRollup).where(PriceRollup.product_id.in_(product_ids), stale))
+            if rows:
+                session.execute(insert(PriceRollup.__table__), rows)
+            session.commit()
+            stats["products"] += len(product_ids)
+            stats["product_rollups"] += len(rows)
+
+    with Session(engine) as session:
+        stats["category_rollups"] = _refresh_category_rollups(session, starts)
+        session.commit()
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def rollup_values(row) -> dict:
+    """Shekel stats of a price_rollup / category_price_rollup row for the API."""
+    return {
+        "period_start": row.period_start.isoformat(),
+        "min": row.min_agorot / 100,
+        "max": row.max_agorot / 100,
+        "avg": round(row.sum_agorot / row.days) / 100,
+        "last": row.last_agorot / 100,
+        "days": row.days,
+    }
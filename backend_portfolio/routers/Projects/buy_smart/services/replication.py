@@ -0,0 +1,291 @@
+"""
+Incremental replication of source / product / pricesnapshot between two Buy Smart
+databases — Supabase ⇄ local buy_smart.db (scripts/replicate_buy_smart.py).
+
+The destination keeps one high-water mark per (peer, table) in replication_watermark:
+the highest source-side id already copied. A run streams only the rows above it in keyset
+batches, so a re-run with nothing new costs a handful of indexed queries.
+
+- ids differ between databases: rows are matched on their natural keys — Source.name,
+  (source_id, external_prod_id), (product_id, snapshot_day) — and the product ids a batch
+  of snapshots references are remapped per batch (source id → destination id)
+- writes are INSERT ... ON CONFLICT DO NOTHING, so replayed rows are harmless: each run
+  re-reads REPLICATION_OVERLAP_IDS ids below the mark (Postgres can commit ids out of
+  order), and rows that came from the other direction are skipped as conflicts
+- the batch and its watermark commit together, so an interrupted run resumes where it stopped
+- sources (a handful of rows) are reconciled by name on every run; products are
+  insert-only — static fields edited on one side follow on that side's next sync
+- a snapshot whose product the destination doesn't have yet (created on src after the
+  product pass, e.g. replicating during a sync) pulls that product in before its batch
+  is written; only snapshots without a product on src itself are skipped
+
+New snapshots bring the destination's derived tables (intervals, latest prices, price
+changes, rollups) up to date for the products and days they touch.
+"""
+from __future__ import annotations
+
+import time
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from backend_portfolio.routers.Projects.buy_smart.models.scrapers_models import (
+    PriceSnapshot,
+    Product,
+    ReplicationWatermark,
+    Source,
+)
+from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import rebuild_latest_prices
+from backend_portfolio.routers.Projects.buy_smart.services.price_changes import rebuild_price_changes
+from backend_portfolio.routers.Projects.buy_smart.services.price_history import (
+    compact_price_history,
+    refold_price_intervals,
+)
+from backend_portfolio.routers.Projects.buy_smart.services.price_rollups import refresh_price_rollups
+from backend_portfolio.routers.Projects.buy_smart.utils.normalizers import normalize_text
+
+REPLICATION_BATCH_SIZE = 5000
+REPLICATION_OVERLAP_IDS = 1000
+
+PRODUCT_COLUMNS = (
+    "external_prod_id", "prod_name", "prod_category", "image_url",
+    "barcode", "unit", "unit_size", "price_per_unit_desc",
+)
+SNAPSHOT_COLUMNS = ("product_id", "price_agorot", "timestamp", "snapshot_day")
+
+
+def keyset_batches(engine, table, columns, batch_size: int, *, after_id: int = 0):
+    """Yield batches of rows in id order: WHERE id > last ORDER BY id LIMIT n."""
+    stmt = select(table.c.id, *(table.c[name] for name in columns)).order_by(table.c.id).limit(batch_size)
+    last_id = after_id
+    with engine.connect() as conn:
+        while True:
+            rows = conn.execute(stmt.where(table.c.id > last_id)).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield rows
+
+
+def _insert_ignore(engine, table, index_elements: list[str]):
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return dialect.insert(table).on_conflict_do_nothing(index_elements=index_elements)
+
+
+def _watermarks(engine, peer: str) -> dict[str, int]:
+    with Session(engine) as session:
+        rows = session.exec(select(ReplicationWatermark).where(ReplicationWatermark.peer == peer)).all()
+        return {row.table_name: row.last_id for row in rows}
+
+
+def _advance_watermark(session: Session, peer: str, table_name: str, last_id: int) -> None:
+    session.merge(
+        ReplicationWatermark(peer=peer, table_name=table_name, last_id=last_id, updated_at=datetime.utcnow())
+    )
+
+
+def _replicate_sources(src, dst) -> tuple[dict[int, int], int]:
+    """Source rows matched by name. Returns (source id → destination id, rows inserted)."""
+    with Session(src) as src_sess:
+        sources = src_sess.exec(select(Source)).all()
+    inserted = 0
+    with Session(dst) as dst_sess:
+        existing = {name: source_id for source_id, name in dst_sess.exec(select(Source.id, Source.name)).all()}
+        for source in sources:
+            if source.name not in existing:
+                created = Source(name=source.name, base_url=source.base_url, last_seen=source.last_seen)
+                dst_sess.add(created)
+                dst_sess.flush()
+                existing[source.name] = created.id
+                inserted += 1
+        dst_sess.commit()
+    return {source.id: existing[source.name] for source in sources}, inserted
+
+
+class _ProductIdMap:
+    """Source-side product id → destination product id, resolved per batch by natural key."""
+
+    def __init__(self, src, dst, source_ids: dict[int, int]):
+        self.src = src
+        self.dst = dst
+        self.source_ids = source_ids
+        self.ids: dict[int, int | None] = {}
+
+    def resolve(self, product_ids) -> dict[int, int | None]:
+        missing = sorted({pid for pid in product_ids if pid is not None and pid not in self.ids})
+        if missing:
+            with Session(self.src) as src_sess:
+                keys = {
+                    pid: (self.source_ids.get(source_id), ext_id)
+                    for pid, source_id, ext_id in src_sess.execute(
+                        select(Product.id, Product.source_id, Product.external_prod_id).where(Product.id.in_(missing))
+                    )
+                }
+            wanted = [key for key in keys.values() if key[0] is not None]
+            found: dict[tuple[int, int], int] = {}
+            if wanted:
+                with Session(self.dst) as dst_sess:
+                    found = {
+                        (source_id, ext_id): pid
+                        for pid, source_id, ext_id in dst_sess.execute(
+                            select(Product.id, Product.source_id, Product.external_prod_id).where(
+                                tuple_(Product.source_id, Product.external_prod_id).in_(wanted)
+                            )
+                        )
+                    }
+            for pid in missing:
+                self.ids[pid] = found.get(keys.get(pid))
+        return self.ids
+
+    def forget(self, product_ids) -> None:
+        for pid in product_ids:
+            self.ids.pop(pid, None)
+
+
+def _product_batch(rows, source_ids: dict[int, int]) -> dict[tuple[int, int], dict]:
+    """Source-side product rows → destination insert rows, one per (source_id, external_prod_id)."""
+    batch = {}
+    for row in rows:
+        source_id = source_ids.get(row.source_id)
+        if source_id is not None:
+            batch[(source_id, row.external_prod_id)] = {
+                "source_id": source_id,
+                **{name: row._mapping[name] for name in PRODUCT_COLUMNS},
+                "normalized_name": normalize_text(row.prod_name),
+            }
+    return batch
+
+
+def _copy_late_products(src, dst, source_ids: dict[int, int], product_ids) -> int:
+    """
+    Insert the src products `product_ids` that appeared after the product pass (their
+    snapshots are being copied now). Sources created meanwhile are reconciled first;
+    `source_ids` is updated in place. Returns how many products were written.
+    """
+    table = Product.__table__
+    with src.connect() as conn:
+        rows = conn.execute(
+            select(table.c.id, table.c.source_id, *(table.c[name] for name in PRODUCT_COLUMNS)).where(
+                table.c.id.in_(sorted(product_ids))
+            )
+        ).all()
+    if any(row.source_id not in source_ids for row in rows):
+        source_ids.update(_replicate_sources(src, dst)[0])
+    batch = _product_batch(rows, source_ids)
+    if batch:
+        with Session(dst) as dst_sess:
+            dst_sess.execute(_insert_ignore(dst, table, ["source_id", "external_prod_id"]), list(batch.values()))
+            dst_sess.commit()
+    return len(batch)
+
+
+def replicate(
+    src,
+    dst,
+    *,
+    peer: str,
+    batch_size: int = REPLICATION_BATCH_SIZE,
+    progress=None,
+) -> dict:
+    """
+    Copy rows of src (identified as `peer`) that dst has not seen yet. Both databases must
+    already have the current schema (init_db.create_db_and_tables). `progress(table, rows)`
+    is called after every batch.
+    """
+    started = time.perf_counter()
+    marks = _watermarks(dst, peer)
+    source_ids, sources_inserted = _replicate_sources(src, dst)
+    stats = {"sources_inserted": sources_inserted, "products_read": 0, "products_late": 0,
+             "snapshots_read": 0, "snapshots_inserted": 0, "snapshots_unmapped": 0}
+
+    # products: insert-only, matched on (source_id, external_prod_id)
+    product_table = Product.__table__
+    insert_products = _insert_ignore(dst, product_table, ["source_id", "external_prod_id"])
+    after = max(0, marks.get("product", 0) - REPLICATION_OVERLAP_IDS)
+    for rows in keyset_batches(src, product_table, ("source_id", *PRODUCT_COLUMNS), batch_size, after_id=after):
+        batch = _product_batch(rows, source_ids)
+        with Session(dst) as dst_sess:
+            if batch:
+                dst_sess.execute(insert_products, list(batch.values()))
+            _advance_watermark(dst_sess, peer, "product", max(rows[-1].id, marks.get("product", 0)))
+            dst_sess.commit()
+        stats["products_read"] += len(rows)
+        if progress:
+            progress("product", len(rows))
+
+    # snapshots: matched on (product_id, snapshot_day)
+    product_ids = _ProductIdMap(src, dst, source_ids)
+    snapshot_table = PriceSnapshot.__table__
+    insert_snapshots = _insert_ignore(dst, snapshot_table, ["product_id", "snapshot_day"])
+    first_days: dict[int, date] = {}  # destination product_id → oldest day copied in
+    after = max(0, marks.get("pricesnapshot", 0) - REPLICATION_OVERLAP_IDS)
+    for rows in keyset_batches(src, snapshot_table, SNAPSHOT_COLUMNS, batch_size, after_id=after):
+        mapping = product_ids.resolve(row.product_id for row in rows)
+        # the watermark passes this batch: products missing on dst must be there first
+        late = {row.product_id for row in rows if row.product_id is not None and mapping.get(row.product_id) is None}
+        if late:
+            stats["products_late"] += _copy_late_products(src, dst, source_ids, late)
+            product_ids.forget(late)
+            mapping = product_ids.resolve(row.product_id for row in rows)
+        batch = {}
+        for row in rows:
+            product_id = mapping.get(row.product_id)
+            if product_id is None:
+                stats["snapshots_unmapped"] += 1
+                continue
+            batch[(product_id, row.snapshot_day)] = {
+                "product_id": product_id,
+                "price_agorot": row.price_agorot,
+                "timestamp": row.timestamp,
+                "snapshot_day": row.snapshot_day,
+            }
+        with Session(dst) as dst_sess:
+            if batch:
+                # overlap rows and rows that came from the other direction are already there
+                existing = set(
+                    dst_sess.execute(
+                        select(PriceSnapshot.product_id, PriceSnapshot.snapshot_day).where(
+                            tuple_(PriceSnapshot.product_id, PriceSnapshot.snapshot_day).in_(list(batch))
+                        )
+                    ).all()
+                )
+                fresh = [snap for key, snap in batch.items() if key not in existing]
+                if fresh:
+                    dst_sess.execute(insert_snapshots, fresh)
+                for snap in fresh:
+                    product_id, day = snap["product_id"], snap["snapshot_day"]
+                    if product_id not in first_days or day < first_days[product_id]:
+                        first_days[product_id] = day
+                stats["snapshots_inserted"] += len(fresh)
+            _advance_watermark(dst_sess, peer, "pricesnapshot", max(rows[-1].id, marks.get("pricesnapshot", 0)))
+            dst_sess.commit()
+        stats["snapshots_read"] += len(rows)
+        if progress:
+            progress("pricesnapshot", len(rows))
+
+    stats["products_touched"] = len(first_days)
+    if first_days:
+        stats["derived"] = refresh_derived_tables(dst, first_days)
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def refresh_derived_tables(engine, first_days: dict[int, date]) -> dict:
+    """
+    Intervals, latest prices, price changes and rollups after snapshots were copied in.
+    `first_days`: product_id → oldest day copied in (history can arrive older than the
+    product's last interval, so it is merged into the intervals from that day on).
+    """
+    refold = refold_price_intervals(first_days, engine=engine)
+    compact = compact_price_history(engine=engine)
+    since = min(first_days.values())
+    return {
+        "intervals_replaced": refold["intervals_deleted"],
+        "intervals_inserted": refold["intervals_inserted"] + compact["intervals_inserted"],
+        "intervals_extended": compact["intervals_extended"],
+        "latest_prices": rebuild_latest_prices(product_ids=set(first_days), engine=engine),
+        "price_changes": rebuild_price_changes(since=since, engine=engine),
+        "rollups": refresh_price_rollups(since=since, engine=engine)["product_rollups"],
+    }
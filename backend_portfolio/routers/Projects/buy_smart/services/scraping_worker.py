@@ -0,0 +1,209 @@
+"""
+Concurrent fetchers for catalog syncs (Hetzi Hinam subcategories, Shufersal category pages).
+
+Replaces "one request, then time.sleep(delay)" with:
+- bounded concurrency (asyncio.Semaphore) on the shared async pool (utils/http.py)
+- a token-bucket rate limiter (steady requests/sec with a small burst)
+- retry with exponential backoff + jitter on timeouts, transport errors, 429 and 5xx
+- Hetzi only: one shared guest token — the scraper's own _bootstrap_guest() runs once
+  (under a lock) and its H_Authentication cookie is copied into the async client; a 401
+  storm triggers a single re-bootstrap, not one per task
+
+Results are returned in catalog order so the sync keeps its dedupe-by-Id semantics
+(the first subcategory that lists a product wins).
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+
+import httpx
+
+from backend_portfolio.routers.Projects.buy_smart.utils.http import http_layer
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE_PER_SEC = 4.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_SEC = 0.5
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/sec refill, at most `burst` tokens banked."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class PooledAsyncFetcher:
+    """Pooled AsyncClient + semaphore + token bucket + retries, for one scraper's site."""
+
+    TIMEOUT = 30
+
+    def __init__(
+        self,
+        scraper,
+        *,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate_per_sec: float = DEFAULT_RATE_PER_SEC,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_sec: float = DEFAULT_BACKOFF_SEC,
+        timeout: float | None = None,
+    ):
+        self.scraper = scraper
+        self.timeout = timeout or self.TIMEOUT
+        self.concurrency = max(1, concurrency)
+        self.bucket = TokenBucket(rate_per_sec, burst=self.concurrency)
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+        self.stats = {"requests": 0, "retries": 0, "reauths": 0}
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._auth_version = 0  # bumped by subclasses that refresh credentials
+        self.client: httpx.AsyncClient | None = None
+
+    async def __aenter__(self):
+        self.client = http_layer.async_client(
+            base_url=self.scraper.BASE,
+            timeout=self.timeout,
+            headers=self.scraper.default_headers(),
+            max_retries=0,  # retried below, with the 401 re-auth in the loop
+        )
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_sec * (2 ** attempt) * (0.5 + random.random())
+
+    async def _on_unauthorized(self, seen_version: int) -> bool:
+        """Called once per request on 401 (with the auth version it was sent with); True = retry."""
+        return False
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        reauthed = False
+        while True:
+            await self.bucket.acquire()
+            version = self._auth_version
+            self.stats["requests"] += 1
+            try:
+                r = await self.client.get(url, **kwargs)
+            except (httpx.TimeoutException, httpx.TransportError):
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if r.status_code == 401 and not reauthed:
+                    reauthed = True
+                    if await self._on_unauthorized(version):
+                        continue
+                if r.status_code not in _RETRY_STATUS or attempt >= self.max_retries:
+                    return r
+            self.stats["retries"] += 1
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    async def get_json(self, url: str, **kwargs):
+        async with self._semaphore:
+            r = await self._get(url, **kwargs)
+        r.raise_for_status()
+        return r.json()
+
+
+class HetziSubcategoryFetcher(PooledAsyncFetcher):
+    """Async getItemsBySubCategory client that shares the scraper's guest session."""
+
+    def __init__(self, scraper, **options):
+        options.setdefault("timeout", scraper.SUBCATEGORY_TIMEOUT)
+        super().__init__(scraper, **options)
+        self._auth_lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "HetziSubcategoryFetcher":
+        await super().__aenter__()
+        await self._refresh_guest(self._auth_version, force=False)
+        return self
+
+    # --------- shared guest token ---------
+    async def _refresh_guest(self, seen_version: int, *, force: bool = True) -> None:
+        """Bootstrap once for everyone; tasks that saw an older token just reuse the new one."""
+        async with self._auth_lock:
+            if seen_version != self._auth_version:
+                return
+            if force or not self.scraper._guest_is_valid():
+                await asyncio.to_thread(self.scraper._bootstrap_guest)
+                if force:
+                    self.stats["reauths"] += 1
+            raw = self.scraper.client.cookies.get("H_Authentication")
+            if raw:
+                self.client.cookies.set("H_Authentication", raw)
+            self._auth_version += 1
+
+    async def _on_unauthorized(self, seen_version: int) -> bool:
+        await self._refresh_guest(seen_version)
+        return True
+
+    # --------- requests ---------
+    async def fetch_subcategory_items(self, sub_id: int) -> list[dict]:
+        data = await self.get_json(
+            self.scraper.SUBCATEGORY_PATH,
+            params=self.scraper.subcategory_params(sub_id),
+        )
+        return self.scraper.subcategory_items(data)
+
+    async def fetch_many(self, subs: list[dict]) -> list[list[dict]]:
+        """Items for every subcategory, in the same order as `subs`."""
+        return await asyncio.gather(*(self.fetch_subcategory_items(sub["id"]) for sub in subs))
+
+
+class ShufersalCategoryFetcher(PooledAsyncFetcher):
+    """Async category-page client: page 0 gives the page count, the rest load concurrently."""
+
+    async def fetch_category_items(self, category_code: str) -> list[dict]:
+        path = self.scraper.category_path(category_code)
+        first = await self.get_json(path, params=self.scraper.category_params(0))
+        pages = self.scraper.page_count(first)
+        rest = await asyncio.gather(
+            *(
+                self.get_json(path, params=self.scraper.category_params(page))
+                for page in range(1, pages)
+            )
+        )
+        items = list(self.scraper.page_items(first))
+        for data in rest:
+            items.extend(self.scraper.page_items(data))
+        return items
+
+
+async def _fetch_subcategories(scraper, subs: list[dict], **options) -> tuple[list[list[dict]], dict]:
+    async with HetziSubcategoryFetcher(scraper, **options) as fetcher:
+        results = await fetcher.fetch_many(subs)
+        return results, dict(fetcher.stats)
+
+
+def fetch_subcategories_concurrently(scraper, subs: list[dict], **options) -> tuple[list[list[dict]], dict]:
+    """
+    Blocking entry point for the (sync) scraper / CLI.
+    Returns (items per subcategory in `subs` order, request stats).
+    """
+    return asyncio.run(_fetch_subcategories(scraper, subs, **options))
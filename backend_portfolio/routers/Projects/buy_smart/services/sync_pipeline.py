@@ -0,0 +1,120 @@
+"""
+Streaming fetch → parse → persist pipeline for catalog syncs.
+
+    partitions ──fetch (async, concurrent)──▶ [fetch queue] ──parse (in order)──▶
+        [persist queue] ──persist (worker thread, one batch at a time)──▶ DB
+
+- Stages are connected by bounded queues, so a slow DB stalls fetching instead of
+  buffering the whole catalog: peak memory is ~(fetch queue + one batch) partitions.
+- Network and DB overlap: fetches keep running while a batch is being written.
+- Partitions are parsed in their original order, so "first partition wins" dedupe
+  rules keep working.
+- Batches are cut at partition boundaries, so when `on_partition_done` fires every row
+  of that partition is committed — usable as a resume checkpoint.
+
+A scraper plugs in with three callables (see HetziHinamScraper.sync_all_to_db):
+
+    fetch(partition)        -> awaitable raw items    (e.g. one subcategory request)
+    parse(partition, raw)   -> list of DB rows        (normalize + dedupe, cheap, sync)
+    persist(rows)           -> dict of counters       (blocking bulk write)
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Sequence
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_QUEUE_SIZE = 8
+
+_DONE = object()
+
+
+async def run_catalog_pipeline(
+    partitions: Sequence[Any],
+    *,
+    fetch: Callable[[Any], Awaitable[list]],
+    parse: Callable[[Any, list], list[dict]],
+    persist: Callable[[list[dict]], dict],
+    on_partition_done: Callable[[Any, int], None] | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> dict:
+    """Run the pipeline over `partitions`; returns stage timings and summed persist counters."""
+    fetch_q: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+    persist_q: asyncio.Queue = asyncio.Queue(maxsize=2)
+    fetch_tasks: list[asyncio.Task] = []
+    stats: dict[str, Any] = {
+        "partitions": 0,
+        "rows": 0,
+        "batches": 0,
+        "persist_seconds": 0.0,
+        "persist_totals": {},
+    }
+    started = time.perf_counter()
+
+    async def produce() -> None:
+        for partition in partitions:
+            task = asyncio.create_task(fetch(partition))
+            fetch_tasks.append(task)
+            await fetch_q.put((partition, task))  # blocks once queue_size partitions are buffered
+        await fetch_q.put(_DONE)
+
+    async def parse_stage() -> None:
+        batch: list[dict] = []
+        done: list[tuple[Any, int]] = []
+        while True:
+            entry = await fetch_q.get()
+            if entry is _DONE:
+                break
+            partition, task = entry
+            rows = parse(partition, await task)
+            batch.extend(rows)
+            done.append((partition, len(rows)))
+            if len(batch) >= batch_size:
+                await persist_q.put((batch, done))
+                batch, done = [], []
+        if batch or done:
+            await persist_q.put((batch, done))
+        await persist_q.put(_DONE)
+
+    def write(rows: list[dict], done: list[tuple[Any, int]]) -> dict:
+        result = persist(rows) if rows else {}
+        if on_partition_done is not None:
+            for partition, count in done:
+                on_partition_done(partition, count)
+        return result
+
+    async def persist_stage() -> None:
+        totals = stats["persist_totals"]
+        while True:
+            entry = await persist_q.get()
+            if entry is _DONE:
+                return
+            rows, done = entry
+            t0 = time.perf_counter()
+            result = await asyncio.to_thread(write, rows, done)
+            stats["persist_seconds"] += time.perf_counter() - t0
+            stats["batches"] += 1
+            stats["rows"] += len(rows)
+            stats["partitions"] += len(done)
+            for key, value in (result or {}).items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] = totals.get(key, 0) + value
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            group.create_task(produce())
+            group.create_task(parse_stage())
+            group.create_task(persist_stage())
+    except BaseExceptionGroup as errors:
+        # Surface the stage's own error (e.g. HTTPStatusError), not the group wrapper.
+        raise errors.exceptions[0]
+    finally:
+        for task in fetch_tasks:
+            if not task.done():
+                task.cancel()
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    stats["persist_seconds"] = round(stats["persist_seconds"], 3)
+    return stats
@@ -0,0 +1,160 @@
+"""
+Write-behind persistence for live search results (BUY_SMART_SEARCH_MODE=live).
+
+Live search used to write every hit (product + snapshot, two transactions each) before
+answering. Now the scraper answers straight from the upstream payload and hands the
+rows to this queue:
+
+- rows are coalesced per (source_id, external_prod_id) — the same product seen by many
+  searches is written once per flush (latest row wins)
+- a background thread flushes with scrapers_register.bulk_register_items() when
+  `batch_size` rows are pending or `flush_interval` seconds have passed
+- the FastAPI lifespan stops the thread with a final flush, so nothing queued is lost
+  on a clean shutdown
+- when more than `max_pending` distinct rows are waiting (DB down / slow) new rows are
+  dropped and counted instead of growing memory without bound
+
+Snapshots keep the bulk-sync rule: one per product per day.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import defaultdict
+
+from backend_portfolio.routers.Projects.buy_smart.scrapers.scrapers_register import (
+    bulk_register_items,
+)
+
+BATCH_SIZE = int(os.getenv("BUY_SMART_WRITE_BEHIND_BATCH", "200"))
+FLUSH_INTERVAL_SEC = float(os.getenv("BUY_SMART_WRITE_BEHIND_INTERVAL_SEC", "2"))
+MAX_PENDING = int(os.getenv("BUY_SMART_WRITE_BEHIND_MAX_PENDING", "10000"))
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL_SEC,
+        max_pending: int = MAX_PENDING,
+        writer=bulk_register_items,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.writer = writer
+        self._pending: dict[tuple[int, object], dict] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one flush at a time (thread vs shutdown)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._counters = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "flushed": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+        }
+        self._flush_seconds_total = 0.0
+        self._flush_seconds_max = 0.0
+        self._last_flush_seconds = 0.0
+
+    def enqueue(self, source_id: int, rows: list[dict]) -> int:
+        """Queue rows for `source_id`; returns how many were accepted (not dropped)."""
+        accepted = 0
+        with self._lock:
+            for row in rows:
+                key = (source_id, row.get("external_prod_id"))
+                if key in self._pending:
+                    self._counters["coalesced"] += 1
+                elif len(self._pending) >= self.max_pending:
+                    self._counters["dropped"] += 1
+                    continue
+                self._pending[key] = row
+                accepted += 1
+            self._counters["enqueued"] += accepted
+            depth = len(self._pending)
+        if depth >= self.batch_size:
+            self._wake.set()
+        return accepted
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write everything pending now; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            by_source: dict[int, list[dict]] = defaultdict(list)
+            for (source_id, _), row in pending.items():
+                by_source[source_id].append(row)
+
+            started = time.perf_counter()
+            written = 0
+            for source_id, rows in by_source.items():
+                try:
+                    self.writer(source_id, rows)
+                    written += len(rows)
+                except Exception as exc:
+                    # Rows are not re-queued: the next live search re-enqueues them anyway.
+                    self._counters["flush_errors"] += 1
+                    self._counters["dropped"] += len(rows)
+                    print(f"Write-behind flush failed ({len(rows)} rows): {exc!r}")
+            elapsed = time.perf_counter() - started
+
+            self._counters["flushed"] += written
+            self._counters["flushes"] += 1
+            self._last_flush_seconds = elapsed
+            self._flush_seconds_total += elapsed
+            self._flush_seconds_max = max(self._flush_seconds_max, elapsed)
+            return written
+
+    def stats(self) -> dict:
+        flushes = self._counters["flushes"]
+        return {
+            "depth": self.depth(),
+            "batch_size": self.batch_size,
+            "flush_interval_sec": self.flush_interval,
+            "max_pending": self.max_pending,
+            **self._counters,
+            "last_flush_ms": round(self._last_flush_seconds * 1000, 2),
+            "avg_flush_ms": round(self._flush_seconds_total / flushes * 1000, 2) if flushes else 0.0,
+            "max_flush_ms": round(self._flush_seconds_max * 1000, 2),
+            "running": self._thread is not None,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as exc:
+                print(f"Write-behind flush loop failed: {exc!r}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flush thread and write whatever is still queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+
+live_search_writer = WriteBehindQueue()
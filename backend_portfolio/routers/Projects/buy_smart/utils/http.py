@@ -0,0 +1,274 @@
+"""
+Shared outbound HTTP layer (httpx), sync and async.
+
+Every outbound call in the backend (weather APIs, OpenAI, Hetzi / Shufersal scrapers)
+goes through one keep-alive connection pool per flavour instead of a new TCP+TLS
+handshake per call:
+
+    client = http_layer.client(base_url=..., headers=..., timeout=...)       # httpx.Client
+    client = http_layer.async_client(base_url=..., headers=..., timeout=...) # httpx.AsyncClient
+
+Scoped clients keep their own base_url / headers / cookies (e.g. Hetzi's guest cookie) but
+send through a shared transport that adds:
+- a per-host concurrency cap (HTTP_PER_HOST_LIMIT in-flight requests per host)
+- retry with jittered exponential backoff on timeouts, transport errors, 429 and 5xx —
+  only for idempotent methods (GET/HEAD/OPTIONS/PUT/DELETE); pass max_retries=0 for
+  callers that retry themselves
+- per-host counters: requests, retries, errors, status classes, latency (see stats())
+
+Closing a scoped client does not close the shared pool; the FastAPI lifespan calls
+http_layer.open() / await http_layer.aclose(). The async pool is bound to the event loop
+that first uses it — a CLI's asyncio.run() gets a fresh one.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "8"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+BACKOFF_SEC = float(os.getenv("HTTP_BACKOFF_SEC", "0.3"))
+DEFAULT_TIMEOUT = 20.0
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+MAX_RETRY_AFTER_SEC = 10.0
+
+
+class _HostStats:
+    __slots__ = ("requests", "retries", "errors", "status", "latency_total", "latency_max")
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.status: dict[str, int] = defaultdict(int)
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "status": dict(self.status),
+            "avg_ms": round(self.latency_total / self.requests * 1000, 1) if self.requests else 0.0,
+            "max_ms": round(self.latency_max * 1000, 1),
+        }
+
+
+def _retry_delay(attempt: int, backoff_sec: float, response: httpx.Response | None) -> float:
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_RETRY_AFTER_SEC)
+    return backoff_sec * (2 ** attempt) * (0.5 + random.random())
+
+
+def _should_retry(request: httpx.Request, attempt: int, max_retries: int) -> bool:
+    return attempt < max_retries and request.method in IDEMPOTENT_METHODS
+
+
+class _LayerTransport(httpx.BaseTransport):
+    """Per-client view of the shared sync pool: caps, retries, metrics. close() is a no-op."""
+
+    def __init__(self, layer: "HttpLayer", max_retries: int):
+        self.layer = layer
+        self.max_retries = max_retries
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        pool = self.layer._sync_pool()
+        attempt = 0
+        while True:
+            response = None
+            with self.layer._host_semaphore(host):
+                started = time.perf_counter()
+                try:
+                    response = pool.handle_request(request)
+                except httpx.TransportError:
+                    self.layer._record(host, time.perf_counter() - started, None)
+                    if not _should_retry(request, attempt, self.max_retries):
+                        raise
+            if response is not None:
+                self.layer._record(host, time.perf_counter() - started, response.status_code)
+                if response.status_code not in RETRY_STATUS or not _should_retry(
+                    request, attempt, self.max_retries
+                ):
+                    return response
+                response.close()
+            self.layer._record_retry(host)
+            time.sleep(_retry_delay(attempt, self.layer.backoff_sec, response))
+            attempt += 1
+
+    def close(self) -> None:
+        pass
+
+
+class _AsyncLayerTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of _LayerTransport (shared pool of the running event loop)."""
+
+    def __init__(self, layer: "HttpLayer", max_retries: int):
+        self.layer = layer
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        pool, semaphores = self.layer._async_pool()
+        attempt = 0
+        while True:
+            response = None
+            async with semaphores[host]:
+                started = time.perf_counter()
+                try:
+                    response = await pool.handle_async_request(request)
+                except httpx.TransportError:
+                    self.layer._record(host, time.perf_counter() - started, None)
+                    if not _should_retry(request, attempt, self.max_retries):
+                        raise
+            if response is not None:
+                self.layer._record(host, time.perf_counter() - started, response.status_code)
+                if response.status_code not in RETRY_STATUS or not _should_retry(
+                    request, attempt, self.max_retries
+                ):
+                    return response
+                await response.aclose()
+            self.layer._record_retry(host)
+            await asyncio.sleep(_retry_delay(attempt, self.layer.backoff_sec, response))
+            attempt += 1
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HttpLayer:
+    def __init__(
+        self,
+        *,
+        max_connections: int = MAX_CONNECTIONS,
+        per_host_limit: int = PER_HOST_LIMIT,
+        max_retries: int = MAX_RETRIES,
+        backoff_sec: float = BACKOFF_SEC,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        )
+        self.per_host_limit = max(1, per_host_limit)
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+        self._lock = threading.Lock()
+        self._sync: httpx.HTTPTransport | None = None
+        self._host_semaphores: dict[str, threading.BoundedSemaphore] = {}
+        # (event loop, pool, per-host semaphores) — asyncio objects cannot cross loops
+        self._async: tuple[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport, dict] | None = None
+        self._stats: dict[str, _HostStats] = defaultdict(_HostStats)
+
+    # --------- pools ---------
+    def _sync_pool(self) -> httpx.HTTPTransport:
+        with self._lock:
+            if self._sync is None:
+                self._sync = httpx.HTTPTransport(limits=self.limits)
+            return self._sync
+
+    def _host_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return semaphore
+
+    def _async_pool(self) -> tuple[httpx.AsyncHTTPTransport, dict]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._async is None or self._async[0] is not loop:
+                # Connections of a finished loop (e.g. a CLI's asyncio.run) are unusable.
+                semaphores = defaultdict(lambda: asyncio.Semaphore(self.per_host_limit))
+                self._async = (loop, httpx.AsyncHTTPTransport(limits=self.limits), semaphores)
+            return self._async[1], self._async[2]
+
+    # --------- scoped clients ---------
+    def client(
+        self,
+        *,
+        base_url: str = "",
+        headers: dict | None = None,
+        timeout: float | None = DEFAULT_TIMEOUT,
+        max_retries: int | None = None,
+        follow_redirects: bool = True,
+    ) -> httpx.Client:
+        return httpx.Client(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=follow_redirects,
+            transport=_LayerTransport(self, self.max_retries if max_retries is None else max_retries),
+        )
+
+    def async_client(
+        self,
+        *,
+        base_url: str = "",
+        headers: dict | None = None,
+        timeout: float | None = DEFAULT_TIMEOUT,
+        max_retries: int | None = None,
+        follow_redirects: bool = True,
+    ) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=follow_redirects,
+            transport=_AsyncLayerTransport(self, self.max_retries if max_retries is None else max_retries),
+        )
+
+    # --------- metrics ---------
+    def _record(self, host: str, elapsed: float, status: int | None) -> None:
+        with self._lock:
+            stats = self._stats[host]
+            stats.requests += 1
+            stats.latency_total += elapsed
+            stats.latency_max = max(stats.latency_max, elapsed)
+            if status is None:
+                stats.errors += 1
+                stats.status["error"] += 1
+            else:
+                stats.status[f"{status // 100}xx"] += 1
+                if status >= 500:
+                    stats.errors += 1
+
+    def _record_retry(self, host: str) -> None:
+        with self._lock:
+            self._stats[host].retries += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {host: stats.as_dict() for host, stats in sorted(self._stats.items())}
+
+    # --------- lifespan ---------
+    def open(self) -> None:
+        """Create the pools up front (FastAPI startup); the async one binds to the running loop."""
+        self._sync_pool()
+        try:
+            self._async_pool()
+        except RuntimeError:
+            pass  # no running loop (scripts): created on first async use
+
+    async def aclose(self) -> None:
+        with self._lock:
+            sync_pool, self._sync = self._sync, None
+            async_state, self._async = self._async, None
+        if sync_pool is not None:
+            sync_pool.close()
+        if async_state is not None and async_state[0] is asyncio.get_running_loop():
+            await async_state[1].aclose()
+
+
+http_layer = HttpLayer()
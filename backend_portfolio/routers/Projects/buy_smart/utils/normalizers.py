@@ -0,0 +1,114 @@
+"""
+Text normalization for matching Buy Smart product names.
+
+Store feeds spell the same product differently: final letters (ך/כ, ם/מ, ן/נ, ף/פ,
+ץ/צ), niqqud, geresh / gershayim or ASCII quotes in abbreviations (ק"ג, ק״ג, קג),
+unit spellings (1.5 ליטר / 1.5ל / 1.5 lt) and punctuation. normalize_text() folds all
+of them to one key:
+
+- casefold (+ NFKC for presentation forms such as שׁ, full-width digits)
+- one str.translate pass: drop niqqud / cantillation, quotes and bidi marks, map final
+  letters to their regular form and punctuation (maqaf, dashes, slashes, ...) to space
+- precompiled regexes: split digits from letters (500גרם → 500 גרם), keep decimal
+  points, canonicalize unit words — single-letter ones (ג, ל, g, l) only after a number
+- collapse whitespace
+
+The result is a matching key, not display text: "גבינה לבנה 5% 250 גרם" becomes
+"גבינה לבנה 5% 250 גרמ". product.normalized_name stores it at write time; search terms
+go through the same function. Changing the rules changes stored keys — add a migration
+that calls init_db.refresh_normalized_names().
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+
+_FINAL_LETTERS = {"ך": "כ", "ם": "מ", "ן": "נ", "ף": "פ", "ץ": "צ"}
+
+# Hebrew points and cantillation (U+0591–U+05C7) except the punctuation among them
+_HEBREW_PUNCTUATION = {"\u05be", "\u05c0", "\u05c3", "\u05c6"}  # maqaf, paseq, sof pasuq, nun hafukha
+_HEBREW_MARKS = [chr(cp) for cp in range(0x0591, 0x05C8) if chr(cp) not in _HEBREW_PUNCTUATION]
+
+_DELETED = (
+    "\u05f3\u05f4"                                  # geresh, gershayim
+    "'\"`\u00b4\u2018\u2019\u201a\u201b\u201c\u201d\u201e\u201f\u2032\u2033"  # quotes, primes
+    "\u00ad\u200b\u200c\u200d\u200e\u200f\u202a\u202b\u202c\u202d\u202e"  # soft hyphen, bidi marks
+    "\u2066\u2067\u2068\u2069\ufeff"
+)
+_SPACED = (
+    "".join(_HEBREW_PUNCTUATION)
+    + "!#$&()*+/:;<=>?@[\\]^_{|}~-"
+    + "\u00a0\u00b7\u2010\u2011\u2012\u2013\u2014\u2015\u2022\u2026\u2212"  # nbsp, dashes, bullets
+)
+
+_TABLE = str.maketrans(
+    {
+        **_FINAL_LETTERS,
+        **{char: None for char in _HEBREW_MARKS},
+        **{char: None for char in _DELETED},
+        **{char: " " for char in _SPACED},
+    }
+)
+
+# "1.5" / "1,5" stay numbers; any other dot or comma separates words
+_SEPARATOR_RE = re.compile(r"(?<=\d)([.,])(?=\d)|[.,]")
+_DIGIT_LETTER_RE = re.compile(r"(?<=\d)(?=[^\W\d_])|(?<=[^\W\d_])(?=\d)")
+
+# canonical unit → other spellings; all of them go through _fold() first, so
+# ק"ג / ק״ג / קג are one entry
+_UNIT_SPELLINGS = {
+    'ק"ג': ('ק"ג', "קילו", "קילוגרם", "קילוגרמים", "kg", "kilo", "kilogram", "kilograms"),
+    "גרם": ("גרם", "גרמים", "gram", "grams"),
+    "ליטר": ("ליטר", "ליטרים", "ltr", "liter", "liters", "litre", "litres"),
+    'מ"ל': ('מ"ל', "מיליליטר", "ml"),
+    "יח'": ("יח'", "יחידה", "יחידות", "units"),
+}
+# Ordinary words on their own — a unit only right after a number
+_UNIT_SPELLINGS_AFTER_NUMBER = {
+    "גרם": ("גר", "ג", "gr", "g"),
+    "ליטר": ("ל", "lt", "l"),
+}
+
+
+def _fold(text: str) -> str:
+    return " ".join(text.casefold().translate(_TABLE).split())
+
+
+_UNIT_WORDS = {
+    _fold(alias): _fold(unit) for unit, aliases in _UNIT_SPELLINGS.items() for alias in (unit, *aliases)
+}
+_UNITS_AFTER_NUMBER = {
+    _fold(alias): _fold(unit) for unit, aliases in _UNIT_SPELLINGS_AFTER_NUMBER.items() for alias in aliases
+}
+_UNITS = {**_UNIT_WORDS, **_UNITS_AFTER_NUMBER}
+
+
+def _alternation(words) -> str:
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+_UNIT_RE = re.compile(
+    rf"(?:(?<=\d )(?:{_alternation(_UNITS_AFTER_NUMBER)})"
+    rf"|(?<!\S)(?:{_alternation(_UNIT_WORDS)}))(?!\S)"
+)
+
+
+def _separator(match: re.Match) -> str:
+    return "." if match.group(1) else " "
+
+
+def _unit(match: re.Match) -> str:
+    return _UNITS[match.group()]
+
+
+def normalize_text(text: str | None) -> str:
+    """Matching key of a product name or search term (see module docstring)."""
+    if not text:
+        return ""
+    if not text.isascii() and not unicodedata.is_normalized("NFKC", text):
+        text = unicodedata.normalize("NFKC", text)
+    text = text.casefold().translate(_TABLE)
+    if "." in text or "," in text:
+        text = _SEPARATOR_RE.sub(_separator, text)
+    text = " ".join(_DIGIT_LETTER_RE.sub(" ", text).split())
+    return _UNIT_RE.sub(_unit, text)
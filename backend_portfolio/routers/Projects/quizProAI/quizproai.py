@@ -7,12 +7,14 @@ from sqlmodel import Session, select
 from .models import Question, User
 from backend_portfolio.db import engine
 from backend_portfolio.routers.Projects.quizProAI.auth_utils import get_current_user
+from backend_portfolio.routers.Projects.buy_smart.utils.http import http_layer
 
 import os, json, re, datetime, random  # 👈 random added
 
 load_dotenv()
 router = APIRouter(prefix="/quizproai")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# OpenAI sets its own per-request timeouts and retries; the shared layer adds pooling + metrics
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_layer.client(timeout=None))
 
 # ----------------- request model -----------------
 class CategoryRequest(BaseModel):
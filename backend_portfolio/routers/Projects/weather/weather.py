@@ -1,17 +1,21 @@
 # weather.py
 from fastapi import APIRouter, HTTPException, Query
-import requests, os, json, random, asyncio
+import os, json, random, asyncio
 from dotenv import load_dotenv
 from .continents import CONTINENT_REGIONS
 import pycountry
 from functools import lru_cache
 from datetime import datetime, timedelta, timezone
+from backend_portfolio.routers.Projects.buy_smart.utils.http import http_layer
 
 load_dotenv()
 API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
 router = APIRouter(prefix="/weather", tags=["Weather"])
 
+# Keep-alive pool shared with the rest of the backend (see buy_smart/utils/http.py)
+http_client = http_layer.client(timeout=10)
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 print("*** BASE DIR IS: ",BASE_DIR)
 CITY_PATH = os.path.join(BASE_DIR, "data", "city.list.json")
@@ -52,7 +56,7 @@ def get_population(name,country_code):
 
 def get_timezone_id(lat, lon):
     url = f"https://api.bigdatacloud.net/data/reverse-geocode-client?latitude={lat}&longitude={lon}&localityLanguage=en"
-    r = requests.get(url).json()
+    r = http_client.get(url).json()
     data = {
     # your dictionary here...
 }
@@ -108,11 +112,11 @@ async def fetch_temp(city, session, semaphore):
         url = f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&units=metric&appid={API_KEY}"
         try:
             
-            async with session.get(url, timeout=10) as res:
-                data = await res.json()
-                country_code = data["sys"]["country"]
-                country_name = get_country_name(country_code) 
-                return {"name": city["name"], "temp": data["main"]["temp"], "country": country_name}
+            res = await session.get(url, timeout=10)
+            data = res.json()
+            country_code = data["sys"]["country"]
+            country_name = get_country_name(country_code) 
+            return {"name": city["name"], "temp": data["main"]["temp"], "country": country_name}
         except Exception:
             return None
 
@@ -120,12 +124,11 @@ async def fetch_temp(city, session, semaphore):
 @router.get("/extremes/{continent}")
 async def get_extremes(continent: str, region: str | None = Query(None)):
     """Return coldest & hottest city in chosen continent (or region)."""
-    import aiohttp
     cities = get_cities(continent, region)
 
     coldest, hottest = None, None
 
-    async with aiohttp.ClientSession() as session:
+    async with http_layer.async_client() as session:
         sem = asyncio.Semaphore(5)  # 5 requests at a time (safe for free tier)
         tasks = [fetch_temp(c, session, sem) for c in cities]
         results = await asyncio.gather(*tasks)
@@ -166,7 +169,7 @@ def get_historical_avg_temp(lat, lon):
     }
 
     try:
-        res = requests.get(url, headers=headers, params=params, timeout=12)
+        res = http_client.get(url, headers=headers, params=params, timeout=12)
         data = res.json()
     except Exception:
         return None
@@ -203,7 +206,7 @@ def get_city_weather(q: str = Query(..., min_length=1, description="City name, e
 
     # 1) Geocode
     try:
-        geo = requests.get(
+        geo = http_client.get(
             "http://api.openweathermap.org/geo/1.0/direct",
             params={"q": q, "limit": 1, "appid": API_KEY},
             timeout=8,
@@ -224,7 +227,7 @@ def get_city_weather(q: str = Query(..., min_length=1, description="City name, e
     city_population=get_population(city_name,country_code)
     # 2) Weather
     try:
-        w = requests.get(
+        w = http_client.get(
             "http://api.openweathermap.org/data/2.5/weather",
             params={"lat": lat, "lon": lon, "units": "metric", "appid": API_KEY},
             timeout=8,
@@ -242,7 +245,7 @@ def get_city_weather(q: str = Query(..., min_length=1, description="City name, e
     precip_probability = None
 
     try:
-        onecall = requests.get(
+        onecall = http_client.get(
             "https://api.openweathermap.org/data/3.0/onecall",
             params={
                 "lat": lat,